@@ -3,9 +3,10 @@ from django.contrib import admin
 # Register your models here.
 from .models import Volunteer
 from .models import Organization
-from .models import Opportunity
+from .models import Opportunity, SignUp
 from .models import Post, Comment, Task
 from .models import Chat
+from . import schedule, seats
 
 
 # Displays the comments under the post in tabular form (neat table).
@@ -19,6 +20,23 @@ class PostAdmin(admin.ModelAdmin):
     inlines = [CommentInline]
 
 
+# The volunteers signed up for an opportunity. Rows saved here take no seats
+# and have no times, they are counted and stamped after the form is saved.
+class SignUpInline(admin.TabularInline):
+    model = SignUp
+    fields = ["volunteer"]
+    extra = 1
+
+
+class OpportunityAdmin(admin.ModelAdmin):
+    inlines = [SignUpInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        seats.recount([form.instance.pk])
+        schedule.stamp([form.instance.pk])
+
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
 
@@ -28,7 +46,7 @@ class TaskAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Volunteer)
-admin.site.register(Opportunity)
+admin.site.register(Opportunity, OpportunityAdmin)
 admin.site.register(Organization)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MyapiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "myapi"
+
+    def ready(self):
+        # Connects the model signal receivers
+        from . import signals  # noqa: F401
@@ -1,6 +1,6 @@
 from django.contrib.auth.backends import ModelBackend
 from .models import Volunteer
-from django.contrib.auth.hashers import check_password
+from .hashers import verify_login_password
 
 
 class EmailBackend(ModelBackend):
@@ -8,8 +8,9 @@ class EmailBackend(ModelBackend):
         try:
             user = Volunteer.objects.get(email=username)
         except Volunteer.DoesNotExist:
-            return None
+            user = None
 
-        if check_password(password, user.password):
+        # Runs a hash for unknown emails too, see verify_login_password
+        if verify_login_password(user, password):
             return user
         return None
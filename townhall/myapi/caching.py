@@ -0,0 +1,367 @@
+import collections
+import contextlib
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+
+from .metrics import Counter
+
+# Two-tier cache: a small LRU in each worker process (L1) in front of the
+# shared cache (L2, settings.TWO_TIER_CACHE["L2"], e.g. redis or memcached).
+#
+# Entries live in namespaces, usually one per model (see for_model). L2 keys
+# carry the namespace's generation, so invalidate() drops a whole namespace
+# by bumping one counter in L2 instead of deleting keys.
+#
+# Workers can't tell each other about deletes directly, so every delete also
+# bumps the namespace's epoch in L2. Each worker reads the generation and the
+# epoch at most once every SYNC_INTERVAL seconds and empties its L1 for the
+# namespace when either moved; a worker may serve a stale L1 entry for up to
+# SYNC_INTERVAL seconds after another worker changed it.
+#
+# Bumping overwrites the generation or epoch with a fresh value instead of
+# incrementing it, so concurrent bumps can't land on the same value on a
+# backend without atomic add/incr (the file cache): whichever write wins,
+# every worker sees a value it didn't have. L1 entries also expire after
+# L1_TIMEOUT seconds, which bounds the damage of any change still missed.
+
+L1_HITS = Counter("cache_l1_hits_total")
+L1_MISSES = Counter("cache_l1_misses_total")
+L1_EVICTIONS = Counter("cache_l1_evictions_total")
+L2_HITS = Counter("cache_l2_hits_total")
+L2_MISSES = Counter("cache_l2_misses_total")
+INVALIDATIONS = Counter("cache_invalidations_total")
+
+_MISSING = object()
+
+
+def _setting(name: str):
+    defaults = {
+        "L2": "shared",
+        "TIMEOUT": 300,
+        "L1_MAX_ENTRIES": 1000,
+        "L1_TIMEOUT": 60,
+        "SYNC_INTERVAL": 1.0,
+        "FILL_WAIT": 1.0,
+        "FILL_LOCK_TIMEOUT": 10,
+    }
+    return getattr(settings, "TWO_TIER_CACHE", {}).get(name, defaults[name])
+
+
+def in_transaction(model) -> bool:
+    """Whether writes to model may still be rolled back."""
+    connection = transaction.get_connection(router.db_for_write(model))
+    # Blocks opened by TestCase don't count, as for atomic(durable=True)
+    return any(
+        not getattr(block, "_from_testcase", False)
+        for block in connection.atomic_blocks
+    )
+
+
+class LRUCache:
+    """
+    Bounded in-process mapping that drops the least recently used keys, and
+    keys set more than ``timeout`` seconds ago.
+    """
+
+    def __init__(self, max_entries: int, timeout: typing.Optional[float] = None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = collections.OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return default
+            value, expires_at = self.entries[key]
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self.entries[key]
+                return default
+            return value
+
+    def set(self, key, value) -> None:
+        expires_at = None
+        if self.timeout is not None:
+            expires_at = time.monotonic() + self.timeout
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class CacheStats(typing.NamedTuple):
+    l1_hits: int
+    l1_misses: int
+    l1_evictions: int
+    l2_hits: int
+    l2_misses: int
+
+
+class TwoTierCache:
+    """
+    Namespaced cache with a per-process L1 over the shared L2.
+
+    ``version`` is part of every key, bump it when the shape of the cached
+    values changes so old entries are never read back.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        version: int = 1,
+        timeout: typing.Optional[int] = None,
+    ):
+        self.namespace = namespace
+        self.version = version
+        self.timeout = timeout
+        self.l1 = LRUCache(_setting("L1_MAX_ENTRIES"), _setting("L1_TIMEOUT"))
+        self.generation = None
+        self.epoch = None
+        self.synced_at = None
+        self.sync_lock = threading.Lock()
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.published = collections.Counter()
+
+    @property
+    def l2(self):
+        return caches[_setting("L2")]
+
+    def _control_key(self, name: str) -> str:
+        return f"cachectl:{self.namespace}:{name}"
+
+    def _key(self, key, generation=None) -> str:
+        generation = self.generation if generation is None else generation
+        return f"{self.namespace}:v{self.version}:g{generation}:{key}"
+
+    def _bump(self, name: str) -> int:
+        # A fresh value rather than an increment (see above), from the clock so
+        # a value lost from L2 (evicted, restarted) is never used again
+        value = time.time_ns()
+        self.l2.set(self._control_key(name), value, timeout=None)
+        return value
+
+    def sync(self, force: bool = False) -> None:
+        """Catches up with changes made by other workers."""
+        now = time.monotonic()
+        if (
+            not force
+            and self.synced_at is not None
+            and now - self.synced_at < _setting("SYNC_INTERVAL")
+        ):
+            return
+
+        with self.sync_lock:
+            keys = [self._control_key("generation"), self._control_key("epoch")]
+            found = self.l2.get_many(keys)
+            generation = found.get(keys[0])
+            if generation is None:
+                generation = self._bump("generation")
+            epoch = found.get(keys[1])
+
+            if (generation, epoch) != (self.generation, self.epoch):
+                self.l1.clear()
+            self.generation, self.epoch = generation, epoch
+            self.synced_at = now
+            self._publish_stats()
+
+    def _publish_stats(self) -> None:
+        # Shared metrics are updated in batches, a round trip to L2 on every
+        # L1 hit would defeat the L1
+        self.counts["l1_evictions"] = self.l1.evictions
+        for name, counter in [
+            ("l1_hits", L1_HITS),
+            ("l1_misses", L1_MISSES),
+            ("l1_evictions", L1_EVICTIONS),
+            ("l2_hits", L2_HITS),
+            ("l2_misses", L2_MISSES),
+        ]:
+            delta = self.counts[name] - self.published[name]
+            if delta:
+                counter.inc(delta)
+                self.published[name] = self.counts[name]
+
+    def _broadcast(self) -> None:
+        # This worker empties its own L1 on its next sync too: it can't tell
+        # whether another worker's bump was overwritten by this one
+        self._bump("epoch")
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: typing.Iterable) -> typing.Dict:
+        self.sync()
+        found = {}
+        missing = {}
+        for key in keys:
+            cache_key = self._key(key)
+            value = self.l1.get(cache_key, _MISSING)
+            if value is _MISSING:
+                missing[cache_key] = key
+            else:
+                found[key] = value
+        self.counts["l1_hits"] += len(found)
+        self.counts["l1_misses"] += len(missing)
+        if not missing:
+            return found
+
+        from_l2 = self.l2.get_many(list(missing))
+        self.counts["l2_hits"] += len(from_l2)
+        self.counts["l2_misses"] += len(missing) - len(from_l2)
+        for cache_key, value in from_l2.items():
+            self.l1.set(cache_key, value)
+            found[missing[cache_key]] = value
+        return found
+
+    def set(self, key, value) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, values: typing.Dict) -> None:
+        self.sync()
+        self._store(values, self.generation)
+
+    def _store(self, values: typing.Dict, generation) -> None:
+        entries = {self._key(key, generation): value for key, value in values.items()}
+        timeout = _setting("TIMEOUT") if self.timeout is None else self.timeout
+        self.l2.set_many(entries, timeout=timeout)
+        for cache_key, value in entries.items():
+            self.l1.set(cache_key, value)
+
+    @contextlib.contextmanager
+    def _single_flight(self, key):
+        # One lock per key being loaded by this process, dropped by the last
+        # thread using it
+        with self.flights_lock:
+            flight = self.flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self.flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self.flights[key]
+
+    def _wait_for_fill(self, key, generation):
+        deadline = time.monotonic() + _setting("FILL_WAIT")
+        while time.monotonic() < deadline:
+            time.sleep(0.01)
+            found = self.l2.get_many([self._key(key, generation)])
+            if found:
+                value = found[self._key(key, generation)]
+                self.l1.set(self._key(key, generation), value)
+                return value
+        return _MISSING
+
+    def get_or_set(self, key, default: typing.Callable[[], typing.Any]):
+        """
+        Returns the cached value of key, or computes it with default() and
+        caches it. Concurrent misses on the same key compute it once: threads
+        of this process wait for the one computing it, other processes poll
+        L2 for up to FILL_WAIT seconds before computing it themselves.
+        """
+        self.sync()
+        # Stored under the generation it was read in, so a value computed
+        # while this worker invalidates the namespace is never read back
+        generation = self.generation
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._single_flight(key):
+            # Filled by the thread this one waited for
+            value = self.l1.get(self._key(key, generation), _MISSING)
+            if value is not _MISSING:
+                return value
+
+            # On a backend without atomic add two processes may both get
+            # the lock and load the key, which costs a query but no stale value
+            lock_key = f"{self._key(key, generation)}:filling"
+            if not self.l2.add(lock_key, 1, timeout=_setting("FILL_LOCK_TIMEOUT")):
+                value = self._wait_for_fill(key, generation)
+                if value is not _MISSING:
+                    return value
+            # A delete landing while default() runs may concern the row it
+            # read, that value is returned but not cached
+            epoch_key = self._control_key("epoch")
+            epoch = self.l2.get(epoch_key)
+            try:
+                value = default()
+                if self.l2.get(epoch_key) == epoch:
+                    self._store({key: value}, generation)
+            finally:
+                self.l2.delete(lock_key)
+        return value
+
+    def delete(self, key) -> None:
+        self.delete_many([key])
+
+    def delete_many(self, keys: typing.Iterable) -> None:
+        self.sync()
+        cache_keys = [self._key(key) for key in keys]
+        self.l2.delete_many(cache_keys)
+        for cache_key in cache_keys:
+            self.l1.pop(cache_key)
+        self._broadcast()
+
+    def invalidate(self) -> None:
+        """Drops every entry of the namespace, in all workers."""
+        # Other workers notice the new generation on their next sync
+        self.generation = self._bump("generation")
+        self.l1.clear()
+        INVALIDATIONS.inc()
+
+    def stats(self) -> CacheStats:
+        """This worker's counts, the totals of all workers are in the metrics."""
+        return CacheStats(
+            l1_hits=self.counts["l1_hits"],
+            l1_misses=self.counts["l1_misses"],
+            l1_evictions=self.l1.evictions,
+            l2_hits=self.counts["l2_hits"],
+            l2_misses=self.counts["l2_misses"],
+        )
+
+
+_NAMESPACES: typing.Dict[str, TwoTierCache] = {}
+_NAMESPACES_LOCK = threading.Lock()
+
+
+def get_cache(namespace: str, version: int = 1) -> TwoTierCache:
+    """The process wide cache of a namespace, created on first use."""
+    with _NAMESPACES_LOCK:
+        if namespace not in _NAMESPACES:
+            _NAMESPACES[namespace] = TwoTierCache(namespace, version=version)
+        return _NAMESPACES[namespace]
+
+
+def for_model(model, version: int = 1) -> TwoTierCache:
+    return get_cache(model._meta.label_lower, version=version)
+
+
+def reset() -> None:
+    """Forgets this process' caches and their sync state (used by tests)."""
+    with _NAMESPACES_LOCK:
+        _NAMESPACES.clear()
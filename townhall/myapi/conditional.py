@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import time
+import typing
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models.functions import Now
+from django.utils.cache import get_conditional_response
+from django.utils.connection import ConnectionProxy
+from django.utils.http import http_date, quote_etag
+
+from . import caching, entity_cache, identity_map
+
+# Conditional GET for polled endpoints.
+#
+# Every table an endpoint's payload is built from has a version number in the
+# shared cache, bumped by the signal receivers in signals.py whenever one of
+# its rows is saved or deleted or its many-to-many relations change. An
+# endpoint's ETag is a hash of its URL and the versions of its tables, so
+# answering 304 Not Modified costs one cache read and neither a query nor
+# serialization. Writes that send no signals (QuerySet.update, bulk_create)
+# have to call bump() themselves when they change what these payloads show.
+#
+# The versions are read before the view runs: a change landing meanwhile is
+# served under the older ETag, which the next request then no longer matches.
+
+cache = ConnectionProxy(caches, "shared")
+
+
+def _key(model) -> str:
+    return f"table_version:{model._meta.label_lower}"
+
+
+def bump(*models) -> None:
+    """
+    Marks the tables as changed. Inside a transaction this happens on
+    commit, a version bumped earlier could be served with the old rows.
+    """
+    if models and caching.in_transaction(models[0]):
+        transaction.on_commit(
+            lambda: _bump(models), using=router.db_for_write(models[0])
+        )
+    else:
+        _bump(models)
+
+
+def _bump(models) -> None:
+    for model in models:
+        # A fresh value rather than an increment: concurrent increments can be
+        # lost on a backend without atomic add/incr (the file cache), leaving
+        # a changed table under an ETag clients hold. From the clock, so a
+        # version lost from the cache never comes back either.
+        cache.set(_key(model), time.time_ns(), timeout=None)
+
+
+def versions(models) -> typing.List[int]:
+    keys = [_key(model) for model in models]
+    found = cache.get_many(keys)
+    missing = [model for model, key in zip(models, keys) if key not in found]
+    if missing:
+        _bump(missing)
+        found.update(cache.get_many([_key(model) for model in missing]))
+    return [found.get(key, 0) for key in keys]
+
+
+def touch(model, pks) -> None:
+    """Moves updated_at of the rows, for changes save() doesn't see."""
+    model.objects.filter(pk__in=pks).update(updated_at=Now())
+    entity_cache.forget_many(model, pks)
+    for pk in pks:
+        identity_map.forget(model, pk)
+
+
+def updated_at_of(model, pk):
+    """updated_at of the row, None if there is no such row."""
+    if pk is None:
+        return None
+    try:
+        return identity_map.get(model, pk).updated_at
+    except (model.DoesNotExist, ValueError, ValidationError):
+        return None
+
+
+def etag(request, models, per_user: bool = False) -> str:
+    query = sorted(request.GET.lists())
+    parts = [request.path, repr(query), repr(versions(models))]
+    if per_user:
+        parts.append(str(request.session.get("_auth_user_id")))
+    return quote_etag(hashlib.md5("|".join(parts).encode()).hexdigest())
+
+
+def conditional_get(
+    *models,
+    last_modified: typing.Optional[typing.Callable] = None,
+    per_user: bool = False,
+):
+    """
+    Adds an ETag to the view's 200 responses and answers 304 when the
+    request's If-None-Match still matches it.
+
+    ``models`` are all the tables the payload reads. ``last_modified`` is
+    called with the view's arguments and returns the payload's updated_at
+    (or None), for clients that only send If-Modified-Since; only use it
+    when that row is all the payload shows. ``per_user`` gives every logged
+    in volunteer their own ETags, for payloads that depend on who asks.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(self, request, *args, **kwargs)
+
+            response_etag = etag(request, models, per_user=per_user)
+            modified = None
+            if last_modified is not None:
+                modified = last_modified(request, *args, **kwargs)
+            timestamp = None if modified is None else int(modified.timestamp())
+
+            not_modified = get_conditional_response(
+                request, etag=response_etag, last_modified=timestamp
+            )
+            if not_modified is not None:
+                not_modified["ETag"] = response_etag
+                return not_modified
+
+            response = view(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                response["ETag"] = response_etag
+                if timestamp is not None:
+                    response["Last-Modified"] = http_date(timestamp)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,143 @@
+import logging
+import time
+import typing
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+from django.utils.connection import ConnectionProxy
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+cache = ConnectionProxy(caches, "shared")
+
+
+class LikeCounterBuffer:
+    """
+    Write-behind buffer for Post.likes (enabled by POST_LIKES_WRITE_BEHIND).
+
+    Like toggles add +1/-1 to a per-post delta in the cache with an atomic
+    incr instead of updating the post row, and record the post id in a dirty
+    log. flush() later applies all pending deltas in one batched UPDATE. Reads
+    add the pending delta on top of the stored count, so they stay exact
+    while the row lags behind.
+
+    The deltas live in CACHES["shared"], seen by every process that toggles
+    likes or serves the feed and by flush_like_counters. Its backend has to
+    support atomic incr (memcached, redis) for the counts to stay exact, and
+    must not evict the pending deltas.
+    """
+
+    DELTA_KEY = "post_likes_delta_{}"
+    DIRTY_KEY = "post_likes_dirty_{}"
+    SEQUENCE_KEY = "post_likes_dirty_seq"
+    FLUSHED_KEY = "post_likes_flushed_seq"
+    FLUSH_LOCK_KEY = "post_likes_flush_lock"
+
+    @staticmethod
+    def _incr(key: str, delta: int) -> int:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key, delta)
+
+    @staticmethod
+    def add(post_id: int, delta: int) -> None:
+        LikeCounterBuffer._incr(LikeCounterBuffer.DELTA_KEY.format(post_id), delta)
+
+        sequence = LikeCounterBuffer._incr(LikeCounterBuffer.SEQUENCE_KEY, 1)
+        cache.set(LikeCounterBuffer.DIRTY_KEY.format(sequence), post_id, timeout=None)
+
+    @staticmethod
+    def pending(post_id: int) -> int:
+        return cache.get(LikeCounterBuffer.DELTA_KEY.format(post_id), 0)
+
+    @staticmethod
+    def pending_many(post_ids: typing.Iterable[int]) -> typing.Dict[int, int]:
+        keys = {
+            LikeCounterBuffer.DELTA_KEY.format(post_id): post_id for post_id in post_ids
+        }
+        found = cache.get_many(list(keys))
+        return {keys[key]: delta for key, delta in found.items() if delta}
+
+    @staticmethod
+    def _dirty_post_ids(keys: typing.List[str]) -> typing.Set[int]:
+        found = cache.get_many(keys)
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            # A toggle that has taken a sequence number but not written its
+            # entry yet. Give it a moment; if it is still missing its delta
+            # stays pending (reads remain exact) and is flushed the next time
+            # that post is toggled.
+            time.sleep(0.05)
+            found.update(cache.get_many(missing))
+
+        return set(found.values())
+
+    @staticmethod
+    def flush() -> int:
+        """Writes pending deltas to the database, returns the posts updated."""
+        # Two flushers applying the same deltas would double count them
+        if not cache.add(LikeCounterBuffer.FLUSH_LOCK_KEY, 1, timeout=60):
+            logger.info("Another like counter flush is running, skipping")
+            return 0
+
+        try:
+            return LikeCounterBuffer._flush()
+        finally:
+            cache.delete(LikeCounterBuffer.FLUSH_LOCK_KEY)
+
+    @staticmethod
+    def _flush() -> int:
+        flushed = cache.get(LikeCounterBuffer.FLUSHED_KEY, 0)
+        sequence = cache.get(LikeCounterBuffer.SEQUENCE_KEY, 0)
+        if sequence <= flushed:
+            return 0
+
+        dirty_keys = [
+            LikeCounterBuffer.DIRTY_KEY.format(n)
+            for n in range(flushed + 1, sequence + 1)
+        ]
+        deltas = LikeCounterBuffer.pending_many(
+            LikeCounterBuffer._dirty_post_ids(dirty_keys)
+        )
+
+        if deltas:
+            subtracted = {}
+            try:
+                with transaction.atomic():
+                    Post.objects.filter(id__in=deltas).update(
+                        likes=F("likes")
+                        + Case(
+                            *[
+                                When(id=post_id, then=Value(delta))
+                                for post_id, delta in deltas.items()
+                            ],
+                            default=Value(0),
+                            output_field=IntegerField(),
+                        ),
+                        updated_at=Now(),
+                    )
+                    # Subtract only what was written, toggles that happened
+                    # meanwhile stay pending for the next flush. Done before
+                    # the commit: a crash in between loses these deltas but
+                    # never writes them twice.
+                    for post_id, delta in deltas.items():
+                        cache.decr(LikeCounterBuffer.DELTA_KEY.format(post_id), delta)
+                        subtracted[post_id] = delta
+            except Exception:
+                # Rolled back, the deltas are pending again
+                for post_id, delta in subtracted.items():
+                    cache.incr(LikeCounterBuffer.DELTA_KEY.format(post_id), delta)
+                raise
+
+        # The dirty log is only moved past once the deltas it points to are
+        # written, a crash before leaves them to the next flush
+        cache.set(LikeCounterBuffer.FLUSHED_KEY, sequence, timeout=None)
+        cache.delete_many(dirty_keys)
+
+        if deltas:
+            logger.info(f"Flushed pending likes of {len(deltas)} posts")
+        return len(deltas)
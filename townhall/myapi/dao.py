@@ -6,7 +6,10 @@ from .models import Chat
 from .models import Project
 from .models import Comment
 from .models import Post
+from .models import PostLike
 from .models import Event
+from .models import WaitlistEntry
+from .models import SignUp
 
 from .types import CreateVolunteerData
 from .types import UpdateVolunteerData
@@ -26,9 +29,27 @@ from .types import CreateProjectData
 from .types import CreateTaskData, UpdateTaskData
 
 from .types import CreatePostData, UpdatePostData
+from .types import CursorPage, Schedule, SignUpResult
+
+from .counters import LikeCounterBuffer
+from . import conditional
+from . import entity_cache
+from . import ical
+from . import identity_map
+from . import matching
+from . import pagination
+from . import schedule
+from . import search
+from . import seats
+from .pagination import paginate_keyset
+from .query_planner import plan_for_serializer
 
 import typing
+from datetime import datetime
 from typing import Optional, List
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Value
+from django.db.models.functions import Now
 from django.db.models.query import QuerySet
 from django.core.exceptions import ObjectDoesNotExist
 from django.forms import ValidationError
@@ -42,7 +63,7 @@ class VolunteerDao:
         return Volunteer.objects.all()
 
     def get_volunteer(id: int) -> typing.Optional[Volunteer]:
-        return Volunteer.objects.get(id=id)
+        return identity_map.get(Volunteer, id)
 
     def create_volunteer(create_volunteer_data: CreateVolunteerData) -> None:
         volunteer = Volunteer.objects.create(
@@ -56,11 +77,33 @@ class VolunteerDao:
 
         return volunteer
 
+    def existing_volunteer_emails(emails: typing.Iterable[str]) -> typing.Set[str]:
+        """The given emails that already belong to a volunteer, in one query."""
+        return set(
+            Volunteer.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+
+    def bulk_create_volunteers(
+        volunteers: typing.List[Volunteer],
+    ) -> typing.List[Volunteer]:
+        """Inserts the volunteers with one query per batch.
+
+        bulk_create() sends no signals, so the search and matching indexes,
+        the cached lookups by id and the table version are updated here.
+        """
+        created = Volunteer.objects.bulk_create(volunteers)
+        for volunteer in created:
+            search.index_instance(volunteer)
+            matching.index_instance(volunteer)
+        entity_cache.forget_many(Volunteer, [volunteer.pk for volunteer in created])
+        conditional.bump(Volunteer)
+        return created
+
     def delete_volunteer(volunteer_id: int) -> None:
-        Volunteer.objects.get(id=volunteer_id).delete()
+        identity_map.get(Volunteer, volunteer_id).delete()
 
     def update_volunteer(update_volunteer_data: UpdateVolunteerData) -> None:
-        volunteer = Volunteer.objects.get(id=update_volunteer_data.id)
+        volunteer = identity_map.get_fresh(Volunteer, update_volunteer_data.id)
 
         if update_volunteer_data.first_name:
             volunteer.first_name = update_volunteer_data.first_name
@@ -94,29 +137,159 @@ class VolunteerDao:
     def filter_all_volunteers(filtersDict) -> QuerySet[Volunteer]:
         return Volunteer.objects.filter(**filtersDict)
 
+    def get_volunteers_page(
+        filtersDict,
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer=None,
+        estimate_total: bool = False,
+    ) -> CursorPage:
+        queryset = Volunteer.objects.filter(**filtersDict)
+
+        total = None
+        if estimate_total:
+            total = pagination.estimate_total(queryset)
+
+        if serializer is not None:
+            # Only load the columns the (possibly sparse) serializer renders
+            queryset = plan_for_serializer(queryset, serializer)
+
+        page = paginate_keyset(
+            queryset,
+            ordering=("last_name", "first_name", "id"),
+            limit=limit,
+            cursor=cursor,
+        )
+        page.estimated_total = total
+        return page
+
+    def get_matching_opportunities(
+        volunteer_id: int, limit: int
+    ) -> typing.List[typing.Tuple[Opportunity, float]]:
+        scores = matching.top_matches("volunteer", volunteer_id, "opportunity", limit)
+        opportunities = Opportunity.objects.in_bulk([id for id, _ in scores])
+        return [
+            (opportunities[id], score) for id, score in scores if id in opportunities
+        ]
+
     def get_all_filtered_opportunities_of_a_volunteer(
         filters_dict,
     ) -> QuerySet[Opportunity]:
         return Opportunity.objects.filter(**filters_dict)
 
-    def add_volunteer_to_opportunity(volunteer_id: int, opportunity_id: int) -> None:
-        opportunity = Opportunity.objects.get(id=opportunity_id)
-        volunteer = Volunteer.objects.get(id=volunteer_id)
-        opportunity.volunteers.add(volunteer)
-        opportunity.save()
+    def get_calendar_feed(volunteer_id: int) -> str:
+        volunteer = identity_map.get(Volunteer, volunteer_id)
+        return ical.volunteer_feed(volunteer)
+
+    def get_schedule(
+        volunteer_id: int,
+        start: typing.Optional[datetime] = None,
+        end: typing.Optional[datetime] = None,
+    ) -> Schedule:
+        volunteer = identity_map.get(Volunteer, volunteer_id)
+        return schedule.schedule(volunteer.pk, start, end)
+
+    def add_volunteer_to_opportunity(
+        volunteer_id: int, opportunity_id: int
+    ) -> SignUpResult:
+        identity_map.get(Volunteer, volunteer_id)
+        return OpportunityDao.reserve_seat(opportunity_id, volunteer_id)
 
     def remove_volunteer_from_opportunity(
         volunteer_id: int, opportunity_id: int
     ) -> None:
-        opportunity = Opportunity.objects.get(id=opportunity_id)
-        volunteer = Volunteer.objects.get(id=volunteer_id)
-        opportunity.volunteers.remove(volunteer)
-        opportunity.save()
+        identity_map.get(Volunteer, volunteer_id)
+        OpportunityDao.remove_volunteers_from_opportunity(
+            opportunity_id, [volunteer_id]
+        )
+
+    def existing_volunteer_ids(ids: typing.Iterable[int]) -> typing.Set[int]:
+        """The given ids that belong to a volunteer, in one query."""
+        return set(Volunteer.objects.filter(id__in=ids).values_list("id", flat=True))
+
+    def add_opportunities_to_volunteer(
+        volunteer_id: int, opportunity_ids: typing.List[int]
+    ) -> None:
+        """Signs the volunteer up for all the opportunities with one insert,
+        the ones they are already signed up for are skipped. Raises
+        schedule.ScheduleConflict when some overlap the volunteer's other
+        shifts or each other, seats.OpportunityFull when some are full, and
+        signs up for none then."""
+        volunteer = identity_map.get(Volunteer, volunteer_id)
+        with transaction.atomic():
+            schedule.lock([volunteer.pk])
+            seats.lock(opportunity_ids)
+            new_ids = set(opportunity_ids) - set(
+                SignUp.objects.filter(
+                    volunteer_id=volunteer.pk, opportunity_id__in=opportunity_ids
+                ).values_list("opportunity_id", flat=True)
+            )
+            new = list(
+                Opportunity.objects.filter(pk__in=new_ids).only(
+                    "start_time", "end_time", "capacity", "filled"
+                )
+            )
+            clashing = schedule.opportunities_with_clashes(volunteer.pk, new)
+            if clashing:
+                raise schedule.ScheduleConflict(clashing)
+            if not seats.take_each(new_ids):
+                # Raising rolls back the seats taken in the other opportunities
+                full = [
+                    opportunity.pk
+                    for opportunity in new
+                    if opportunity.capacity is not None
+                    and opportunity.filled >= opportunity.capacity
+                ]
+                raise seats.OpportunityFull(sorted(full or new_ids))
+            SignUp.objects.bulk_create(
+                [
+                    SignUp(
+                        volunteer_id=volunteer.pk,
+                        opportunity_id=opportunity.pk,
+                        start_time=opportunity.start_time,
+                        end_time=opportunity.end_time,
+                    )
+                    for opportunity in new
+                ],
+                ignore_conflicts=True,
+            )
+            WaitlistEntry.objects.filter(
+                volunteer_id=volunteer.pk, opportunity_id__in=new_ids
+            ).delete()
+        # Only the opportunities signed up for now, the others' caches are valid
+        if new_ids:
+            seats.sign_ups_changed("post_add", volunteer, Opportunity, new_ids)
+
+    def remove_opportunities_from_volunteer(
+        volunteer_id: int, opportunity_ids: typing.List[int]
+    ) -> None:
+        """Also takes the volunteer off those waitlists, the freed seats go to
+        the next volunteers waiting."""
+        volunteer = identity_map.get(Volunteer, volunteer_id)
+        with transaction.atomic():
+            seats.lock(opportunity_ids)
+            WaitlistEntry.objects.filter(
+                volunteer_id=volunteer.pk, opportunity_id__in=opportunity_ids
+            ).delete()
+            removed = list(
+                SignUp.objects.filter(
+                    volunteer_id=volunteer.pk, opportunity_id__in=opportunity_ids
+                ).values_list("opportunity_id", flat=True)
+            )
+            if not removed:
+                return
+            SignUp.objects.filter(
+                volunteer_id=volunteer.pk, opportunity_id__in=removed
+            ).delete()
+            seats.give_back(removed)
+            seats.sign_ups_changed("post_remove", volunteer, Opportunity, removed)
+            for opportunity in Opportunity.objects.filter(pk__in=removed):
+                seats.promote(opportunity)
 
     def change_volunteers_password(
         change_vounteer_password_data: ChangeVolunteerPasswordData,
     ) -> None:
-        volunteer = Volunteer.objects.get(id=change_vounteer_password_data.id)
+        volunteer = identity_map.get_fresh(Volunteer, change_vounteer_password_data.id)
 
         volunteer.password = change_vounteer_password_data.new_password
 
@@ -127,18 +300,32 @@ class OpportunityDao:
 
     def get_opportunity(id: int) -> typing.Optional[Opportunity]:
         try:
-            opportunity = Opportunity.objects.get(id=id)
-            return opportunity
+            return identity_map.get(Opportunity, id)
         except Opportunity.DoesNotExist:
             return None
 
     def get_opportunity_all() -> typing.List[Opportunity]:
         return Opportunity.objects.all()
 
+    def get_opportunity_list(
+        volunteer_id: typing.Optional[int] = None,
+    ) -> QuerySet[Opportunity]:
+        """All opportunities with their sign-ups counted (volunteer_count) and
+        whether the given volunteer is one of them (is_signed_up), in one query
+        instead of loading every roster.
+        """
+        sign_ups = Opportunity.volunteers.through.objects.filter(
+            opportunity_id=OuterRef("pk"), volunteer_id=volunteer_id
+        )
+        return Opportunity.objects.annotate(
+            volunteer_count=Count("volunteers"),
+            is_signed_up=Exists(sign_ups) if volunteer_id else Value(False),
+        ).order_by("id")
+
     def create_opportunity(create_opportunity_data: CreateOpportunityData) -> None:
         try:
-            valid_organization = Organization.objects.get(
-                id=create_opportunity_data.organization_id
+            valid_organization = identity_map.get(
+                Organization, create_opportunity_data.organization_id
             )
         except Organization.DoesNotExist:
             raise ValidationError("This organization does not exist.")
@@ -150,6 +337,7 @@ class OpportunityDao:
             end_time=create_opportunity_data.end_time,
             location=create_opportunity_data.location,
             organization=valid_organization,
+            capacity=create_opportunity_data.capacity,
         )
 
     def filtered_opportunity(
@@ -176,12 +364,14 @@ class OpportunityDao:
             filters["location__icontains"] = filtered_opportunity_data.location
         if filtered_opportunity_data.organization_id:
             filters["organization_id"] = filtered_opportunity_data.organization_id
+        if filtered_opportunity_data.volunteer_id:
+            filters["volunteers__id"] = filtered_opportunity_data.volunteer_id
 
         return Opportunity.objects.filter(**filters)
 
     def delete_opportunity(opportunity_id: int) -> None:
         try:
-            Opportunity.objects.get(id=opportunity_id).delete()
+            identity_map.get(Opportunity, opportunity_id).delete()
         except Opportunity.DoesNotExist:
             pass
 
@@ -189,9 +379,9 @@ class OpportunityDao:
         id: int, update_opportunity_data: UpdateOpportunityData
     ) -> None:
         try:
-            opportunity = Opportunity.objects.get(id=id)
-            valid_organization = Organization.objects.get(
-                id=update_opportunity_data.organization_id
+            opportunity = identity_map.get_fresh(Opportunity, id)
+            valid_organization = identity_map.get(
+                Organization, update_opportunity_data.organization_id
             )
             opportunity.title = update_opportunity_data.title
             opportunity.description = update_opportunity_data.description
@@ -205,27 +395,203 @@ class OpportunityDao:
         except Organization.DoesNotExist:
             raise ValidationError("This organization does not exist.")
 
-    def add_volunteer_to_opportunity(opportunity_id: int, volunteer_id: int) -> None:
+    def add_volunteer_to_opportunity(
+        opportunity_id: int, volunteer_id: int
+    ) -> typing.Optional[SignUpResult]:
         try:
-            opportunity = Opportunity.objects.get(id=opportunity_id)
-            volunteer = Volunteer.objects.get(id=volunteer_id)
-            opportunity.volunteers.add(volunteer)
-            opportunity.save()
+            identity_map.get(Volunteer, volunteer_id)
+            return OpportunityDao.reserve_seat(opportunity_id, volunteer_id)
         except (Opportunity.DoesNotExist, Volunteer.DoesNotExist):
             pass
 
+    def reserve_seat(opportunity_id: int, volunteer_id: int) -> SignUpResult:
+        """Signs the volunteer up, or puts them on the waitlist when the
+        opportunity is full. Signing up twice changes nothing. Raises
+        schedule.ScheduleConflict when the volunteer has an overlapping shift.
+
+        The overlap check runs under a lock on the volunteer so concurrent
+        sign-ups of one volunteer can't both pass it. The seat is taken before
+        the sign-up row is inserted, with one conditional UPDATE (seats.take),
+        so concurrent sign-ups never count more volunteers than the capacity;
+        only a full opportunity is locked to check it again before waitlisting.
+        """
+        opportunity = identity_map.get(Opportunity, opportunity_id)
+        with transaction.atomic():
+            schedule.lock([volunteer_id])
+            clashing = schedule.clashes(volunteer_id, opportunity)
+            if clashing:
+                raise schedule.ScheduleConflict(clashing)
+            if not seats.take(opportunity.pk):
+                # A removal may be handing the last seat to the waitlist, wait
+                # for it and look again
+                seats.lock([opportunity.pk])
+                if not seats.take(opportunity.pk):
+                    if SignUp.objects.filter(
+                        opportunity_id=opportunity.pk, volunteer_id=volunteer_id
+                    ).exists():
+                        return SignUpResult(signed_up=True)
+                    return SignUpResult(
+                        signed_up=False,
+                        waitlist_position=seats.wait(opportunity.pk, volunteer_id),
+                    )
+            try:
+                with transaction.atomic():
+                    SignUp.objects.create(
+                        opportunity_id=opportunity.pk,
+                        volunteer_id=volunteer_id,
+                        start_time=opportunity.start_time,
+                        end_time=opportunity.end_time,
+                    )
+            except IntegrityError:
+                # Already signed up, that sign-up holds its own seat
+                seats.give_back([opportunity.pk])
+                return SignUpResult(signed_up=True)
+            WaitlistEntry.objects.filter(
+                opportunity_id=opportunity.pk, volunteer_id=volunteer_id
+            ).delete()
+            seats.sign_ups_changed("post_add", opportunity, Volunteer, [volunteer_id])
+        return SignUpResult(signed_up=True)
+
+    def get_opportunities_in_window(
+        start: datetime, end: datetime, organization_id: typing.Optional[int] = None
+    ) -> QuerySet[Opportunity]:
+        """The opportunities overlapping [start, end), in time order. A range
+        scan of the end_time indexes from start on."""
+        opportunities = Opportunity.objects.filter(
+            end_time__gt=start, start_time__lt=end
+        )
+        if organization_id is not None:
+            opportunities = opportunities.filter(organization_id=organization_id)
+        return opportunities.order_by("start_time", "id")
+
+    def existing_opportunity_ids(ids: typing.Iterable[int]) -> typing.Set[int]:
+        """The given ids that belong to an opportunity, in one query."""
+        return set(
+            Opportunity.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+
+    def add_volunteers_to_opportunity(
+        opportunity_id: int, volunteer_ids: typing.List[int]
+    ) -> None:
+        """Signs all the volunteers up with one insert, the ones already signed
+        up are skipped. Raises schedule.ScheduleConflict when some have an
+        overlapping shift, seats.OpportunityFull when there aren't seats for
+        all of them, and signs up none then."""
+        opportunity = identity_map.get(Opportunity, opportunity_id)
+        with transaction.atomic():
+            schedule.lock(volunteer_ids)
+            seats.lock([opportunity.pk])
+            new_ids = set(volunteer_ids) - set(
+                SignUp.objects.filter(
+                    opportunity_id=opportunity.pk, volunteer_id__in=volunteer_ids
+                ).values_list("volunteer_id", flat=True)
+            )
+            clashing = schedule.volunteers_with_clashes(new_ids, opportunity)
+            if clashing:
+                raise schedule.ScheduleConflict(clashing)
+            if new_ids and not seats.take(opportunity.pk, len(new_ids)):
+                raise seats.OpportunityFull([opportunity.pk])
+
+            SignUp.objects.bulk_create(
+                [
+                    SignUp(
+                        opportunity_id=opportunity.pk,
+                        volunteer_id=volunteer_id,
+                        start_time=opportunity.start_time,
+                        end_time=opportunity.end_time,
+                    )
+                    for volunteer_id in new_ids
+                ],
+                ignore_conflicts=True,
+            )
+            WaitlistEntry.objects.filter(
+                opportunity_id=opportunity.pk, volunteer_id__in=new_ids
+            ).delete()
+        # Only the volunteers signed up now, the others' caches are still valid
+        if new_ids:
+            seats.sign_ups_changed("post_add", opportunity, Volunteer, new_ids)
+
+    def remove_volunteers_from_opportunity(
+        opportunity_id: int, volunteer_ids: typing.List[int]
+    ) -> typing.List[int]:
+        """Also takes the volunteers off the waitlist, the freed seats go to the
+        next volunteers waiting. Returns the volunteers promoted."""
+        opportunity = identity_map.get(Opportunity, opportunity_id)
+        with transaction.atomic():
+            seats.lock([opportunity.pk])
+            WaitlistEntry.objects.filter(
+                opportunity_id=opportunity.pk, volunteer_id__in=volunteer_ids
+            ).delete()
+            removed = list(
+                SignUp.objects.filter(
+                    opportunity_id=opportunity.pk, volunteer_id__in=volunteer_ids
+                ).values_list("volunteer_id", flat=True)
+            )
+            if not removed:
+                return []
+            SignUp.objects.filter(
+                opportunity_id=opportunity.pk, volunteer_id__in=removed
+            ).delete()
+            seats.give_back([opportunity.pk], len(removed))
+            seats.sign_ups_changed("post_remove", opportunity, Volunteer, removed)
+            return seats.promote(opportunity)
+
+    def fill_from_waitlist(opportunity_id: int) -> typing.List[int]:
+        """Gives the free seats to the waitlist, e.g. after the capacity grew.
+        Returns the volunteers promoted."""
+        opportunity = identity_map.get(Opportunity, opportunity_id)
+        with transaction.atomic():
+            seats.lock([opportunity.pk])
+            return seats.promote(opportunity)
+
+    def get_waitlist(opportunity_id: int) -> QuerySet[Volunteer]:
+        """The volunteers waiting for a seat, first in line first."""
+        opportunity = identity_map.get(Opportunity, opportunity_id)
+        return Volunteer.objects.filter(
+            waitlistentry__opportunity_id=opportunity.pk
+        ).order_by("waitlistentry__id")
+
+    def get_matching_volunteers(
+        opportunity_id: int, limit: int
+    ) -> typing.List[typing.Tuple[Volunteer, float]]:
+        scores = matching.top_matches("opportunity", opportunity_id, "volunteer", limit)
+        volunteers = Volunteer.objects.in_bulk([id for id, _ in scores])
+        return [(volunteers[id], score) for id, score in scores if id in volunteers]
+
     def get_all_volunteers_of_a_opportunity(opportunity_id: int) -> QuerySet[Volunteer]:
         try:
-            opportunity = Opportunity.objects.get(id=opportunity_id)
+            opportunity = identity_map.get(Opportunity, opportunity_id)
             return opportunity.volunteers.all()
         except Opportunity.DoesNotExist:
             pass
 
+    def get_volunteers_page(
+        opportunity_id: int,
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer=None,
+    ) -> typing.Optional[CursorPage]:
+        """A page of the opportunity's roster, None if there is no such
+        opportunity."""
+        queryset = OpportunityDao.get_all_volunteers_of_a_opportunity(opportunity_id)
+        if queryset is None:
+            return None
+
+        if serializer is not None:
+            queryset = plan_for_serializer(queryset, serializer)
+
+        return paginate_keyset(
+            queryset,
+            ordering=("last_name", "first_name", "id"),
+            limit=limit,
+            cursor=cursor,
+        )
+
     def get_all_opportunities_of_a_volunteer(
         volunteer_id: int,
     ) -> QuerySet[Opportunity]:
         try:
-            volunteer = Volunteer.objects.get(id=volunteer_id)
+            volunteer = identity_map.get(Volunteer, volunteer_id)
             return volunteer.opportunities.all()
         except Volunteer.DoesNotExist:
             pass
@@ -234,28 +600,36 @@ class OpportunityDao:
         opportunity_id: int, volunteer_id: int
     ) -> None:
         try:
-            opportunity = Opportunity.objects.get(id=opportunity_id)
-            volunteer = Volunteer.objects.get(id=volunteer_id)
-            opportunity.volunteers.remove(volunteer)
-            opportunity.save()
+            identity_map.get(Volunteer, volunteer_id)
+            OpportunityDao.remove_volunteers_from_opportunity(
+                opportunity_id, [volunteer_id]
+            )
         except (Opportunity.DoesNotExist, Volunteer.DoesNotExist):
             pass
 
     def remove_all_volunteers_from_opportunity(opportunity_id: int) -> None:
         try:
-            opportunity = Opportunity.objects.get(id=opportunity_id)
-            opportunity.volunteers.clear()
-            opportunity.save()
+            opportunity = identity_map.get(Opportunity, opportunity_id)
         except Opportunity.DoesNotExist:
-            pass
+            return
+        OpportunityDao.remove_volunteers_from_opportunity(
+            opportunity.pk,
+            list(opportunity.volunteers.values_list("id", flat=True)),
+        )
 
     def remove_all_opportunities_from_volunteer(volunteer_id: int) -> None:
         try:
-            volunteer = Volunteer.objects.get(id=volunteer_id)
-            volunteer.opportunities.clear()
-            volunteer.save()
+            volunteer = identity_map.get(Volunteer, volunteer_id)
         except Volunteer.DoesNotExist:
-            pass
+            return
+        waitlisted = WaitlistEntry.objects.filter(volunteer=volunteer)
+        VolunteerDao.remove_opportunities_from_volunteer(
+            volunteer.pk,
+            list(
+                set(volunteer.opportunities.values_list("id", flat=True))
+                | set(waitlisted.values_list("opportunity_id", flat=True))
+            ),
+        )
 
 
 class OrganizationDao:
@@ -268,10 +642,13 @@ class OrganizationDao:
             website=create_organization_data.website,
         )
 
+    def get_calendar_feed(organization_id: int) -> str:
+        organization = identity_map.get(Organization, organization_id)
+        return ical.organization_feed(organization)
+
     def get_organization(id: int) -> typing.Optional[Organization]:
         try:
-            organization = Organization.objects.get(id=id)
-            return organization
+            return identity_map.get(Organization, id)
         except Organization.DoesNotExist:
             return None
 
@@ -280,13 +657,15 @@ class OrganizationDao:
 
     def delete_organization(organization_id: int) -> None:
         try:
-            Organization.objects.get(id=organization_id).delete()
+            identity_map.get(Organization, organization_id).delete()
         except Organization.DoesNotExist:
             pass
 
     def update_organization(update_organization_data: UpdateOrganizationData) -> None:
         try:
-            organization = Organization.objects.get(id=update_organization_data.id)
+            organization = identity_map.get_fresh(
+                Organization, update_organization_data.id
+            )
             organization.name = update_organization_data.name
             organization.location = update_organization_data.location
             organization.email = update_organization_data.email
@@ -323,7 +702,16 @@ class TaskDao:
     def get_task_by_id(task_id: int) -> Optional[Task]:
 
         try:
-            return Task.objects.get(id=task_id)
+            return identity_map.get(Task, task_id)
+        except ObjectDoesNotExist:
+            return None
+
+    @staticmethod
+    def get_task_for_update(task_id: int) -> Optional[Task]:
+        """get_task_by_id() from the database, for a task about to be saved."""
+
+        try:
+            return identity_map.get_fresh(Task, task_id)
         except ObjectDoesNotExist:
             return None
 
@@ -344,7 +732,7 @@ class TaskDao:
     def update_task(task_data: UpdateTaskData) -> Optional[Task]:
 
         try:
-            task = Task.objects.get(id=task_data.id)
+            task = identity_map.get_fresh(Task, task_data.id)
             # Update only the fields provided in UpdateTaskData (partial updates)
             if task_data.name is not None:
                 task.name = task_data.name
@@ -367,7 +755,7 @@ class TaskDao:
     def delete_task(task_id: int) -> None:
 
         try:
-            task = Task.objects.get(id=task_id)
+            task = identity_map.get(Task, task_id)
             task.delete()
         except Task.DoesNotExist:
             pass
@@ -409,8 +797,7 @@ class ProjectDao:
     @staticmethod
     def get_project(id: int) -> typing.Optional[Project]:
         try:
-            project = Project.objects.get(id=id)
-            return project
+            return identity_map.get(Project, id)
         except Project.DoesNotExist:
             return None
 
@@ -434,24 +821,84 @@ class ProjectDao:
 class CommentDao:
 
     def create_comment(create_comment_data: CreateCommentData) -> None:
-        comment = Comment.objects.create(
-            user_id=create_comment_data.user_id,
-            post_id=create_comment_data.post_id,
-            content=create_comment_data.content,
-            created_at=create_comment_data.created_at,
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                user_id=create_comment_data.user_id,
+                post_id=create_comment_data.post_id,
+                content=create_comment_data.content,
+                created_at=create_comment_data.created_at,
+            )
+            Post.objects.filter(id=create_comment_data.post_id).update(
+                comment_count=F("comment_count") + 1, updated_at=Now()
+            )
+            identity_map.forget(Post, create_comment_data.post_id)
 
         return comment
 
+    def delete_comment(comment: Comment) -> None:
+        # The post's comment_count is lowered by a post_delete receiver (see
+        # signals.py), which also sees comments deleted along with their user
+        Comment.objects.filter(id=comment.id).delete()
+
+    def get_comments_page(
+        post_id: int,
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer_class=None,
+    ) -> CursorPage:
+        queryset = Comment.objects.filter(post_id=post_id)
+        if serializer_class is not None:
+            queryset = plan_for_serializer(queryset, serializer_class)
+
+        return paginate_keyset(
+            queryset, ordering=("-created_at", "-id"), limit=limit, cursor=cursor
+        )
+
 
 class PostDao:
 
-    def get_post(id: int) -> typing.Optional[Post]:
-        return Post.objects.get(id=id)
+    def get_queryset(
+        serializer_class=None, comment_preview: typing.Optional[int] = None
+    ) -> QuerySet[Post]:
+        # When the caller says which serializer will render the posts, load its
+        # nested volunteers, likers and comments up front (constant queries)
+        queryset = Post.objects.all()
+        if serializer_class is not None:
+            to_many_limits = None
+            if comment_preview is not None:
+                # Only the newest comments of each post, the rest are paged
+                # through CommentDao.get_comments_page
+                to_many_limits = {
+                    "comment_set": (("-created_at", "-id"), comment_preview)
+                }
+            queryset = plan_for_serializer(
+                queryset, serializer_class, to_many_limits=to_many_limits
+            )
+        return queryset
+
+    def exists(id: int) -> bool:
+        return Post.objects.filter(id=id).exists()
+
+    def get_post(id: int, serializer_class=None) -> typing.Optional[Post]:
+        return PostDao.get_queryset(serializer_class).get(id=id)
 
     def get_all_posts() -> typing.List[Post]:
         return Post.objects.all()
 
+    def get_posts_page(
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer_class=None,
+        comment_preview: typing.Optional[int] = None,
+    ) -> CursorPage:
+        # Newest first; id breaks ties between posts created at the same instant
+        return paginate_keyset(
+            PostDao.get_queryset(serializer_class, comment_preview=comment_preview),
+            ordering=("-created_at", "-id"),
+            limit=limit,
+            cursor=cursor,
+        )
+
     def create_post(post_data: CreatePostData) -> Post:
         post = Post.objects.create(
             volunteer_id=post_data.volunteer_id,
@@ -464,7 +911,7 @@ class PostDao:
 
     def update_post(id: int, post_data: UpdatePostData) -> Post:
         try:
-            post = Post.objects.get(id=id)
+            post = identity_map.get(Post, id)
         except Post.DoesNotExist:
             raise ValidationError(f"Post with ID {id} does not exist.")
 
@@ -477,9 +924,62 @@ class PostDao:
 
         return post
 
+    def toggle_like(
+        post_id: int, volunteer_id: int, write_behind: bool = False
+    ) -> typing.Tuple[bool, int]:
+        """Likes the post for the volunteer, or unlikes it if already liked.
+
+        Costs a constant number of queries and stays exact under concurrent
+        toggles: whether a like exists is decided by the database (rows
+        deleted / unique constraint hit), never by a list read into Python,
+        and the counter only moves with F() expressions. With write_behind
+        the counter change goes to the LikeCounterBuffer instead of the row.
+
+        Returns whether the post is now liked and its stored like count.
+        """
+        if not Post.objects.filter(id=post_id).exists():
+            raise Post.DoesNotExist(f"Post with ID {post_id} does not exist.")
+        if not Volunteer.objects.filter(id=volunteer_id).exists():
+            raise Volunteer.DoesNotExist(
+                f"Volunteer with ID {volunteer_id} does not exist."
+            )
+
+        with transaction.atomic():
+            unliked, _ = PostLike.objects.filter(
+                post_id=post_id, volunteer_id=volunteer_id
+            ).delete()
+
+            if unliked:
+                liked, delta = False, -1
+            else:
+                liked, delta = True, 1
+                try:
+                    with transaction.atomic():
+                        PostLike.objects.create(
+                            post_id=post_id, volunteer_id=volunteer_id
+                        )
+                except IntegrityError:
+                    # A concurrent request inserted the same like first and
+                    # counted it, so there is nothing left to count here
+                    delta = 0
+
+            if delta and write_behind:
+                transaction.on_commit(
+                    lambda: LikeCounterBuffer.add(post_id, delta)
+                )
+            elif delta:
+                Post.objects.filter(id=post_id).update(
+                    likes=F("likes") + delta, updated_at=Now()
+                )
+                identity_map.forget(Post, post_id)
+
+            likes = Post.objects.values_list("likes", flat=True).get(id=post_id)
+
+        return liked, likes
+
     def delete_post(post_id):
         try:
-            post = Post.objects.get(id=post_id)
+            post = identity_map.get(Post, post_id)
             post.delete()
         except Post.DoesNotExist:
             raise ValueError(f"Post with ID {post_id} does not exist.")
@@ -498,3 +998,22 @@ class EventDao:
         )
 
         return event
+
+    def get_events_in_window(
+        start: datetime, end: datetime, organization_id: typing.Optional[int] = None
+    ) -> QuerySet[Event]:
+        """The events overlapping [start, end), in time order. A range scan
+        of the end_time indexes from start on."""
+        events = Event.objects.filter(end_time__gt=start, start_time__lt=end)
+        if organization_id is not None:
+            events = events.filter(organization_id=organization_id)
+        return events.order_by("start_time", "id")
+
+
+class SearchDao:
+
+    @staticmethod
+    def search(
+        query: str, kinds: typing.Optional[List[str]] = None, limit: int = 20
+    ) -> List[search.SearchHit]:
+        return search.search(query, kinds=kinds, limit=limit)
@@ -0,0 +1,94 @@
+import typing
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Model
+from django.db.models.base import DEFERRED
+
+from . import caching
+from .models import Opportunity, Organization, Project, Task, Volunteer
+
+# Read-through cache of single rows looked up by primary key in the DAOs.
+#
+# Rows are cached as their column values (never as shared model instances, a
+# caller changing a returned object must not change what others read) and
+# rebuilt with Model.from_db(), so every lookup gets its own instance. Missing
+# rows are cached too. The signal receivers in signals.py forget a row when
+# it is saved or deleted or when its many-to-many relations change; code that
+# writes these models with QuerySet.update() or bulk_create() sends no signals
+# and has to call forget() itself.
+#
+# Inside a transaction nothing is read from or written to the cache: the rows
+# seen there may never be committed, and other workers could read them.
+
+CACHED_MODELS = (Volunteer, Organization, Opportunity, Project, Task)
+
+# Columns that stay out of the shared cache, they are loaded from the database
+# when accessed (deferred)
+UNCACHED_FIELDS = {
+    Volunteer: {"password"},
+}
+
+# Bump when the cached columns change, so old entries are never read back
+VERSION = 1
+
+
+def _enabled() -> bool:
+    return getattr(settings, "ENTITY_CACHE_ENABLED", True)
+
+
+def _cache(model) -> caching.TwoTierCache:
+    return caching.for_model(model, version=VERSION)
+
+
+def _cached_fields(model) -> typing.List[str]:
+    excluded = UNCACHED_FIELDS.get(model, set())
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name not in excluded
+    ]
+
+
+def _load_row(model, pk) -> typing.Optional[typing.Dict]:
+    return model.objects.filter(pk=pk).values(*_cached_fields(model)).first()
+
+
+def _instance(model, row: typing.Dict) -> Model:
+    field_names = [field.attname for field in model._meta.concrete_fields]
+    values = [row.get(name, DEFERRED) for name in field_names]
+    return model.from_db(router.db_for_read(model), field_names, values)
+
+
+def get(model, pk) -> Model:
+    """
+    model.objects.get(pk=pk) through the cache, raises model.DoesNotExist
+    when there is no such row.
+    """
+    if not _enabled() or model not in CACHED_MODELS or caching.in_transaction(model):
+        return model.objects.get(pk=pk)
+
+    row = _cache(model).get_or_set(pk, lambda: _load_row(model, pk))
+    if row is None:
+        raise model.DoesNotExist(
+            f"{model._meta.object_name} matching query does not exist."
+        )
+    return _instance(model, row)
+
+
+def forget_many(model, pks: typing.Iterable) -> None:
+    if not _enabled() or model not in CACHED_MODELS:
+        return
+
+    pks = list(pks)
+    _cache(model).delete_many(pks)
+    if caching.in_transaction(model):
+        # Another worker may cache the old row again before the commit
+        transaction.on_commit(
+            lambda: _cache(model).delete_many(pks),
+            using=router.db_for_write(model),
+        )
+
+
+def forget(model, pk) -> None:
+    forget_many(model, [pk])
@@ -0,0 +1,176 @@
+import csv
+import datetime
+import typing
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+
+from .serializers import FilteredOpportunitySerializer, OptionalVolunteerSerializer
+from .types import FilteredOpportunityData, FilterVolunteerData
+
+# Streaming exports of whole tables as CSV or NDJSON.
+#
+# Rows are read as plain tuples (values_list, no model instances and no
+# serializer) in chunks of settings.EXPORT_CHUNK_SIZE with
+# QuerySet.iterator(), and every row is written out as soon as it is read,
+# so an export takes the same memory whatever the size of the table.
+# Many-to-many relations are not exported, they would need a query per row
+# or a prefetch holding the whole table.
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+VOLUNTEER_FIELDS = [
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "gender",
+    "pronouns",
+    "title",
+    "primary_organization",
+    "is_active",
+]
+
+OPPORTUNITY_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "start_time",
+    "end_time",
+    "location",
+    "organization_id",
+]
+
+TASK_FIELDS = [
+    "id",
+    "name",
+    "description",
+    "deadline",
+    "status",
+    "assigned_to_id",
+    "created_by_id",
+    "organization_id",
+]
+
+
+def parse_output(value: typing.Optional[str]) -> str:
+    """The export format asked for, CSV by default."""
+    if value is None:
+        return "csv"
+    if value not in FORMATS:
+        raise serializers.ValidationError(
+            {"output": [f"Must be one of: {', '.join(FORMATS)}."]}
+        )
+    return value
+
+
+def filter_volunteer_data(params) -> typing.Optional[FilterVolunteerData]:
+    """
+    The volunteer filters of the query parameters (or command options),
+    raises serializers.ValidationError for invalid ones.
+    """
+    serializer = OptionalVolunteerSerializer(data=params)
+    # The serializer wants at least one value, no filter means all volunteers
+    if not any(name in params for name in serializer.fields):
+        return None
+    serializer.is_valid(raise_exception=True)
+    validated_data = serializer.validated_data
+
+    return FilterVolunteerData(
+        first_name=validated_data.get("first_name", None),
+        last_name=validated_data.get("last_name", None),
+        email=validated_data.get("email", None),
+        gender=validated_data.get("gender", None),
+        is_active=validated_data.get("is_active", None),
+    )
+
+
+def filtered_opportunity_data(params) -> FilteredOpportunityData:
+    """
+    The opportunity filters of the query parameters (or command options),
+    raises serializers.ValidationError for invalid ones.
+    """
+    serializer = FilteredOpportunitySerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    validated_data = serializer.validated_data
+
+    volunteer_id = params.get("volunteer_id")
+    if volunteer_id is not None:
+        try:
+            volunteer_id = int(volunteer_id)
+        except ValueError:
+            raise serializers.ValidationError(
+                {"volunteer_id": ["A valid integer is required."]}
+            )
+
+    return FilteredOpportunityData(
+        title=validated_data.get("title", None),
+        starting_start_time=validated_data.get("starting_start_time", None),
+        starting_end_time=validated_data.get("starting_end_time", None),
+        ending_start_time=validated_data.get("ending_start_time", None),
+        ending_end_time=validated_data.get("ending_end_time", None),
+        location=validated_data.get("location", None),
+        organization_id=validated_data.get("organization_id", None),
+        volunteer_id=volunteer_id,
+    )
+
+
+def _rows(queryset: QuerySet, fields: typing.List[str]) -> typing.Iterator[tuple]:
+    chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    # Ordered by primary key so exports of the same rows come out the same
+    return queryset.order_by("pk").values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(fields, rows) -> typing.Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def _ndjson_lines(fields, rows) -> typing.Iterator[str]:
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+def lines(
+    queryset: QuerySet, fields: typing.List[str], output: str
+) -> typing.Iterator[str]:
+    """The rows of queryset as lines of the given output format."""
+    if output not in FORMATS:
+        raise ValueError(f"Unknown export format {output!r}.")
+
+    rows = _rows(queryset, fields)
+    if output == "csv":
+        return _csv_lines(fields, rows)
+    return _ndjson_lines(fields, rows)
+
+
+def streaming_response(
+    queryset: QuerySet, fields: typing.List[str], output: str, filename: str
+) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(
+        lines(queryset, fields, output), content_type=FORMATS[output]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,124 @@
+import concurrent.futures
+import contextlib
+import logging
+import time
+import typing
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Password hashing for volunteer logins.
+#
+# The hashers below are Django's own with their cost parameters taken from
+# settings.PASSWORD_HASHER_PARAMS. They keep Django's algorithm names, so
+# check_password() reports a hash made with other parameters (or by a hasher
+# that is no longer first in PASSWORD_HASHERS) as needing an update and
+# verify_login_password() re-hashes it on the next successful login.
+
+# Longer passwords are rejected before hashing, hashing megabytes of input
+# is an easy way to burn CPU
+MAX_PASSWORD_LENGTH = 4096
+
+LOGIN_HASH_SECONDS = Histogram(
+    "login_hash_seconds",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class TunedParametersMixin:
+    def __init__(self):
+        params = getattr(settings, "PASSWORD_HASHER_PARAMS", {})
+        for name, value in params.get(self.algorithm, {}).items():
+            if not hasattr(self, name):
+                raise ImproperlyConfigured(
+                    f"Unknown {self.algorithm} hasher parameter: {name}"
+                )
+            setattr(self, name, value)
+
+
+class ScryptPasswordHasher(TunedParametersMixin, hashers.ScryptPasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(TunedParametersMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class PBKDF2PasswordHasher(TunedParametersMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+def is_hashed(value: typing.Optional[str]) -> bool:
+    """Whether ``value`` is an encoded hash of any configured hasher."""
+    if not value or not hashers.is_password_usable(value):
+        # Unusable passwords ("!...") are stored as is
+        return bool(value)
+    try:
+        hashers.identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+def verify_login_password(volunteer, password: typing.Optional[str]) -> bool:
+    """check_password() for a login attempt.
+
+    ``volunteer`` is None when no account has the given email; a hash is still
+    computed then (and for accounts without a usable password), so the
+    response time does not tell whether the account exists. Outdated hashes
+    are upgraded on success and every hash time is recorded in
+    LOGIN_HASH_SECONDS.
+    """
+    if not password or len(password) > MAX_PASSWORD_LENGTH:
+        return False
+
+    def upgrade(raw_password):
+        volunteer.password = hashers.make_password(raw_password)
+        volunteer.save(update_fields=["password"])
+        logger.info(f"Upgraded the password hash of volunteer ID: {volunteer.id}")
+
+    started = time.perf_counter()
+    if volunteer is None or not hashers.is_password_usable(volunteer.password):
+        # check_password() returns at once for unusable passwords, hash
+        # anyway so those accounts don't stand out either
+        hashers.make_password(password)
+        valid = False
+    else:
+        valid = hashers.check_password(password, volunteer.password, setter=upgrade)
+    elapsed = time.perf_counter() - started
+
+    LOGIN_HASH_SECONDS.observe(elapsed)
+    logger.debug(f"Login password check took {elapsed * 1000:.1f}ms")
+    return valid
+
+
+@contextlib.contextmanager
+def hashing_pool(workers: int):
+    """
+    Worker pool for make_passwords(), or None to hash in the calling thread.
+
+    Threads are enough: the hashers spend their time in hashlib (scrypt,
+    PBKDF2) or argon2-cffi, which release the GIL while hashing.
+    """
+    if workers <= 1:
+        yield None
+        return
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="hashing"
+    ) as pool:
+        yield pool
+
+
+def make_passwords(
+    passwords: typing.List[str],
+    pool: typing.Optional[concurrent.futures.Executor] = None,
+) -> typing.List[str]:
+    """make_password() of each password, spread over the pool's workers."""
+    if pool is None:
+        return [hashers.make_password(password) for password in passwords]
+    return list(pool.map(hashers.make_password, passwords))
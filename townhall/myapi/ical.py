@@ -0,0 +1,250 @@
+import json
+import typing
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+from rest_framework import renderers
+
+from . import response_cache
+from .models import Event, Opportunity, Organization, SignUp, Volunteer
+
+# iCalendar (RFC 5545) feeds for calendar apps to subscribe to: the
+# opportunities and events of an organization, the opportunities a volunteer
+# signed up for.
+#
+# Calendar apps poll their feeds every few minutes. The feed views are
+# wrapped in response_cache.cached_response() and tagged with the rows they
+# show, so a poll costs cache reads and no query until one of those rows
+# changes and the receivers in signals.py purge its tags. GET /calendar/ is
+# cached under the same tags.
+#
+# A feed is built again incrementally. Every VEVENT is cached on its own,
+# keyed by its row's updated_at: one query lists the feed's rows with their
+# updated_at and only the rows changed since their VEVENT was cached are
+# loaded and rendered.
+#
+# Opportunities and events remember the organization they were loaded with
+# (remember_organization(), on post_init) so one moved to another
+# organization is purged from the feeds of both.
+
+cache = ConnectionProxy(caches, "shared")
+
+PRODID = "-//Townhall//Calendar feeds//EN"
+UID_DOMAIN = "townhall"
+
+
+class ICalendarRenderer(renderers.BaseRenderer):
+    """Renders feeds given as text, anything else (errors) as JSON."""
+
+    media_type = "text/calendar"
+    format = "ics"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data).encode(self.charset)
+
+
+def _timeout() -> int:
+    return getattr(settings, "CALENDAR_FEED_CACHE_TIMEOUT", 86400)
+
+
+def _since() -> datetime:
+    """Feeds leave out what ended before this."""
+    days = getattr(settings, "CALENDAR_FEED_PAST_DAYS", 90)
+    return timezone.now() - timedelta(days=days)
+
+
+def window_tags(request) -> typing.List[str]:
+    """Tags for cached_response() of GET /calendar/?org="""
+    org = request.query_params.get("org")
+    if org and org.isdigit():
+        return [f"calendar:org:{int(org)}"]
+    return ["calendar:all"]
+
+
+def organization_tags(request, org_id: int) -> typing.List[str]:
+    return [f"calendar:org:{org_id}"]
+
+
+def volunteer_tags(request, vol_id: int) -> typing.List[str]:
+    """The volunteer's tag and the tags of the opportunities in their feed."""
+    opportunity_ids = SignUp.objects.filter(
+        volunteer_id=vol_id, end_time__gt=_since()
+    ).values_list("opportunity_id", flat=True)
+    return [f"calendar:volunteer:{vol_id}"] + [
+        f"calendar:opportunity:{id}" for id in opportunity_ids
+    ]
+
+
+def remember_organization(instance) -> None:
+    """Notes the organization the opportunity or event was loaded or last
+    saved with, None when the field was deferred."""
+    instance._calendar_organization_id = instance.__dict__.get("organization_id")
+
+
+def _organization_tags(instance) -> typing.List[str]:
+    """The feeds of the row's organization and of the one it moved from."""
+    ids = {
+        instance.organization_id,
+        getattr(instance, "_calendar_organization_id", None),
+    }
+    remember_organization(instance)
+    return [f"calendar:org:{id}" for id in sorted(ids - {None})]
+
+
+def purge(model, instance) -> None:
+    """Drops the cached feeds and windows showing the saved or deleted row."""
+    if model is Opportunity:
+        tags = [
+            "calendar:all",
+            *_organization_tags(instance),
+            f"calendar:opportunity:{instance.pk}",
+        ]
+    elif model is Event:
+        tags = ["calendar:all", *_organization_tags(instance)]
+    elif model is Organization:
+        tags = [f"calendar:org:{instance.pk}"]
+    elif model is Volunteer:
+        tags = [f"calendar:volunteer:{instance.pk}"]
+    else:
+        return
+    response_cache.purge_tags(model, tags)
+
+
+def purge_sign_ups(instance, reverse: bool, pk_set) -> None:
+    """Drops the cached feeds of the volunteers whose sign-ups changed."""
+    if reverse:
+        tags = [f"calendar:volunteer:{instance.pk}"]
+    elif pk_set:
+        tags = [f"calendar:volunteer:{id}" for id in pk_set]
+    else:
+        # Cleared, the feeds that showed the opportunity
+        tags = [f"calendar:opportunity:{instance.pk}"]
+    response_cache.purge_tags(SignUp, tags)
+
+
+def organization_feed(organization: Organization) -> str:
+    since = _since()
+    return _calendar(
+        organization.name,
+        _vevents(
+            "opportunity",
+            Opportunity.objects.filter(
+                organization_id=organization.pk, end_time__gt=since
+            ),
+        )
+        + _vevents(
+            "event",
+            Event.objects.filter(organization_id=organization.pk, end_time__gt=since),
+        ),
+    )
+
+
+def volunteer_feed(volunteer: Volunteer) -> str:
+    return _calendar(
+        f"{volunteer.first_name} {volunteer.last_name}".strip() or volunteer.email,
+        _vevents(
+            "opportunity",
+            Opportunity.objects.filter(
+                signup__volunteer_id=volunteer.pk, signup__end_time__gt=_since()
+            ),
+        ),
+    )
+
+
+def _vevents(kind: str, queryset) -> typing.List[typing.Tuple[datetime, str, int, str]]:
+    """The VEVENTs of the rows, rendering the ones changed since cached."""
+    stamps = list(queryset.values_list("pk", "start_time", "updated_at"))
+    keys = {
+        pk: f"ical:{kind}:{pk}:{updated_at.timestamp()}" for pk, _, updated_at in stamps
+    }
+    found = cache.get_many(list(keys.values()))
+
+    missing = [pk for pk, key in keys.items() if key not in found]
+    if missing:
+        rendered = {
+            keys[row.pk]: _vevent(kind, row)
+            for row in queryset.model.objects.filter(pk__in=missing)
+        }
+        cache.set_many(rendered, timeout=_timeout())
+        found.update(rendered)
+
+    # A row deleted meanwhile has no VEVENT
+    return [
+        (start_time, kind, pk, found[keys[pk]])
+        for pk, start_time, _ in stamps
+        if keys[pk] in found
+    ]
+
+
+def _vevent(kind: str, row) -> str:
+    return _lines(
+        "BEGIN:VEVENT",
+        f"UID:{kind}-{row.pk}@{UID_DOMAIN}",
+        f"DTSTAMP:{_utc(row.updated_at)}",
+        f"LAST-MODIFIED:{_utc(row.updated_at)}",
+        f"DTSTART:{_utc(row.start_time)}",
+        f"DTEND:{_utc(row.end_time)}",
+        f"SUMMARY:{_text(row.title)}",
+        f"DESCRIPTION:{_text(row.description)}",
+        f"LOCATION:{_text(row.location)}",
+        "END:VEVENT",
+    )
+
+
+def _calendar(name: str, vevents) -> str:
+    return (
+        _lines(
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{_text(name)}",
+        )
+        + "".join(vevent for *_, vevent in sorted(vevents))
+        + _lines("END:VCALENDAR")
+    )
+
+
+def _utc(value: datetime) -> str:
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _text(value: str) -> str:
+    """Escapes a TEXT value."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _lines(*lines: str) -> str:
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def _fold(line: str) -> str:
+    """Splits the line into lines of at most 75 octets, the ones after the
+    first starting with a space."""
+    parts = []
+    part = ""
+    size = 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(part)
+            part = " "
+            size = 1
+        part += char
+        size += width
+    parts.append(part)
+    return "\r\n".join(parts)
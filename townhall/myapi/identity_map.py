@@ -0,0 +1,88 @@
+import contextlib
+import contextvars
+import typing
+
+from django.db.models import Model
+
+from . import entity_cache
+
+# Request scoped identity map: within one request, looking up the same row by
+# primary key twice gives the same object and costs one query (or one entity
+# cache read). IdentityMapMiddleware opens a map per request, outside a scope
+# get() simply loads the row.
+#
+# Saved and deleted rows are dropped by the signal receivers in signals.py.
+# QuerySet.update() sends no signals, the code using it on a looked up model
+# has to call forget() itself.
+#
+# A row about to be changed and saved is loaded with get_fresh(): the entity
+# cache's copy can be up to SYNC_INTERVAL old on other workers, and a full
+# save() of it would write back columns changed since.
+
+_map: contextvars.ContextVar[
+    typing.Optional[typing.Dict[typing.Tuple[type, typing.Any], Model]]
+] = contextvars.ContextVar("identity_map", default=None)
+
+
+@contextlib.contextmanager
+def scope():
+    token = _map.set({})
+    try:
+        yield
+    finally:
+        _map.reset(token)
+
+
+def _load(model, pk) -> Model:
+    if model in entity_cache.CACHED_MODELS:
+        return entity_cache.get(model, pk)
+    return model.objects.get(pk=pk)
+
+
+def get(model, pk) -> Model:
+    """
+    model.objects.get(pk=pk) through the identity map, raises
+    model.DoesNotExist when there is no such row.
+    """
+    identities = _map.get()
+    if identities is None:
+        return _load(model, pk)
+
+    # "5" from a URL and 5 are the same row
+    key = (model, model._meta.pk.to_python(pk))
+    instance = identities.get(key)
+    if instance is None:
+        instance = identities[key] = _load(model, pk)
+    return instance
+
+
+def get_fresh(model, pk) -> Model:
+    """
+    get() from the database, never the entity cache, for rows about to be
+    saved. The loaded row replaces the mapped one.
+    """
+    instance = model.objects.get(pk=pk)
+    identities = _map.get()
+    if identities is not None:
+        identities[(model, model._meta.pk.to_python(pk))] = instance
+    return instance
+
+
+def forget(model, pk, instance: typing.Optional[Model] = None) -> None:
+    """Drops the row from the map, unless ``instance`` is the one mapped."""
+    identities = _map.get()
+    if identities is None or pk is None:
+        return
+
+    key = (model, model._meta.pk.to_python(pk))
+    if instance is None or identities.get(key) is not instance:
+        identities.pop(key, None)
+
+
+class IdentityMapMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with scope():
+            return self.get_response(request)
@@ -0,0 +1,167 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from myapi.dao import OpportunityDao
+from myapi.models import Opportunity, Organization, SignUp, Volunteer
+from myapi.models import WaitlistEntry
+
+
+def lock_then_count(opportunity_id: int, volunteer_id: int) -> bool:
+    """The baseline: lock the opportunity, count its sign-ups, insert."""
+    with transaction.atomic():
+        opportunity = Opportunity.objects.select_for_update().get(pk=opportunity_id)
+        taken = SignUp.objects.filter(opportunity_id=opportunity_id).count()
+        if taken >= opportunity.capacity:
+            WaitlistEntry.objects.get_or_create(
+                opportunity_id=opportunity_id, volunteer_id=volunteer_id
+            )
+            return False
+        SignUp.objects.create(
+            opportunity_id=opportunity_id,
+            volunteer_id=volunteer_id,
+            start_time=opportunity.start_time,
+            end_time=opportunity.end_time,
+        )
+        return True
+
+
+def conditional_counter(opportunity_id: int, volunteer_id: int) -> bool:
+    return OpportunityDao.reserve_seat(opportunity_id, volunteer_id).signed_up
+
+
+STRATEGIES = {
+    "counter": conditional_counter,
+    "lock": lock_then_count,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Signs many volunteers up for one capacity limited opportunity from "
+        "concurrent threads, then checks that it isn't overfilled and reports "
+        "the throughput and latencies"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--volunteers", type=int, default=200, help="Sign-ups (default: 200)"
+        )
+        parser.add_argument(
+            "--capacity", type=int, default=50, help="Seats (default: 50)"
+        )
+        parser.add_argument(
+            "--threads", type=int, default=16, help="Concurrent threads (default: 16)"
+        )
+        parser.add_argument(
+            "--strategy",
+            choices=list(STRATEGIES),
+            default="counter",
+            help="counter: seats.take() (default), lock: lock the row and count",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["volunteers"], options["threads"]) < 1:
+            raise CommandError("--volunteers and --threads must be at least 1.")
+
+        organization = Organization.objects.create(
+            name="Sign-up benchmark",
+            location="-",
+            email="benchmark@example.com",
+            phone_number="-",
+            website="https://example.com",
+        )
+        opportunity = Opportunity.objects.create(
+            title="Sign-up benchmark",
+            description="-",
+            start_time=timezone.now(),
+            end_time=timezone.now(),
+            location="-",
+            organization=organization,
+            capacity=options["capacity"],
+        )
+        run = int(time.time() * 1000)
+        volunteers = Volunteer.objects.bulk_create(
+            Volunteer(
+                first_name="Benchmark",
+                last_name=str(n),
+                gender="F",
+                email=f"sign-up-benchmark-{run}-{n}@example.com",
+            )
+            for n in range(options["volunteers"])
+        )
+        try:
+            self.run(opportunity, [v.pk for v in volunteers], options)
+        finally:
+            opportunity.delete()
+            organization.delete()
+            Volunteer.objects.filter(pk__in=[v.pk for v in volunteers]).delete()
+
+    def run(self, opportunity, volunteer_ids, options):
+        sign_up = STRATEGIES[options["strategy"]]
+        latencies = []
+        retries = []
+        lock = threading.Lock()
+
+        def worker(ids):
+            try:
+                for volunteer_id in ids:
+                    started = time.perf_counter()
+                    while True:
+                        try:
+                            sign_up(opportunity.pk, volunteer_id)
+                            break
+                        except OperationalError:
+                            # SQLite: the database is locked by another writer
+                            with lock:
+                                retries.append(volunteer_id)
+                            time.sleep(0.001)
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = options["threads"]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            for future in [
+                pool.submit(worker, volunteer_ids[n::threads]) for n in range(threads)
+            ]:
+                future.result()
+        seconds = time.perf_counter() - started
+
+        opportunity.refresh_from_db()
+        signed_up = SignUp.objects.filter(opportunity_id=opportunity.pk).count()
+        waiting = WaitlistEntry.objects.filter(opportunity_id=opportunity.pk).count()
+        expected = min(opportunity.capacity, len(volunteer_ids))
+
+        latencies.sort()
+        self.stdout.write(
+            f"{len(volunteer_ids)} sign-ups from {threads} threads "
+            f"({options['strategy']}): {seconds:.2f}s, "
+            f"{len(volunteer_ids) / seconds:.0f} sign-ups/s"
+        )
+        self.stdout.write(
+            f"  latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms, {len(retries)} retries"
+        )
+        self.stdout.write(
+            f"  signed up {signed_up} of {opportunity.capacity} seats "
+            f"(filled {opportunity.filled}), {waiting} waitlisted"
+        )
+
+        if options["strategy"] == "counter" and opportunity.filled != signed_up:
+            raise CommandError(
+                f"filled is {opportunity.filled} for {signed_up} sign-ups."
+            )
+        if signed_up != expected or signed_up + waiting != len(volunteer_ids):
+            raise CommandError(
+                f"Expected {expected} sign-ups and "
+                f"{len(volunteer_ids) - expected} waitlisted."
+            )
@@ -0,0 +1,159 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from myapi.dao import OpportunityDao, PostDao, VolunteerDao
+from myapi.models import Comment
+from myapi.pagination import encode_cursor, keyset_queryset
+from myapi.services import VolunteerServices
+from myapi.types import FilteredOpportunityData, FilterVolunteerData
+
+# Markers of an index being used in EXPLAIN output, per database vendor
+INDEX_MARKERS = {
+    "sqlite": ("USING INDEX", "USING COVERING INDEX", "USING INTEGER PRIMARY KEY"),
+    "postgresql": ("Index Scan", "Index Only Scan", "Bitmap Index Scan"),
+}
+
+SAMPLE_TIME = datetime(2024, 7, 20, 10, 0, tzinfo=timezone.utc)
+
+
+def volunteer_filter_path(**filters):
+    def queryset():
+        return VolunteerDao.filter_all_volunteers(
+            VolunteerServices.build_volunteer_filters(FilterVolunteerData(**filters))
+        )
+
+    return queryset
+
+
+def opportunity_filter_path(**filters):
+    def queryset():
+        return OpportunityDao.filtered_opportunity(FilteredOpportunityData(**filters))
+
+    return queryset
+
+
+# (name, queryset factory, vendors on which the path must use an index).
+# Substring searches (icontains) can't use a b-tree index on any database, they
+# are listed so the report shows them, the search subsystem is their fix.
+FILTER_PATHS = [
+    (
+        "volunteer email (iexact)",
+        volunteer_filter_path(email="someone@example.com"),
+        ("postgresql",),
+    ),
+    ("volunteer first name (icontains)", volunteer_filter_path(first_name="a"), ()),
+    ("volunteer last name (icontains)", volunteer_filter_path(last_name="a"), ()),
+    (
+        "volunteer directory page",
+        lambda: keyset_queryset(
+            VolunteerDao.filter_all_volunteers({}),
+            ordering=("last_name", "first_name", "id"),
+            limit=50,
+            cursor=encode_cursor(["Bond", "James", 10]),
+        ),
+        ("sqlite", "postgresql"),
+    ),
+    (
+        "opportunity organization",
+        opportunity_filter_path(organization_id=1),
+        ("sqlite", "postgresql"),
+    ),
+    (
+        "opportunity organization + start range",
+        opportunity_filter_path(
+            organization_id=1,
+            starting_start_time=SAMPLE_TIME,
+            starting_end_time=SAMPLE_TIME,
+        ),
+        ("sqlite", "postgresql"),
+    ),
+    (
+        "opportunity start range",
+        opportunity_filter_path(
+            starting_start_time=SAMPLE_TIME, starting_end_time=SAMPLE_TIME
+        ),
+        ("sqlite", "postgresql"),
+    ),
+    (
+        "opportunity end range",
+        opportunity_filter_path(
+            ending_start_time=SAMPLE_TIME, ending_end_time=SAMPLE_TIME
+        ),
+        ("sqlite", "postgresql"),
+    ),
+    ("opportunity title (icontains)", opportunity_filter_path(title="a"), ()),
+    ("opportunity location (icontains)", opportunity_filter_path(location="a"), ()),
+    (
+        "post feed page",
+        lambda: keyset_queryset(
+            PostDao.get_queryset(),
+            ordering=("-created_at", "-id"),
+            limit=20,
+            cursor=encode_cursor([str(SAMPLE_TIME), 100]),
+        ),
+        ("sqlite", "postgresql"),
+    ),
+    (
+        "post comments page",
+        lambda: keyset_queryset(
+            Comment.objects.filter(post_id=1),
+            ordering=("-created_at", "-id"),
+            limit=20,
+            cursor=encode_cursor([str(SAMPLE_TIME), 100]),
+        ),
+        ("sqlite", "postgresql"),
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on the DAO filter paths and reports which ones use an "
+        "index, exits with an error if a path that should be indexed is not"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the full query plan of every path",
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        markers = INDEX_MARKERS.get(vendor)
+        if markers is None:
+            raise CommandError(f"EXPLAIN parsing is not supported for {vendor}")
+
+        regressions = []
+        with transaction.atomic():
+            if vendor == "postgresql":
+                # Small tables make the planner prefer sequential scans even
+                # when a usable index exists, rule them out to see the indexes
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, queryset, indexed_on in FILTER_PATHS:
+                plan = queryset().explain()
+                uses_index = any(marker in plan for marker in markers)
+                expected = vendor in indexed_on
+
+                if uses_index:
+                    status = self.style.SUCCESS("index")
+                elif expected:
+                    status = self.style.ERROR("FULL SCAN (regression)")
+                    regressions.append(name)
+                else:
+                    status = self.style.WARNING("full scan (expected)")
+
+                self.stdout.write(f"{name:<45} {status}")
+                if options["verbose_plans"]:
+                    self.stdout.write(plan)
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} filter paths no longer use an index: "
+                + ", ".join(regressions)
+            )
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from myapi import exports
+from myapi.services import OpportunityServices, TaskServices, VolunteerServices
+
+
+def volunteers(filters):
+    return VolunteerServices.get_all_volunteers_optional_filter(
+        exports.filter_volunteer_data(filters)
+    )
+
+
+def opportunities(filters):
+    return OpportunityServices.filtered_opportunity(
+        exports.filtered_opportunity_data(filters)
+    )
+
+
+def tasks(filters):
+    if filters:
+        raise CommandError("Tasks can't be filtered.")
+    return TaskServices.get_all_tasks()
+
+
+# table: (queryset of the filtered rows, exported fields)
+TABLES = {
+    "volunteers": (volunteers, exports.VOLUNTEER_FIELDS),
+    "opportunities": (opportunities, exports.OPPORTUNITY_FIELDS),
+    "tasks": (tasks, exports.TASK_FIELDS),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a table as CSV or NDJSON, with the filters of its list endpoint "
+        "(e.g. --filter location=Victoria)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=list(TABLES))
+        parser.add_argument(
+            "--output",
+            choices=list(exports.FORMATS),
+            default="csv",
+            help="Export format (default: csv)",
+        )
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="Filter the rows like the endpoint's query parameter NAME",
+        )
+        parser.add_argument(
+            "--file", help="Write to this file instead of the standard output"
+        )
+
+    def handle(self, *args, **options):
+        filters = {}
+        for item in options["filter"]:
+            name, separator, value = item.partition("=")
+            if not separator:
+                raise CommandError(f"Filters are NAME=VALUE, got {item!r}.")
+            filters[name] = value
+
+        queryset, fields = TABLES[options["table"]]
+        try:
+            rows = queryset(filters)
+        except serializers.ValidationError as e:
+            raise CommandError(f"Invalid filters: {e.detail}")
+
+        lines = exports.lines(rows, fields, options["output"])
+        if options["file"]:
+            with open(options["file"], "w", newline="", encoding="utf-8") as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
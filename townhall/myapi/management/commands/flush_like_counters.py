@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapi.counters import LikeCounterBuffer
+
+
+class Command(BaseCommand):
+    help = "Writes like counts buffered by POST_LIKES_WRITE_BEHIND to the posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep running and flush every INTERVAL seconds",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            flushed = LikeCounterBuffer.flush()
+            self.stdout.write(f"Flushed pending likes of {flushed} posts")
+
+            if interval is None:
+                break
+            time.sleep(interval)
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from myapi import volunteer_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates volunteers from a CSV file with the columns first_name, "
+        "last_name, gender, email and password"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="CSV file to import, - for standard input")
+        parser.add_argument(
+            "--batch-size", type=int, help="Rows inserted per query (default: 500)"
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Password hashing threads (default: CPUs)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["file"] == "-":
+                result = self.run(sys.stdin, options)
+            else:
+                with open(options["file"], newline="", encoding="utf-8-sig") as f:
+                    result = self.run(f, options)
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        for error in result.errors:
+            self.stderr.write(
+                f"line {error.line} ({error.email}): {' '.join(error.errors)}"
+            )
+        self.stdout.write(
+            f"Imported {result.created} of {result.rows} volunteers in "
+            f"{result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)"
+        )
+
+    def run(self, lines, options):
+        return volunteer_import.import_volunteers(
+            lines, batch_size=options["batch_size"], workers=options["workers"]
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from myapi import matching
+
+
+class Command(BaseCommand):
+    help = "Recomputes the skills matching vectors of all volunteers and opportunities"
+
+    def handle(self, *args, **options):
+        vectorized = matching.rebuild()
+        self.stdout.write(f"Vectorized {vectorized} rows")
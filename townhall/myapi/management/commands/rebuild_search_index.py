@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from myapi import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from the database rows"
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        self.stdout.write(f"Indexed {indexed} documents")
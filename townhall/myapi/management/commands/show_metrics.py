@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+# Importing the modules that define metrics registers them
+from myapi import caching, hashers, response_cache  # noqa: F401
+from myapi.metrics import REGISTRY, Counter
+
+
+class Command(BaseCommand):
+    help = "Prints the collected metrics in the Prometheus text format"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the metrics after printing them",
+        )
+
+    def handle(self, *args, **options):
+        for metric in REGISTRY.values():
+            if isinstance(metric, Counter):
+                self.stdout.write(f"# TYPE {metric.name} counter")
+                self.stdout.write(f"{metric.name} {metric.value()}")
+                if options["reset"]:
+                    metric.reset()
+                continue
+
+            snapshot = metric.snapshot()
+            self.stdout.write(f"# TYPE {snapshot.name} histogram")
+            for bound, count in snapshot.buckets:
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                self.stdout.write(f'{snapshot.name}_bucket{{le="{le}"}} {count}')
+            self.stdout.write(f"{snapshot.name}_sum {snapshot.sum:.6f}")
+            self.stdout.write(f"{snapshot.name}_count {snapshot.count}")
+
+            if options["reset"]:
+                metric.reset()
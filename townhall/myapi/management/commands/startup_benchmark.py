@@ -0,0 +1,155 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, this process has already paid for its startup.
+# -X importtime doesn't see modules loaded with importlib.import_module(),
+# which is how Django loads app configs and models modules, so those are
+# timed here (cumulative time only).
+PROBE = """
+import importlib, json, time
+import django.apps.config
+
+imports = {}
+
+def timed_import_module(name, package=None):
+    started = time.perf_counter()
+    try:
+        return importlib.import_module(name, package)
+    finally:
+        imports.setdefault(name, time.perf_counter() - started)
+
+django.apps.config.import_module = timed_import_module
+
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    "phases": {
+        "django.setup()": setup_done - started,
+        "URL resolver": time.perf_counter() - setup_done,
+    },
+    "imports": imports,
+}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Module -> (self, cumulative) seconds from ``python -X importtime``."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line
+        module = fields[2].strip()
+        modules[module] = (int(fields[0]) / 1e6, int(fields[1]) / 1e6)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cold start of a worker (django.setup(), loading the URL "
+        "resolver and the import time of each module) in fresh interpreters"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of fresh interpreters to measure, medians are reported",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Number of slowest modules to list",
+        )
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=None,
+            help="Fail if the median total startup time exceeds this budget",
+        )
+
+    def probe(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            cwd=settings.BASE_DIR,
+            # Also under override_settings, where SETTINGS_MODULE is unset
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE")
+                or settings.SETTINGS_MODULE,
+            },
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"The startup probe failed:\n{result.stderr}")
+        timings = json.loads(result.stdout.splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        for module, cumulative in timings["imports"].items():
+            modules.setdefault(module, (None, cumulative))
+        return timings["phases"], modules
+
+    def write_module(self, module, self_time, cumulative):
+        self_ms = "       -" if self_time is None else f"{self_time * 1000:8.1f}"
+        self.stdout.write(f"  {module:<40} {self_ms} ms {cumulative * 1000:8.1f} ms")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        phases = {}
+        modules = {}
+        for _ in range(options["repeat"]):
+            probe_phases, probe_modules = self.probe()
+            for phase, seconds in probe_phases.items():
+                phases.setdefault(phase, []).append(seconds)
+            for module, times in probe_modules.items():
+                modules.setdefault(module, []).append(times)
+
+        phases = {phase: statistics.median(runs) for phase, runs in phases.items()}
+        total_ms = sum(phases.values()) * 1000
+
+        self.stdout.write("Startup phases (median)")
+        for phase, seconds in phases.items():
+            self.stdout.write(f"  {phase:<40} {seconds * 1000:8.1f} ms")
+        self.stdout.write(f"  {'total':<40} {total_ms:8.1f} ms")
+
+        medians = {
+            module: (
+                None
+                if runs[0][0] is None
+                else statistics.median(self_time for self_time, _ in runs),
+                statistics.median(cumulative for _, cumulative in runs),
+            )
+            for module, runs in modules.items()
+        }
+        slowest = sorted(medians.items(), key=lambda item: -item[1][1])
+        self.stdout.write(f"\nSlowest imports (median, top {options['top']})")
+        self.stdout.write(f"  {'module':<40} {'self':>8}    {'cumulative':>10}")
+        for module, times in slowest[: options["top"]]:
+            self.write_module(module, *times)
+
+        app_modules = [item for item in slowest if item[0].startswith("myapi")]
+        self.stdout.write("\nApp modules (median)")
+        for module, times in app_modules:
+            self.write_module(module, *times)
+
+        budget = options["budget_ms"]
+        if budget is not None and total_ms > budget:
+            raise CommandError(
+                f"Startup took {total_ms:.1f} ms, over the {budget:.1f} ms budget."
+            )
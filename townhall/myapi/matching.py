@@ -0,0 +1,197 @@
+import logging
+import math
+import re
+import typing
+from collections import Counter
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .models import MatchTerm
+
+logger = logging.getLogger(__name__)
+
+# Skills based matching of volunteers and opportunities.
+#
+# The free text of every volunteer (skills_interests) and opportunity (title
+# and description) is turned into a sparse term vector, stored one non-zero
+# entry per MatchTerm row and kept up to date by the model signals in
+# signals.py. Vectors use the "lnc.ltc" weighting: stored vectors hold the
+# log term frequency, cosine normalized, and the inverse document frequency
+# is applied to the query side only, when a match is requested. That keeps
+# every stored vector independent of the rest of the corpus, so a save only
+# rewrites the vector of the row that changed.
+#
+# Scoring a query against every candidate is one grouped SUM over the postings
+# of the query terms, evaluated by the database, instead of a Python loop over
+# the candidates.
+
+# kind -> (model name, text builder, fields the text is built from)
+DOCUMENTS = {
+    "volunteer": (
+        "Volunteer",
+        lambda v: v.skills_interests,
+        ("skills_interests",),
+    ),
+    "opportunity": (
+        "Opportunity",
+        lambda o: " ".join(value for value in (o.title, o.description) if value),
+        ("title", "description"),
+    ),
+}
+
+# Only the heaviest terms of a long text take part in a query
+MAX_QUERY_TERMS = 32
+
+STOP_WORDS = frozenset(
+    """
+    a about an and are as at be but by can do for from have i in into is it
+    me my no not of on or our so than that the their them then there these
+    they this to us was we were what when where which who will with you your
+    """.split()
+)
+
+
+def kind_of(model) -> typing.Optional[str]:
+    for kind, (model_name, _, _) in DOCUMENTS.items():
+        if model._meta.object_name == model_name:
+            return kind
+    return None
+
+
+def _normalize(word: str) -> str:
+    # Folds simple plurals ("skills" -> "skill"), nothing more aggressive
+    if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: typing.Optional[str]) -> typing.List[str]:
+    return [
+        _normalize(word)[:64]
+        for word in re.findall(r"[a-z0-9]+", (text or "").lower())
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def term_vector(text: typing.Optional[str]) -> typing.Dict[str, float]:
+    """The cosine normalized log term frequency vector of ``text``."""
+    counts = Counter(tokenize(text))
+    weights = {term: 1 + math.log(count) for term, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()}
+
+
+def _store(model, kind: str, object_id: int, vector: typing.Dict[str, float]):
+    model.objects.bulk_create(
+        model(kind=kind, object_id=object_id, term=term, weight=weight)
+        for term, weight in vector.items()
+    )
+
+
+def index_instance(instance, update_fields=None) -> None:
+    kind = kind_of(type(instance))
+    if kind is None:
+        return
+
+    _, text, text_fields = DOCUMENTS[kind]
+    if update_fields is not None and not set(update_fields) & set(text_fields):
+        return
+
+    vector = term_vector(text(instance))
+    postings = MatchTerm.objects.filter(kind=kind, object_id=instance.pk)
+
+    # Most saves (profile edits, logins, ...) leave the text alone
+    stored = dict(postings.values_list("term", "weight"))
+    if stored.keys() == vector.keys() and all(
+        math.isclose(stored[term], weight) for term, weight in vector.items()
+    ):
+        return
+
+    with transaction.atomic():
+        postings.delete()
+        _store(MatchTerm, kind, instance.pk, vector)
+
+
+def remove_instance(instance) -> None:
+    kind = kind_of(type(instance))
+    if kind is None:
+        return
+
+    MatchTerm.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild(apps=None, chunk_size: int = 2000) -> int:
+    """Recomputes every vector, returns how many rows were vectorized.
+
+    ``apps`` lets migrations pass their historical app registry.
+    """
+    apps = apps or global_apps
+    match_term = apps.get_model("myapi", "MatchTerm")
+    vectorized = 0
+    with transaction.atomic():
+        match_term.objects.all().delete()
+        for kind, (model_name, text, text_fields) in DOCUMENTS.items():
+            model = apps.get_model("myapi", model_name)
+            rows = model.objects.only("pk", *text_fields).iterator(
+                chunk_size=chunk_size
+            )
+            for instance in rows:
+                _store(match_term, kind, instance.pk, term_vector(text(instance)))
+                vectorized += 1
+
+    logger.info(f"Rebuilt the match vectors of {vectorized} rows")
+    return vectorized
+
+
+def top_matches(
+    kind: str, object_id: int, target_kind: str, limit: int
+) -> typing.List[typing.Tuple[int, float]]:
+    """The ``limit`` best ``target_kind`` ids for a row, with cosine scores."""
+    source = dict(
+        MatchTerm.objects.filter(kind=kind, object_id=object_id).values_list(
+            "term", "weight"
+        )
+    )
+    terms = sorted(source, key=source.get, reverse=True)[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    postings = MatchTerm.objects.filter(kind=target_kind)
+    document_frequency = dict(
+        postings.filter(term__in=terms)
+        .values("term")
+        .annotate(df=Count("id"))
+        .values_list("term", "df")
+    )
+    if not document_frequency:
+        return []
+
+    # Query side weights, log tf (already in the stored vector) times idf
+    model_name = DOCUMENTS[target_kind][0]
+    total = global_apps.get_model("myapi", model_name).objects.count()
+    query = {
+        term: source[term] * math.log(1 + total / df)
+        for term, df in document_frequency.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in query.values()))
+
+    scores = (
+        postings.filter(term__in=query)
+        .values("object_id")
+        .annotate(
+            score=Sum(
+                F("weight")
+                * Case(
+                    *[
+                        When(term=term, then=Value(weight / norm))
+                        for term, weight in query.items()
+                    ],
+                    output_field=FloatField(),
+                )
+            )
+        )
+        .order_by("-score", "object_id")[:limit]
+    )
+    return [(row["object_id"], row["score"]) for row in scores]
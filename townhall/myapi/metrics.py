@@ -0,0 +1,92 @@
+import bisect
+import typing
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+# Minimal metrics kept in the shared cache (CACHES["shared"]), so every worker
+# process adds to the same numbers and `manage.py show_metrics` can read them.
+# Use a cache with atomic incr (memcached, redis) for the counts to be exact.
+
+cache = ConnectionProxy(caches, "shared")
+
+
+REGISTRY: typing.Dict[str, typing.Union["Counter", "Histogram"]] = {}
+
+
+def _incr(key: str, delta: int) -> None:
+    cache.add(key, 0, timeout=None)
+    cache.incr(key, delta)
+
+
+class Counter:
+    """Monotonic count, Prometheus style."""
+
+    def __init__(self, name: str):
+        self.name = name
+        REGISTRY[name] = self
+
+    def _key(self) -> str:
+        return f"metrics_{self.name}"
+
+    def inc(self, amount: int = 1) -> None:
+        _incr(self._key(), amount)
+
+    def value(self) -> int:
+        return cache.get(self._key(), 0)
+
+    def reset(self) -> None:
+        cache.delete(self._key())
+
+
+class HistogramSnapshot(typing.NamedTuple):
+    name: str
+    # (upper bound, cumulative count), the last bound is infinity
+    buckets: typing.List[typing.Tuple[float, int]]
+    count: int
+    sum: float
+
+
+class Histogram:
+    """Counts observations into fixed buckets, Prometheus style."""
+
+    # Sums are kept as integer microseconds, cache incr only takes integers
+    SUM_SCALE = 1_000_000
+
+    def __init__(self, name: str, buckets: typing.Sequence[float]):
+        self.name = name
+        self.bounds = sorted(buckets)
+        REGISTRY[name] = self
+
+    def _key(self, suffix) -> str:
+        return f"metrics_{self.name}_{suffix}"
+
+    def _keys(self) -> typing.List[str]:
+        return [self._key(f"bucket_{i}") for i in range(len(self.bounds) + 1)] + [
+            self._key("count"),
+            self._key("sum"),
+        ]
+
+    def observe(self, value: float) -> None:
+        bucket = bisect.bisect_left(self.bounds, value)
+        _incr(self._key(f"bucket_{bucket}"), 1)
+        _incr(self._key("count"), 1)
+        _incr(self._key("sum"), round(value * self.SUM_SCALE))
+
+    def snapshot(self) -> HistogramSnapshot:
+        values = cache.get_many(self._keys())
+        buckets = []
+        cumulative = 0
+        for i, bound in enumerate(self.bounds + [float("inf")]):
+            cumulative += values.get(self._key(f"bucket_{i}"), 0)
+            buckets.append((bound, cumulative))
+
+        return HistogramSnapshot(
+            name=self.name,
+            buckets=buckets,
+            count=values.get(self._key("count"), 0),
+            sum=values.get(self._key("sum"), 0) / self.SUM_SCALE,
+        )
+
+    def reset(self) -> None:
+        cache.delete_many(self._keys())
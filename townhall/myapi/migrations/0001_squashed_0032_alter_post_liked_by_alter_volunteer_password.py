@@ -0,0 +1,345 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ("myapi", "0001_initial"),
+        ("myapi", "0002_opportunity"),
+        ("myapi", "0003_organization"),
+        ("myapi", "0004_opportunity_volunteers"),
+        ("myapi", "0005_remove_volunteer_age"),
+        ("myapi", "0006_remove_organization_description_and_more"),
+        ("myapi", "0006_post_comment"),
+        ("myapi", "0007_merge_20240823_2236"),
+        ("myapi", "0008_rename_time_opportunity_start_time_and_more"),
+        ("myapi", "0008_post_image"),
+        ("myapi", "0009_merge_20240827_2017"),
+        ("myapi", "0008_volunteer_is_active_volunteer_password_and_more"),
+        ("myapi", "0009_alter_volunteer_password"),
+        ("myapi", "0010_merge_20240829_0234"),
+        ("myapi", "0011_remove_post_user_post_volunteer_and_more"),
+        ("myapi", "0012_alter_opportunity_volunteers_and_more"),
+        ("myapi", "0013_opportunity_organization_alter_volunteer_password"),
+        ("myapi", "0014_alter_volunteer_password_task"),
+        ("myapi", "0015_alter_volunteer_password"),
+        ("myapi", "0016_alter_task_status_alter_volunteer_password"),
+        ("myapi", "0017_alter_volunteer_password_chat_message"),
+        ("myapi", "0018_rename_partipants_chat_participants_and_more"),
+        ("myapi", "0014_alter_volunteer_email_alter_volunteer_password"),
+        ("myapi", "0017_merge_20241009_1557"),
+        ("myapi", "0019_merge_20241010_2313"),
+        ("myapi", "0020_project_alter_volunteer_password_delete_message"),
+        ("myapi", "0021_alter_volunteer_password_event"),
+        ("myapi", "0022_community_alter_volunteer_password_and_more"),
+        ("myapi", "0023_alter_project_community_id_alter_volunteer_password"),
+        ("myapi", "0024_rename_community_id_project_community_and_more"),
+        ("myapi", "0025_alter_comment_user_alter_volunteer_password"),
+        ("myapi", "0026_alter_volunteer_password"),
+        ("myapi", "0027_volunteer_about_me_volunteer_other_networks_and_more"),
+        ("myapi", "0028_volunteer_profile_image_alter_volunteer_password"),
+        ("myapi", "0029_post_likes_alter_volunteer_password"),
+        ("myapi", "0030_post_liked_by_alter_volunteer_password"),
+        ("myapi", "0031_volunteer_last_login_alter_volunteer_password"),
+        ("myapi", "0032_alter_post_liked_by_alter_volunteer_password"),
+    ]
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Volunteer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_name", models.CharField(max_length=60)),
+                ("last_name", models.CharField(max_length=60)),
+                (
+                    "gender",
+                    models.CharField(
+                        choices=[("M", "Male"), ("F", "Female")], max_length=1
+                    ),
+                ),
+                ("email", models.EmailField(max_length=254, unique=True)),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "password",
+                    models.CharField(
+                        default="pbkdf2_sha256$720000$hPN73oBsigVJebTqm8Cwv1$339uG1UgodmsN5u0UCNwqs52xJSkT10TcPVG9XckV/0=",
+                        max_length=128,
+                    ),
+                ),
+                ("about_me", models.TextField(blank=True, null=True)),
+                ("other_networks", models.TextField(blank=True, null=True)),
+                ("other_organizations", models.TextField(blank=True, null=True)),
+                (
+                    "primary_organization",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("pronouns", models.CharField(blank=True, max_length=100, null=True)),
+                ("skills_interests", models.TextField(blank=True, null=True)),
+                ("title", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "profile_image",
+                    models.ImageField(blank=True, null=True, upload_to="profile_image"),
+                ),
+                ("last_login", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Post",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "image",
+                    models.ImageField(blank=True, null=True, upload_to="post_images/"),
+                ),
+                (
+                    "volunteer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.volunteer",
+                    ),
+                ),
+                ("likes", models.IntegerField(default=0)),
+                (
+                    "liked_by",
+                    models.ManyToManyField(
+                        blank=True, related_name="liked_posts", to="myapi.volunteer"
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Comment",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.volunteer",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="myapi.post"
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Organization",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("location", models.CharField(max_length=100)),
+                ("email", models.EmailField(max_length=254)),
+                ("phone_number", models.CharField(max_length=100)),
+                ("website", models.URLField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Opportunity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+                ("start_time", models.DateTimeField()),
+                ("description", models.TextField()),
+                ("location", models.CharField(max_length=100)),
+                (
+                    "volunteers",
+                    models.ManyToManyField(
+                        blank=True, related_name="opportunities", to="myapi.volunteer"
+                    ),
+                ),
+                ("end_time", models.DateTimeField()),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.organization",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("description", models.TextField()),
+                ("deadline", models.DateTimeField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("open", "Open"),
+                            ("in_progress", "In Progress"),
+                            ("completed", "Completed"),
+                        ],
+                        default="open",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "assigned_to",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="assigned_tasks",
+                        to="myapi.volunteer",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="created_tasks",
+                        to="myapi.volunteer",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.organization",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Chat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "participants",
+                    models.ManyToManyField(
+                        related_name="chats", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+                ("description", models.TextField()),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("location", models.CharField(max_length=100)),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.organization",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Community",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("description", models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Project",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+                ("description", models.TextField()),
+                ("start_date", models.DateTimeField()),
+                ("end_date", models.DateTimeField()),
+                (
+                    "community",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.community",
+                    ),
+                ),
+            ],
+        ),
+    ]
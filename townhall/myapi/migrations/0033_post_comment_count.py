@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_comment_count(apps, schema_editor):
+    Post = apps.get_model("myapi", "Post")
+    Comment = apps.get_model("myapi", "Comment")
+    counts = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Post.objects.filter(pk__in=Comment.objects.values("post")).update(
+        comment_count=Subquery(counts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0032_alter_post_liked_by_alter_volunteer_password"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
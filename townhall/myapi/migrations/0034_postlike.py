@@ -0,0 +1,91 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def resync_likes(apps, schema_editor):
+    # The old read-modify-write like toggle could drift from the real number
+    # of likers, start the F() counter from the truth
+    Post = apps.get_model("myapi", "Post")
+    PostLike = apps.get_model("myapi", "PostLike")
+    counts = (
+        PostLike.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Post.objects.update(likes=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0033_post_comment_count"),
+    ]
+
+    operations = [
+        # Turn the auto-created liked_by table into the PostLike model without
+        # copying any rows
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="PostLike",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "post",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="myapi.post",
+                            ),
+                        ),
+                        (
+                            "volunteer",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="myapi.volunteer",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "myapi_post_liked_by",
+                        "unique_together": {("post", "volunteer")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="post",
+                    name="liked_by",
+                    field=models.ManyToManyField(
+                        blank=True,
+                        related_name="liked_posts",
+                        through="myapi.PostLike",
+                        to="myapi.volunteer",
+                    ),
+                ),
+            ],
+        ),
+        # Swap the anonymous unique index for a named constraint
+        migrations.AlterUniqueTogether(
+            name="postlike",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="postlike",
+            constraint=models.UniqueConstraint(
+                fields=("post", "volunteer"), name="unique_post_like"
+            ),
+        ),
+        migrations.RunPython(resync_likes, migrations.RunPython.noop),
+    ]
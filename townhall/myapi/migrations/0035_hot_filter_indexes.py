@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0034_postlike"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at", "id"], name="comment_post_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="opportunity",
+            index=models.Index(
+                fields=["organization", "start_time"], name="opportunity_org_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="opportunity",
+            index=models.Index(fields=["start_time"], name="opportunity_start_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="opportunity",
+            index=models.Index(fields=["end_time"], name="opportunity_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["created_at", "id"], name="post_created_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="volunteer",
+            index=models.Index(
+                django.db.models.functions.text.Upper("email"),
+                name="volunteer_email_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="volunteer",
+            index=models.Index(
+                fields=["last_name", "first_name", "id"], name="volunteer_name_idx"
+            ),
+        ),
+    ]
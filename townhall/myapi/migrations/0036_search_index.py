@@ -0,0 +1,66 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:20
+
+from django.db import migrations
+
+from myapi import search
+
+# The schema as of this migration, copied rather than read from myapi.search
+# so later changes there never change what this migration runs
+CREATE_SQL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS myapi_search_index USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS myapi_search_index ("
+        "kind varchar(20) NOT NULL, "
+        "object_id bigint NOT NULL, "
+        "title text NOT NULL, "
+        "body text NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || "
+        "setweight(to_tsvector('simple', body), 'B')) STORED, "
+        "PRIMARY KEY (kind, object_id))",
+        "CREATE INDEX IF NOT EXISTS myapi_search_index_document_idx "
+        "ON myapi_search_index USING GIN (document)",
+    ],
+}
+DROP_SQL = {
+    "sqlite": ["DROP TABLE IF EXISTS myapi_search_index"],
+    "postgresql": ["DROP TABLE IF EXISTS myapi_search_index"],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_SQL:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE_SQL[vendor]:
+            cursor.execute(sql)
+    # Filling the index is data, not schema: it follows the current documents
+    # like `manage.py rebuild_search_index` does
+    search.rebuild(apps, schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in DROP_SQL:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_SQL[vendor]:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0035_hot_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
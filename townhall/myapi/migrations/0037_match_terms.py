@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:57
+
+from django.db import migrations, models
+
+from myapi import matching
+
+
+def vectorize(apps, schema_editor):
+    matching.rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0036_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MatchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20)),
+                ("object_id", models.PositiveIntegerField()),
+                ("term", models.CharField(max_length=64)),
+                ("weight", models.FloatField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "term", "object_id", "weight"],
+                        name="match_term_posting_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="matchterm",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id", "term"), name="unique_match_term"
+            ),
+        ),
+        migrations.RunPython(vectorize, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:01
+
+import myapi.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0037_match_terms"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="volunteer",
+            name="password",
+            field=models.CharField(
+                default=myapi.models.unusable_password, max_length=128
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0038_volunteer_password_unusable_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100)),
+                ("window_start", models.BigIntegerField()),
+                ("hits", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="ratelimitbucket",
+            constraint=models.UniqueConstraint(
+                fields=("key", "window_start"), name="unique_rate_limit_bucket"
+            ),
+        ),
+    ]
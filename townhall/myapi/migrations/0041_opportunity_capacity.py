@@ -0,0 +1,84 @@
+# Generated by Django 5.0.6 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_filled(apps, schema_editor):
+    Opportunity = apps.get_model("myapi", "Opportunity")
+    SignUp = Opportunity.volunteers.through
+    counts = (
+        SignUp.objects.filter(opportunity=OuterRef("pk"))
+        .order_by()
+        .values("opportunity")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Opportunity.objects.filter(pk__in=SignUp.objects.values("opportunity")).update(
+        filled=Subquery(counts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0040_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="opportunity",
+            name="capacity",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="opportunity",
+            name="filled",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_filled, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="WaitlistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "opportunity",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist",
+                        to="myapi.opportunity",
+                    ),
+                ),
+                (
+                    "volunteer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="myapi.volunteer",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["opportunity", "id"], name="waitlist_order_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="waitlistentry",
+            constraint=models.UniqueConstraint(
+                fields=("opportunity", "volunteer"), name="unique_waitlist_entry"
+            ),
+        ),
+    ]
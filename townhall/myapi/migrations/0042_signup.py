@@ -0,0 +1,102 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_opportunity_times(apps, schema_editor):
+    Opportunity = apps.get_model("myapi", "Opportunity")
+    SignUp = apps.get_model("myapi", "SignUp")
+    opportunity = Opportunity.objects.filter(pk=OuterRef("opportunity_id"))
+    SignUp.objects.update(
+        start_time=Subquery(opportunity.values("start_time")),
+        end_time=Subquery(opportunity.values("end_time")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0041_opportunity_capacity"),
+    ]
+
+    operations = [
+        # Turn the auto-created volunteers table into the SignUp model without
+        # copying any rows
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="SignUp",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "opportunity",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="myapi.opportunity",
+                            ),
+                        ),
+                        (
+                            "volunteer",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="myapi.volunteer",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "myapi_opportunity_volunteers",
+                        "unique_together": {("opportunity", "volunteer")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="opportunity",
+                    name="volunteers",
+                    field=models.ManyToManyField(
+                        blank=True,
+                        related_name="opportunities",
+                        through="myapi.SignUp",
+                        to="myapi.volunteer",
+                    ),
+                ),
+            ],
+        ),
+        # Swap the anonymous unique index for a named constraint
+        migrations.AlterUniqueTogether(
+            name="signup",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="signup",
+            constraint=models.UniqueConstraint(
+                fields=("opportunity", "volunteer"), name="unique_sign_up"
+            ),
+        ),
+        migrations.AddField(
+            model_name="signup",
+            name="start_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="signup",
+            name="end_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_opportunity_times, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="signup",
+            index=models.Index(
+                fields=["volunteer", "end_time", "start_time"],
+                name="sign_up_schedule_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapi", "0042_signup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["organization", "end_time"], name="event_org_end_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["start_time"], name="event_start_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["end_time"], name="event_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="opportunity",
+            index=models.Index(
+                fields=["organization", "end_time"], name="opportunity_org_end_idx"
+            ),
+        ),
+    ]
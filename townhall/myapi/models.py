@@ -1,19 +1,27 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext_lazy as _
 
+from .hashers import is_hashed
+
 # Create your models here.
 
 
+def unusable_password() -> str:
+    # A callable default, so nothing is hashed when this module is imported
+    # and migrations don't see a new (randomly salted) default every time.
+    # Volunteers created without a password can't log in until they set one.
+    return make_password(None)
+
+
 class Volunteer(models.Model):
     first_name = models.CharField(max_length=60)
     last_name = models.CharField(max_length=60)
     email = models.EmailField(max_length=254, unique=True)
-    password = models.CharField(
-        max_length=128, default=make_password("default_password")
-    )
+    password = models.CharField(max_length=128, default=unusable_password)
     is_active = models.BooleanField(default=True)
     last_login = models.DateTimeField(default=timezone.now)
     pronouns = models.CharField(max_length=100, null=True, blank=True)
@@ -33,12 +41,25 @@ class Volunteer(models.Model):
 
     USERNAME_FIELD = "email"
 
+    class Meta:
+        indexes = [
+            # email__iexact compares UPPER(email) on PostgreSQL, which the
+            # plain unique index on email can't serve
+            models.Index(Upper("email"), name="volunteer_email_upper_idx"),
+            # Directory ordering (see VolunteerDao.get_volunteers_page)
+            models.Index(
+                fields=["last_name", "first_name", "id"], name="volunteer_name_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.first_name
 
     def save(self, *args, **kwargs):
-        # Ensure the password is hashed before saving
-        if not self.password.startswith("pbkdf2_sha256"):
+        # Ensure the password is hashed before saving. Any configured hasher's
+        # format counts as hashed, so changing PASSWORD_HASHERS doesn't hash
+        # existing hashes a second time.
+        if not is_hashed(self.password):
             self.password = make_password(self.password)
         super(Volunteer, self).save(*args, **kwargs)
 
@@ -51,12 +72,110 @@ class Opportunity(models.Model):
     location = models.CharField(max_length=100)
     organization = models.ForeignKey("Organization", on_delete=models.CASCADE)
     volunteers = models.ManyToManyField(
-        Volunteer, related_name="opportunities", blank=True
+        Volunteer, related_name="opportunities", blank=True, through="SignUp"
     )
+    # Seats, None for no limit. filled is the number of sign-ups and only moves
+    # with conditional UPDATEs, see myapi/seats.py
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    filled = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "start_time"], name="opportunity_org_start_idx"
+            ),
+            models.Index(fields=["start_time"], name="opportunity_start_idx"),
+            models.Index(fields=["end_time"], name="opportunity_end_idx"),
+            models.Index(
+                fields=["organization", "end_time"], name="opportunity_org_end_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # filled only moves with the conditional UPDATEs of myapi/seats.py,
+        # saving a copy loaded earlier must not write its count back. Only
+        # for a row that is still there (checked like Meta.select_on_save
+        # does): a new row, or one deleted since it was loaded, is inserted
+        # with all its fields as save() always does.
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and type(self)._base_manager.using(kwargs.get("using"))
+            .filter(pk=self.pk)
+            .exists()
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "filled"
+            ]
+        super().save(*args, **kwargs)
+
+
+class SignUp(models.Model):
+    """
+    One row per (opportunity, volunteer) sign-up. Carries a copy of the
+    opportunity's times so the shifts of a volunteer are one index range scan
+    away, see myapi/schedule.py.
+    """
+
+    opportunity = models.ForeignKey(Opportunity, on_delete=models.CASCADE)
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE)
+    # Empty only until the sign-up's m2m_changed receivers ran, for rows
+    # added through the related managers (admin, shell)
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Reuses the table Django created for the original volunteers field
+        db_table = "myapi_opportunity_volunteers"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["opportunity", "volunteer"], name="unique_sign_up"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["volunteer", "end_time", "start_time"],
+                name="sign_up_schedule_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.volunteer_id} signed up for {self.opportunity_id}"
+
+
+class WaitlistEntry(models.Model):
+    """
+    A volunteer waiting for a seat of a full opportunity. Seats that free up
+    go to the entries in id order, see myapi/seats.py.
+    """
+
+    opportunity = models.ForeignKey(
+        Opportunity, on_delete=models.CASCADE, related_name="waitlist"
+    )
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["opportunity", "volunteer"], name="unique_waitlist_entry"
+            ),
+        ]
+        indexes = [
+            # Head of the waitlist of an opportunity
+            models.Index(fields=["opportunity", "id"], name="waitlist_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.volunteer_id} waits for {self.opportunity_id}"
+
 
 class Organization(models.Model):
     name = models.CharField(max_length=100)
@@ -64,6 +183,7 @@ class Organization(models.Model):
     email = models.EmailField(max_length=254)
     phone_number = models.CharField(max_length=100)
     website = models.URLField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -76,12 +196,47 @@ class Post(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     image = models.ImageField(upload_to="post_images/", null=True, blank=True)
     likes = models.IntegerField(default=0)
-    liked_by = models.ManyToManyField(Volunteer, blank=True, related_name="liked_posts")
+    liked_by = models.ManyToManyField(
+        Volunteer, blank=True, related_name="liked_posts", through="PostLike"
+    )
+    # Kept in step with the comment table by CommentDao and signals.py, so the
+    # feed can show how many comments a post has without loading them
+    comment_count = models.IntegerField(default=0)
+    # Also moved by the counter updates, which bypass save()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Feed ordering and cursors (see PostDao.get_posts_page)
+            models.Index(fields=["created_at", "id"], name="post_created_at_id_idx"),
+        ]
 
     def __str__(self):
         return str(self.id)
 
 
+class PostLike(models.Model):
+    """
+    One row per (post, volunteer) like. The unique constraint is what makes a
+    like toggle safe under concurrent clicks, see PostDao.toggle_like.
+    """
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE)
+
+    class Meta:
+        # Reuses the table Django created for the original liked_by field
+        db_table = "myapi_post_liked_by"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "volunteer"], name="unique_post_like"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.volunteer_id} likes {self.post_id}"
+
+
 class Comment(models.Model):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey(Volunteer, on_delete=models.CASCADE)
@@ -89,6 +244,14 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Comment pages and previews of a post, newest first
+            models.Index(
+                fields=["post", "created_at", "id"], name="comment_post_created_idx"
+            ),
+        ]
+
     def __str__(self):
         return str(self.id)
 
@@ -119,6 +282,7 @@ class Task(models.Model):
         "Volunteer", on_delete=models.SET_NULL, null=True, related_name="created_tasks"
     )
     organization = models.ForeignKey("Organization", on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -139,6 +303,18 @@ class Event(models.Model):
     end_time = models.DateTimeField()
     location = models.CharField(max_length=100)
     organization = models.ForeignKey("Organization", on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Calendar windows (end_time > from and start_time < to), see
+        # EventDao.get_events_in_window
+        indexes = [
+            models.Index(
+                fields=["organization", "end_time"], name="event_org_end_idx"
+            ),
+            models.Index(fields=["start_time"], name="event_start_idx"),
+            models.Index(fields=["end_time"], name="event_end_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -161,3 +337,53 @@ class Project(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class MatchTerm(models.Model):
+    """
+    One non-zero entry of the sparse term vector of a volunteer or an
+    opportunity, used by the skills matching engine (see matching.py).
+    """
+
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id", "term"], name="unique_match_term"
+            ),
+        ]
+        indexes = [
+            # Covers the scoring query: postings of a term within one kind
+            models.Index(
+                fields=["kind", "term", "object_id", "weight"],
+                name="match_term_posting_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.term}={self.weight:.3f}"
+
+
+class RateLimitBucket(models.Model):
+    """
+    Number of hits on one rate limit key within one fixed time window, the
+    shared store behind myapi.ratelimit (one row per key and window).
+    """
+
+    key = models.CharField(max_length=100)
+    window_start = models.BigIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "window_start"], name="unique_rate_limit_bucket"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_start}: {self.hits}"
@@ -0,0 +1,178 @@
+import typing
+
+from django.db.models import F, Model, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.db.models.query import QuerySet
+from rest_framework import serializers
+
+# Derives select_related / prefetch_related / only() calls from the shape of a
+# serializer, so a queryset handed to that serializer loads everything it will
+# read in a fixed number of queries instead of one query per nested object.
+#
+# Forward foreign keys rendered by a nested serializer are joined with
+# select_related, to-many relations (many=True nested serializers) become a
+# Prefetch whose queryset is planned recursively for the child serializer, and
+# every level is trimmed with only() to the columns its serializer reads.
+
+
+class _Plan(typing.NamedTuple):
+    select_related: typing.List[str]
+    prefetches: typing.List[Prefetch]
+    # None means the serializer reads something we cannot map to columns
+    # (a method field, a dotted source, ...) so no columns are deferred.
+    only: typing.Optional[typing.Set[str]]
+
+
+def _find_relation(model: typing.Type[Model], source: str):
+    # Serializer sources use accessor names ("comment_set") for reverse
+    # relations, while _meta.get_field() expects the query name ("comment")
+    for field in model._meta.get_fields():
+        if field.name == source:
+            return field
+        if field.auto_created and not field.concrete:
+            if field.get_accessor_name() == source:
+                return field
+    return None
+
+
+def _nested_serializer(field) -> typing.Optional[serializers.ModelSerializer]:
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    if isinstance(field, serializers.ModelSerializer):
+        return field
+    return None
+
+
+def _build_plan(
+    model: typing.Type[Model],
+    serializer,
+    to_many_limits: typing.Optional[typing.Dict] = None,
+) -> _Plan:
+    to_many_limits = to_many_limits or {}
+    select_related = []
+    prefetches = []
+    only = {model._meta.pk.attname}
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if "." in field.source or field.source == "*":
+            only = None
+            continue
+
+        relation = _find_relation(model, field.source)
+        if relation is None:
+            # A property or method on the model, we can't tell what it reads
+            only = None
+            continue
+
+        nested = _nested_serializer(field)
+        if nested is None:
+            if relation.many_to_many or not relation.concrete:
+                # To-many relations rendered as ids still need their own query
+                prefetches.append(Prefetch(field.source))
+            elif only is not None:
+                only.add(relation.attname)
+            continue
+
+        related_model = relation.related_model
+        child = _build_plan(related_model, nested)
+
+        if relation.concrete and not relation.many_to_many:
+            # Forward FK / one-to-one: join it into the parent query
+            name = relation.name
+            select_related.append(name)
+            select_related += [f"{name}__{path}" for path in child.select_related]
+            prefetches += [
+                Prefetch(
+                    f"{name}__{prefetch.prefetch_through}",
+                    queryset=prefetch.queryset,
+                )
+                for prefetch in child.prefetches
+            ]
+            if only is not None:
+                only.add(relation.attname)
+                if child.only is None:
+                    only = None
+                else:
+                    only |= {f"{name}__{column}" for column in child.only}
+            continue
+
+        # To-many: one extra query for the whole relation
+        child_only = child.only
+        if child_only is not None and relation.one_to_many:
+            # Reverse FK prefetches match rows back to parents by this column
+            child_only = child_only | {relation.field.attname}
+
+        queryset = _apply_plan(
+            related_model._default_manager.all(),
+            _Plan(child.select_related, child.prefetches, child_only),
+        )
+        if field.source in to_many_limits:
+            ordering, count = to_many_limits[field.source]
+            queryset = _limit_per_parent(queryset, relation, ordering, count)
+        prefetches.append(Prefetch(field.source, queryset=queryset))
+
+    return _Plan(select_related, prefetches, only)
+
+
+def _limit_per_parent(
+    queryset: QuerySet, relation, ordering: typing.Sequence[str], count: int
+) -> QuerySet:
+    # Numbers the related rows of each parent with ROW_NUMBER() and keeps the
+    # first ``count``, so the prefetch stays a single query however many
+    # related rows a parent has
+    if not relation.one_to_many:
+        raise ValueError("Per parent limits only apply to reverse foreign keys.")
+    partition = relation.field.attname
+
+    return (
+        queryset.annotate(
+            _row_number=Window(
+                expression=RowNumber(),
+                partition_by=F(partition),
+                order_by=[
+                    F(field[1:]).desc() if field.startswith("-") else F(field).asc()
+                    for field in ordering
+                ],
+            )
+        )
+        .filter(_row_number__lte=count)
+        .order_by(*ordering)
+    )
+
+
+def _apply_plan(queryset: QuerySet, plan: _Plan) -> QuerySet:
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetches:
+        queryset = queryset.prefetch_related(*plan.prefetches)
+    if plan.only is not None:
+        queryset = queryset.only(*plan.only)
+    return queryset
+
+
+def plan_for_serializer(
+    queryset: QuerySet,
+    serializer_class: typing.Union[
+        typing.Type[serializers.Serializer], serializers.Serializer
+    ],
+    to_many_limits: typing.Optional[
+        typing.Dict[str, typing.Tuple[typing.Sequence[str], int]]
+    ] = None,
+) -> QuerySet:
+    """Returns ``queryset`` set up to load what ``serializer_class`` renders.
+
+    A serializer instance may be passed instead of the class when its fields
+    depend on constructor arguments (e.g. a sparse ``fields=`` selection).
+
+    ``to_many_limits`` maps a to-many source (e.g. ``"comment_set"``) to an
+    ``(ordering, count)`` pair, loading only the first ``count`` related rows
+    per parent instead of all of them.
+    """
+    serializer = serializer_class
+    if isinstance(serializer, type):
+        serializer = serializer()
+    plan = _build_plan(queryset.model, serializer, to_many_limits)
+    return _apply_plan(queryset, plan)
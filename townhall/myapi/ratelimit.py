@@ -0,0 +1,148 @@
+import hashlib
+import math
+import time
+import typing
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import RateLimitBucket
+
+# Sliding window rate limits shared by every worker process.
+#
+# Hits are counted in fixed windows, and the number of hits in the last
+# ``window`` seconds is estimated as the hits of the current window plus the
+# hits of the previous one weighted by how much of it is still inside the
+# sliding window. Every hit is an atomic increment in the store:
+#
+# - "database" (the default) keeps one RateLimitBucket row per key and window
+#   and increments it with UPDATE ... SET hits = hits + 1, so the limits hold
+#   across any number of processes with no extra infrastructure.
+# - "cache" uses cache.incr, for deployments with a shared cache that
+#   increments atomically (memcached, redis). The default per-process LocMem
+#   cache would give every worker its own counters.
+#
+# Identifiers (emails, IPs) are hashed into the keys, they are never stored.
+
+
+class RateLimit(typing.NamedTuple):
+    scope: str
+    limit: int
+    window: int  # seconds
+
+
+class DatabaseStore:
+    def hit(self, key: str, window_start: int, window: int) -> None:
+        buckets = RateLimitBucket.objects.filter(key=key, window_start=window_start)
+        if buckets.update(hits=F("hits") + 1):
+            return
+
+        try:
+            with transaction.atomic():
+                RateLimitBucket.objects.create(
+                    key=key, window_start=window_start, hits=1
+                )
+        except IntegrityError:
+            # Another process created the bucket first
+            buckets.update(hits=F("hits") + 1)
+            return
+
+        # A new window started for this key, drop the buckets of the same
+        # limit that no longer count towards any sliding window
+        prefix = key.rsplit(":", 1)[0]
+        RateLimitBucket.objects.filter(
+            key__startswith=f"{prefix}:", window_start__lt=window_start - window
+        ).delete()
+
+    def counts(self, key: str, window_starts) -> typing.Dict[int, int]:
+        return dict(
+            RateLimitBucket.objects.filter(
+                key=key, window_start__in=window_starts
+            ).values_list("window_start", "hits")
+        )
+
+    def reset(self, key: str, window_starts) -> None:
+        RateLimitBucket.objects.filter(key=key).delete()
+
+
+class CacheStore:
+    def _key(self, key: str, window_start: int) -> str:
+        return f"ratelimit_{key}_{window_start}"
+
+    def hit(self, key: str, window_start: int, window: int) -> None:
+        cache_key = self._key(key, window_start)
+        # Kept for two windows, it is read as the previous window afterwards
+        cache.add(cache_key, 0, timeout=2 * window)
+        cache.incr(cache_key)
+
+    def counts(self, key: str, window_starts) -> typing.Dict[int, int]:
+        keys = {self._key(key, start): start for start in window_starts}
+        return {keys[k]: hits for k, hits in cache.get_many(list(keys)).items()}
+
+    def reset(self, key: str, window_starts) -> None:
+        cache.delete_many([self._key(key, start) for start in window_starts])
+
+
+STORES = {
+    "database": DatabaseStore,
+    "cache": CacheStore,
+}
+
+
+def get_store():
+    return STORES[getattr(settings, "RATE_LIMIT_STORE", "database")]()
+
+
+def _key(rate: RateLimit, identifier: str) -> str:
+    digest = hashlib.sha256(identifier.lower().encode()).hexdigest()[:40]
+    return f"{rate.scope}:{rate.window}:{digest}"
+
+
+def _windows(rate: RateLimit, now: float) -> typing.Tuple[int, int, float]:
+    current = int(now // rate.window) * rate.window
+    return current, current - rate.window, (now - current) / rate.window
+
+
+def _retry_after(rate: RateLimit, previous: int, current: int, elapsed: float):
+    # Seconds until one more attempt fits within the limit, if nobody tries
+    room = rate.limit - current - 1
+    if room >= 0 and previous:
+        # The previous window's weight shrinks enough within this window
+        return (1 - room / previous - elapsed) * rate.window
+    # In the next window this window's hits become the weighted ones
+    return (1 - elapsed + 1 - (rate.limit - 1) / current) * rate.window
+
+
+def attempt(
+    rate: RateLimit, identifier: str, now: typing.Optional[float] = None
+) -> typing.Optional[int]:
+    """Records one attempt, returns None if it is within the limit, otherwise
+    the number of seconds after which attempts will be allowed again.
+
+    The attempt is counted either way, so retrying while limited keeps the
+    caller limited.
+    """
+    now = time.time() if now is None else now
+    store = get_store()
+    key = _key(rate, identifier)
+    current_start, previous_start, elapsed = _windows(rate, now)
+
+    store.hit(key, current_start, rate.window)
+    counts = store.counts(key, [current_start, previous_start])
+    current = counts.get(current_start, 0)
+    previous = counts.get(previous_start, 0)
+
+    # The attempt being made is included in ``current``
+    if previous * (1 - elapsed) + current <= rate.limit:
+        return None
+    # Rounded first so float noise doesn't add a second
+    seconds = round(_retry_after(rate, previous, current, elapsed), 6)
+    return max(1, math.ceil(seconds))
+
+
+def reset(rate: RateLimit, identifier: str, now: typing.Optional[float] = None):
+    now = time.time() if now is None else now
+    current_start, previous_start, _ = _windows(rate, now)
+    get_store().reset(_key(rate, identifier), [current_start, previous_start])
@@ -0,0 +1,190 @@
+import functools
+import hashlib
+import time
+import typing
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.utils.connection import ConnectionProxy
+
+from . import caching
+from .metrics import Counter
+from .models import Opportunity, Organization
+
+# Response cache for public read endpoints: the rendered JSON of a GET is kept
+# in the shared cache and served again without a query or serialization.
+#
+# Entries are tagged with surrogate keys naming what they show, e.g. "org:42"
+# for one organization or "opportunity:list" for the listing. Every tag has a
+# version in the shared cache and an entry remembers the versions of its tags
+# when it was rendered; purge() bumps the versions, so exactly the entries
+# tagged with them stop matching and are rendered again on their next read.
+# The signal receivers in signals.py purge the tags of saved and deleted rows,
+# code writing these models with QuerySet.update() or bulk_create() sends no
+# signals and has to call purge() itself.
+#
+# Payloads must not depend on who asks, unless the view says so (per_user)
+# and only anonymous requests are cached.
+
+cache = ConnectionProxy(caches, "shared")
+
+HITS = Counter("response_cache_hits_total")
+MISSES = Counter("response_cache_misses_total")
+PURGES = Counter("response_cache_purges_total")
+
+# Surrogate key prefix of each model whose rows are shown by cached responses
+TAG_PREFIXES = {
+    Opportunity: "opportunity",
+    Organization: "org",
+}
+
+
+def _enabled() -> bool:
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", True)
+
+
+def _timeout() -> int:
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def _tag_key(tag: str) -> str:
+    return f"surrogate_key:{tag}"
+
+
+def _entry_key(request) -> str:
+    query = sorted(request.GET.lists())
+    digest = hashlib.md5(f"{request.path}|{query!r}".encode()).hexdigest()
+    return f"response:{digest}"
+
+
+def tags_for(model, pks: typing.Iterable) -> typing.List[str]:
+    """The tags of the given rows and of the listing they appear in."""
+    prefix = TAG_PREFIXES[model]
+    return [f"{prefix}:list"] + [f"{prefix}:{pk}" for pk in pks]
+
+
+def query_tags(model, param: str = "id") -> typing.Callable[..., typing.List[str]]:
+    """
+    Tags for cached_response() of endpoints showing the row given by
+    ?<param>=, or the listing without it.
+    """
+    prefix = TAG_PREFIXES[model]
+
+    def tags(request, *args, **kwargs) -> typing.List[str]:
+        pk = request.query_params.get(param)
+        if pk:
+            try:
+                # "07" and 7 are the same row, and purged under the same tag
+                return [f"{prefix}:{model._meta.pk.to_python(pk)}"]
+            except ValidationError:
+                pass
+        return [f"{prefix}:list"]
+
+    return tags
+
+
+def purge(model, pks: typing.Iterable) -> None:
+    """Drops the cached responses showing the given rows of model."""
+    if model not in TAG_PREFIXES:
+        return
+
+    purge_tags(model, tags_for(model, pks))
+
+
+def purge_tags(model, tags: typing.List[str]) -> None:
+    """Drops the cached responses tagged with any of tags, for a change of
+    rows of model."""
+    _bump(tags)
+    if caching.in_transaction(model):
+        # Another worker may render the old rows again before the commit
+        transaction.on_commit(lambda: _bump(tags), using=router.db_for_write(model))
+
+
+def _bump(tags: typing.List[str]) -> None:
+    # A fresh version rather than an increment: concurrent increments can be
+    # lost on a backend without atomic add/incr (the file cache), leaving old
+    # entries matching. From the clock, so a version lost from the cache never
+    # goes back to one an old entry was rendered with.
+    version = time.time_ns()
+    cache.set_many({_tag_key(tag): version for tag in tags}, timeout=None)
+    PURGES.inc(len(tags))
+
+
+def _versions(tags: typing.List[str]) -> typing.Dict[str, int]:
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    missing = [tag for key, tag in keys.items() if key not in found]
+    if missing:
+        _bump(missing)
+        found.update(cache.get_many([_tag_key(tag) for tag in missing]))
+    return {tag: found.get(key) for key, tag in keys.items()}
+
+
+def hit_ratio() -> typing.Optional[float]:
+    """Share of the lookups served from the cache, None before the first one."""
+    hits, misses = HITS.value(), MISSES.value()
+    if not hits + misses:
+        return None
+    return hits / (hits + misses)
+
+
+def cached_response(
+    tags: typing.Callable[..., typing.List[str]],
+    per_user: bool = False,
+    formats: typing.Iterable[str] = ("json",),
+    timeout: typing.Optional[int] = None,
+):
+    """
+    Serves the view's responses from the cache.
+
+    ``tags`` is called with the view's arguments and returns the surrogate
+    keys of everything the response shows. Only 200 responses rendered in
+    one of ``formats`` are cached, others (the browsable API) always run the
+    view. With ``per_user`` the response depends on who asks and only the
+    ones of anonymous requests are cached. ``timeout`` overrides
+    RESPONSE_CACHE_TIMEOUT for the view.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if not _enabled() or request.method not in ("GET", "HEAD"):
+                return view(self, request, *args, **kwargs)
+            if per_user and request.session.get("_auth_user_id"):
+                return view(self, request, *args, **kwargs)
+            renderer, _ = self.perform_content_negotiation(request)
+            if renderer.format not in formats:
+                return view(self, request, *args, **kwargs)
+
+            key = _entry_key(request)
+            entry = cache.get(key)
+            if entry is not None and _versions(list(entry["tags"])) == entry["tags"]:
+                HITS.inc()
+                return HttpResponse(
+                    entry["content"], content_type=entry["content_type"]
+                )
+            MISSES.inc()
+
+            # Read before rendering, so a purge landing meanwhile leaves the
+            # entry stale rather than the old rows cached under new versions
+            versions = _versions(tags(request, *args, **kwargs))
+            response = view(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            entry = {
+                "tags": versions,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+            }
+            cache.set(key, entry, timeout=timeout or _timeout())
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,195 @@
+import typing
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Opportunity, SignUp, Volunteer
+from .types import Schedule, ScheduleBlock, ScheduleEntry
+
+# Volunteers' schedules: the opportunities (shifts) they signed up for.
+#
+# A sign-up row carries a copy of its opportunity's start and end time and
+# the table is indexed on (volunteer, end_time, start_time). Two shifts
+# overlap when each starts before the other ends, so the shifts of a
+# volunteer overlapping [start, end) are found by seeking that index to the
+# volunteer's first shift ending after start, O(log n) in the size of the
+# table, and reading on while they start before end. The seek skips the
+# volunteer's past shifts and everybody else's, and the index covers the
+# query so no row is read.
+#
+# Sign-ups overlapping a shift the volunteer already has are rejected. The
+# check runs in the sign-up's transaction after lock() on the volunteers, so
+# two concurrent sign-ups of one volunteer are checked one after the other
+# and the second sees the first's shift. Volunteers are locked before
+# opportunities (seats.lock, seats.take) on every path against deadlocks.
+# Overlaps can still come from an opportunity moved to another time or from
+# sign-ups added through the related managers (admin, shell), schedule()
+# flags them.
+
+
+class ScheduleConflict(Exception):
+    """Signing up would give volunteers overlapping shifts. ids are the
+    volunteers, or opportunities, of the change that clash."""
+
+    def __init__(self, ids: typing.List[int]):
+        super().__init__(f"Overlapping shifts for {ids}")
+        self.ids = ids
+
+
+def lock(volunteer_ids: typing.Iterable[int]) -> None:
+    """Locks the volunteers' rows until the transaction ends, in id order
+    against deadlocks."""
+    list(
+        Volunteer.objects.select_for_update()
+        .filter(pk__in=volunteer_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def stamp(opportunity_ids: typing.Iterable[int]) -> None:
+    """Copies the opportunities' times onto their sign-ups."""
+    opportunity = Opportunity.objects.filter(pk=OuterRef("opportunity_id"))
+    SignUp.objects.filter(opportunity_id__in=opportunity_ids).update(
+        start_time=Subquery(opportunity.values("start_time")),
+        end_time=Subquery(opportunity.values("end_time")),
+    )
+
+
+def clashes(volunteer_id: int, opportunity: Opportunity) -> typing.List[int]:
+    """The opportunities of the volunteer overlapping the given one."""
+    return list(
+        SignUp.objects.filter(
+            volunteer_id=volunteer_id,
+            end_time__gt=opportunity.start_time,
+            start_time__lt=opportunity.end_time,
+        )
+        .exclude(opportunity_id=opportunity.pk)
+        .values_list("opportunity_id", flat=True)
+    )
+
+
+def volunteers_with_clashes(
+    volunteer_ids: typing.Iterable[int], opportunity: Opportunity
+) -> typing.List[int]:
+    """The volunteers with a shift overlapping the opportunity, one index seek
+    per volunteer."""
+    return sorted(
+        set(
+            SignUp.objects.filter(
+                volunteer_id__in=volunteer_ids,
+                end_time__gt=opportunity.start_time,
+                start_time__lt=opportunity.end_time,
+            )
+            .exclude(opportunity_id=opportunity.pk)
+            .values_list("volunteer_id", flat=True)
+        )
+    )
+
+
+def opportunities_with_clashes(
+    volunteer_id: int, opportunities: typing.List[Opportunity]
+) -> typing.List[int]:
+    """The opportunities overlapping a shift the volunteer has or another one
+    of them, from one range scan over the time they span."""
+    if not opportunities:
+        return []
+    ids = {opportunity.pk for opportunity in opportunities}
+    booked = (
+        SignUp.objects.filter(
+            volunteer_id=volunteer_id,
+            end_time__gt=min(opportunity.start_time for opportunity in opportunities),
+            start_time__lt=max(opportunity.end_time for opportunity in opportunities),
+        )
+        .exclude(opportunity_id__in=ids)
+        .values_list("opportunity_id", "start_time", "end_time")
+    )
+    overlaps = find_overlaps(
+        [(o.pk, o.start_time, o.end_time) for o in opportunities] + list(booked)
+    )
+    return sorted(id for id in overlaps if id in ids)
+
+
+def find_overlaps(
+    shifts: typing.Iterable[typing.Tuple[int, datetime, datetime]],
+) -> typing.Dict[int, typing.Set[int]]:
+    """
+    Maps each of the (id, start, end) shifts overlapping others to their ids.
+    Sweeps the shifts in start order keeping the ones not over yet, so it
+    compares only shifts that overlap besides sorting.
+    """
+    overlaps = {}
+    running = []
+    for id, start, end in sorted(shifts, key=lambda shift: (shift[1], shift[0])):
+        running = [shift for shift in running if shift[2] > start]
+        for other_id, other_start, _ in running:
+            if other_start < end:
+                overlaps.setdefault(id, set()).add(other_id)
+                overlaps.setdefault(other_id, set()).add(id)
+        running.append((id, start, end))
+    return overlaps
+
+
+def schedule(
+    volunteer_id: int,
+    start: typing.Optional[datetime] = None,
+    end: typing.Optional[datetime] = None,
+) -> Schedule:
+    """
+    The volunteer's shifts overlapping [start, end) in time order, each with
+    the others it overlaps, merged into the blocks of time the volunteer is
+    busy.
+    """
+    sign_ups = SignUp.objects.filter(volunteer_id=volunteer_id)
+    if start is not None:
+        sign_ups = sign_ups.filter(end_time__gt=start)
+    if end is not None:
+        sign_ups = sign_ups.filter(start_time__lt=end)
+    sign_ups = list(
+        sign_ups.select_related("opportunity").order_by("start_time", "opportunity_id")
+    )
+
+    overlaps = find_overlaps(
+        (sign_up.opportunity_id, sign_up.start_time, sign_up.end_time)
+        for sign_up in sign_ups
+    )
+    entries = []
+    blocks = []
+    for sign_up in sign_ups:
+        entries.append(
+            ScheduleEntry(
+                opportunity=sign_up.opportunity,
+                conflicts=sorted(overlaps.get(sign_up.opportunity_id, ())),
+            )
+        )
+        if blocks and sign_up.start_time <= blocks[-1].end_time:
+            block = blocks[-1]
+            block.end_time = max(block.end_time, sign_up.end_time)
+            block.opportunity_ids.append(sign_up.opportunity_id)
+        else:
+            blocks.append(
+                ScheduleBlock(
+                    start_time=sign_up.start_time,
+                    end_time=sign_up.end_time,
+                    opportunity_ids=[sign_up.opportunity_id],
+                )
+            )
+    return Schedule(entries=entries, blocks=blocks)
+
+
+def parse_time(value: typing.Optional[str], name: str) -> typing.Optional[datetime]:
+    """An ISO 8601 query parameter, times without a zone are in TIME_ZONE."""
+    if value is None or value == "":
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError(f"{name} must be an ISO 8601 date and time.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
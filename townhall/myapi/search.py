@@ -0,0 +1,279 @@
+import logging
+import re
+import typing
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Full-text search over volunteers, opportunities, organizations, events and
+# posts.
+#
+# Every searchable row is mirrored into one search index table as a
+# (kind, object_id, title, body) document, kept in sync by the model signals
+# in signals.py. The index lives in the same database so updates are part of
+# the same transaction as the row they describe. How the table is built and
+# queried depends on the database: an FTS5 virtual table ranked with bm25() on
+# SQLite, a tsvector column with a GIN index ranked with ts_rank_cd() on
+# PostgreSQL.
+
+INDEX_TABLE = "myapi_search_index"
+
+
+def _join(*values) -> str:
+    return " ".join(value for value in values if value)
+
+
+# kind -> (model name, title builder, body builder)
+DOCUMENTS = {
+    "volunteer": (
+        "Volunteer",
+        lambda v: _join(v.first_name, v.last_name),
+        lambda v: _join(
+            v.title,
+            v.primary_organization,
+            v.skills_interests,
+            v.about_me,
+        ),
+    ),
+    "opportunity": (
+        "Opportunity",
+        lambda o: o.title,
+        lambda o: _join(o.description, o.location),
+    ),
+    "organization": (
+        "Organization",
+        lambda o: o.name,
+        lambda o: o.location,
+    ),
+    "event": (
+        "Event",
+        lambda e: e.title,
+        lambda e: _join(e.description, e.location),
+    ),
+    "post": (
+        "Post",
+        lambda p: "",
+        lambda p: p.content,
+    ),
+}
+
+# Stable small numbers per kind, used to derive FTS5 rowids
+KIND_CODES = {kind: code for code, kind in enumerate(DOCUMENTS, start=1)}
+
+
+def kind_of(model) -> typing.Optional[str]:
+    for kind, (model_name, _, _) in DOCUMENTS.items():
+        if model._meta.object_name == model_name:
+            return kind
+    return None
+
+
+def _terms(query: str) -> typing.List[str]:
+    # User input is never passed to MATCH / to_tsquery as is, only its words
+    return re.findall(r"\w+", query.lower())[:10]
+
+
+class SearchHit(typing.NamedTuple):
+    kind: str
+    object_id: int
+    title: str
+    body: str
+    score: float
+
+
+class SQLiteFTS5Backend:
+    def create_schema(self, cursor) -> None:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop_schema(self, cursor) -> None:
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def _rowid(self, kind: str, object_id: int) -> int:
+        # Deterministic rowid, so updates and deletes are rowid lookups
+        # instead of scans over the UNINDEXED columns
+        return object_id * 16 + KIND_CODES[kind]
+
+    def index(self, cursor, kind: str, object_id: int, title: str, body: str):
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {INDEX_TABLE} "
+            "(rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)",
+            [self._rowid(kind, object_id), kind, object_id, title, body],
+        )
+
+    def remove(self, cursor, kind: str, object_id: int) -> None:
+        cursor.execute(
+            f"DELETE FROM {INDEX_TABLE} WHERE rowid = %s",
+            [self._rowid(kind, object_id)],
+        )
+
+    def clear(self, cursor) -> None:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+
+    def search(self, cursor, query: str, kinds, limit: int) -> typing.List[SearchHit]:
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        # Every word must match, the last one as a prefix (search as you type)
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        kind_filter = ""
+        params = [match]
+        if kinds:
+            kind_filter = f"AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        params.append(limit)
+
+        # bm25() is lower for better matches; titles weigh 10x the body
+        cursor.execute(
+            f"SELECT kind, object_id, title, body, "
+            f"bm25({INDEX_TABLE}, 0, 0, 10.0, 1.0) AS rank "
+            f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s {kind_filter} "
+            "ORDER BY rank LIMIT %s",
+            params,
+        )
+        return [
+            SearchHit(kind, int(object_id), title, body, -rank)
+            for kind, object_id, title, body, rank in cursor.fetchall()
+        ]
+
+
+class PostgresBackend:
+    def create_schema(self, cursor) -> None:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "kind varchar(20) NOT NULL, "
+            "object_id bigint NOT NULL, "
+            "title text NOT NULL, "
+            "body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', body), 'B')) STORED, "
+            "PRIMARY KEY (kind, object_id))"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document_idx "
+            f"ON {INDEX_TABLE} USING GIN (document)"
+        )
+
+    def drop_schema(self, cursor) -> None:
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def index(self, cursor, kind: str, object_id: int, title: str, body: str):
+        cursor.execute(
+            f"INSERT INTO {INDEX_TABLE} (kind, object_id, title, body) "
+            "VALUES (%s, %s, %s, %s) ON CONFLICT (kind, object_id) "
+            "DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body",
+            [kind, object_id, title, body],
+        )
+
+    def remove(self, cursor, kind: str, object_id: int) -> None:
+        cursor.execute(
+            f"DELETE FROM {INDEX_TABLE} WHERE kind = %s AND object_id = %s",
+            [kind, object_id],
+        )
+
+    def clear(self, cursor) -> None:
+        cursor.execute(f"TRUNCATE {INDEX_TABLE}")
+
+    def search(self, cursor, query: str, kinds, limit: int) -> typing.List[SearchHit]:
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        tsquery = " & ".join(terms) + ":*"
+        kind_filter = ""
+        params = [tsquery, tsquery]
+        if kinds:
+            kind_filter = "AND kind = ANY(%s)"
+            params.append(list(kinds))
+        params.append(limit)
+
+        cursor.execute(
+            "SELECT kind, object_id, title, body, "
+            "ts_rank_cd(document, to_tsquery('simple', %s)) AS rank "
+            f"FROM {INDEX_TABLE} "
+            f"WHERE document @@ to_tsquery('simple', %s) {kind_filter} "
+            "ORDER BY rank DESC LIMIT %s",
+            params,
+        )
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    "sqlite": SQLiteFTS5Backend,
+    "postgresql": PostgresBackend,
+}
+
+
+def get_backend(db_connection=connection):
+    """The backend for the database, None when search is unsupported there."""
+    backend = BACKENDS.get(db_connection.vendor)
+    return backend() if backend is not None else None
+
+
+def document_for(instance, kind: str) -> typing.Tuple[str, str]:
+    _, title, body = DOCUMENTS[kind]
+    return title(instance) or "", body(instance) or ""
+
+
+def index_instance(instance) -> None:
+    backend = get_backend()
+    kind = kind_of(type(instance))
+    if backend is None or kind is None:
+        return
+
+    title, body = document_for(instance, kind)
+    with connection.cursor() as cursor:
+        backend.index(cursor, kind, instance.pk, title, body)
+
+
+def remove_instance(instance) -> None:
+    backend = get_backend()
+    kind = kind_of(type(instance))
+    if backend is None or kind is None:
+        return
+
+    with connection.cursor() as cursor:
+        backend.remove(cursor, kind, instance.pk)
+
+
+def rebuild(apps=None, db_connection=connection, chunk_size: int = 2000) -> int:
+    """Re-indexes every searchable row, returns how many were indexed.
+
+    ``apps`` lets migrations pass their historical app registry.
+    """
+    if apps is None:
+        from django.apps import apps
+
+    backend = get_backend(db_connection)
+    if backend is None:
+        return 0
+
+    indexed = 0
+    with db_connection.cursor() as cursor:
+        backend.clear(cursor)
+        for kind, (model_name, _, _) in DOCUMENTS.items():
+            model = apps.get_model("myapi", model_name)
+            for instance in model.objects.using(db_connection.alias).iterator(
+                chunk_size=chunk_size
+            ):
+                title, body = document_for(instance, kind)
+                backend.index(cursor, kind, instance.pk, title, body)
+                indexed += 1
+
+    logger.info(f"Rebuilt the search index with {indexed} documents")
+    return indexed
+
+
+def search(query: str, kinds=None, limit: int = 20) -> typing.List[SearchHit]:
+    backend = get_backend()
+    if backend is None:
+        return []
+
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, kinds, limit)
@@ -0,0 +1,164 @@
+import typing
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+
+from .models import Opportunity, SignUp, Volunteer, WaitlistEntry
+
+# Seats of capacity limited opportunities and their waitlists.
+#
+# Opportunity.filled counts the opportunity's sign-ups and a sign-up is
+# checked against it, never against a count read into Python: a seat is
+# taken by one conditional UPDATE ... SET filled = filled + n WHERE
+# filled + n <= capacity, which the database applies to the row one at a
+# time, so concurrent sign-ups can't overfill an opportunity.
+#
+# Every change of an opportunity's sign-ups starts by writing or locking its
+# row (take() does both at once). That orders concurrent changes of one
+# opportunity and keeps them from deadlocking on each other's sign-up rows.
+# Seats freed by a removal go to the head of the waitlist in the same
+# transaction, so no seat is seen free while somebody waits for it.
+#
+# A new capacity is written first and checked against filled after, in one
+# transaction (OpportunitySerializer.update, over_capacity()). A take() after
+# the write sees the new capacity, one before it is counted by the check.
+#
+# The sign-up table is written directly (bulk inserts, filtered deletes) and
+# sign_ups_changed() tells the m2m_changed receivers about it. Changes made
+# through the related managers instead (admin, shell) take no seats,
+# signals.py recounts the opportunities after them.
+
+
+class OpportunityFull(Exception):
+    """The opportunities don't have the seats a change needs."""
+
+    def __init__(self, opportunity_ids: typing.List[int]):
+        super().__init__(f"No seats left in opportunities {opportunity_ids}")
+        self.opportunity_ids = opportunity_ids
+
+
+def sign_ups_changed(action: str, instance, model, pk_set) -> None:
+    """
+    Sends m2m_changed like the related managers' add() and remove() do, with
+    seats_counted so signals.py doesn't count the change again.
+    """
+    m2m_changed.send(
+        sender=SignUp,
+        instance=instance,
+        action=action,
+        reverse=isinstance(instance, Volunteer),
+        model=model,
+        pk_set=set(pk_set),
+        using=router.db_for_write(SignUp),
+        seats_counted=True,
+    )
+
+
+def lock(opportunity_ids: typing.Iterable[int]) -> None:
+    """Locks the rows until the transaction ends, in id order against
+    deadlocks."""
+    list(
+        Opportunity.objects.select_for_update()
+        .filter(pk__in=opportunity_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def _has_room(seats: int) -> Q:
+    return Q(capacity__isnull=True) | Q(capacity__gte=F("filled") + seats)
+
+
+def take(opportunity_id: int, seats: int = 1) -> bool:
+    """Takes the seats, False (and none taken) when they aren't free."""
+    return bool(
+        Opportunity.objects.filter(_has_room(seats), pk=opportunity_id).update(
+            filled=F("filled") + seats
+        )
+    )
+
+
+def take_each(opportunity_ids: typing.Collection[int]) -> bool:
+    """Takes a seat of each opportunity with one UPDATE, False when some had
+    none free. The caller rolls back the seats taken then."""
+    taken = Opportunity.objects.filter(_has_room(1), pk__in=opportunity_ids).update(
+        filled=F("filled") + 1
+    )
+    return taken == len(opportunity_ids)
+
+
+def over_capacity(opportunity_id: int) -> bool:
+    """Whether more volunteers are signed up than the capacity allows."""
+    return Opportunity.objects.filter(
+        pk=opportunity_id, capacity__lt=F("filled")
+    ).exists()
+
+
+def give_back(opportunity_ids: typing.Iterable[int], seats: int = 1) -> None:
+    Opportunity.objects.filter(pk__in=opportunity_ids).update(
+        filled=F("filled") - seats
+    )
+
+
+def recount(opportunity_ids: typing.Iterable[int]) -> None:
+    """Sets filled to the number of sign-ups, after changes that didn't take
+    seats."""
+    counts = (
+        SignUp.objects.filter(opportunity=OuterRef("pk"))
+        .order_by()
+        .values("opportunity")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Opportunity.objects.filter(pk__in=opportunity_ids).update(
+        filled=Coalesce(Subquery(counts), 0)
+    )
+
+
+def wait(opportunity_id: int, volunteer_id: int) -> int:
+    """Puts the volunteer on the waitlist (once), returns their place in it."""
+    entry, _ = WaitlistEntry.objects.get_or_create(
+        opportunity_id=opportunity_id, volunteer_id=volunteer_id
+    )
+    return WaitlistEntry.objects.filter(
+        opportunity_id=opportunity_id, id__lte=entry.id
+    ).count()
+
+
+def promote(opportunity: Opportunity) -> typing.List[int]:
+    """
+    Gives the opportunity's free seats to the head of its waitlist, returns
+    the volunteers signed up. The caller holds the row (see lock()). Shifts
+    the volunteers took while waiting aren't checked, their schedules flag
+    any overlap (see myapi/schedule.py).
+    """
+    waitlist = WaitlistEntry.objects.filter(opportunity_id=opportunity.pk)
+    if not waitlist.exists():
+        return []
+
+    promoted = []
+    while take(opportunity.pk):
+        entry = waitlist.order_by("id").first()
+        if entry is None:
+            give_back([opportunity.pk])
+            break
+        entry.delete()
+        try:
+            with transaction.atomic():
+                SignUp.objects.create(
+                    opportunity_id=opportunity.pk,
+                    volunteer_id=entry.volunteer_id,
+                    start_time=opportunity.start_time,
+                    end_time=opportunity.end_time,
+                )
+        except IntegrityError:
+            # Signed up meanwhile and counted then, the seat is still free
+            give_back([opportunity.pk])
+            continue
+        promoted.append(entry.volunteer_id)
+
+    if promoted:
+        sign_ups_changed("post_add", opportunity, Volunteer, promoted)
+    return promoted
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from .models import Opportunity
 from .models import Volunteer
@@ -6,12 +8,39 @@ from .models import Task
 from .models import Comment
 from .models import Post
 
+from . import seats
+from .counters import LikeCounterBuffer
+
 
 class OpportunitySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Opportunity
         fields = "__all__"
+        # Moved by sign-ups only (see myapi/seats.py)
+        read_only_fields = ["filled"]
+
+    def update(self, instance, validated_data):
+        # Checked after the write, against the seats taken by then
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if "capacity" in validated_data and seats.over_capacity(instance.pk):
+                raise serializers.ValidationError(
+                    {"capacity": ["More volunteers are signed up than this."]}
+                )
+        return instance
+
+
+class OpportunityListSerializer(serializers.ModelSerializer):
+    # List representation: the number of sign-ups instead of every volunteer's
+    # id, the roster is paged through GET /opportunity/<id>/volunteers/. Needs
+    # the annotations of OpportunityDao.get_opportunity_list
+    volunteer_count = serializers.IntegerField(read_only=True)
+    is_signed_up = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Opportunity
+        exclude = ["volunteers"]
 
 
 class FilteredOpportunitySerializer(serializers.Serializer):
@@ -24,7 +53,74 @@ class FilteredOpportunitySerializer(serializers.Serializer):
     organization_id = serializers.IntegerField(required=False)
 
 
-class VolunteerSerializer(serializers.ModelSerializer):
+class ScheduleOpportunitySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Opportunity
+        exclude = ["volunteers"]
+
+
+class ScheduleEntrySerializer(serializers.Serializer):
+    # A shift of GET /volunteer/<id>/schedule/, conflicts are the ids of the
+    # other opportunities on the schedule overlapping it
+    opportunity = ScheduleOpportunitySerializer()
+    conflicts = serializers.ListField(child=serializers.IntegerField())
+
+
+class ScheduleBlockSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    opportunity_ids = serializers.ListField(child=serializers.IntegerField())
+
+
+class CalendarEntrySerializer(serializers.Serializer):
+    # An opportunity or event of GET /calendar/, kind tells which
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    location = serializers.CharField()
+    organization_id = serializers.IntegerField()
+
+
+class SignUpVolunteersSerializer(serializers.Serializer):
+    volunteer_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.SIGN_UP_BATCH_MAX_SIZE,
+    )
+
+
+class SignUpOpportunitiesSerializer(serializers.Serializer):
+    opportunity_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.SIGN_UP_BATCH_MAX_SIZE,
+    )
+
+
+class SparseFieldsetMixin:
+    """
+    Lets the caller pick a subset of the serializer's fields, e.g.
+    VolunteerSerializer(volunteers, many=True, fields=["id", "first_name"]).
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": f"Unknown fields: {', '.join(sorted(unknown))}"}
+                )
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class VolunteerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Volunteer
@@ -46,6 +142,26 @@ class VolunteerSerializer(serializers.ModelSerializer):
         ]
 
 
+class VolunteerDirectorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Slim projection for directory pages, leaves out the long profile texts
+    # (other_organizations, other_networks, about_me, skills_interests)
+
+    class Meta:
+        model = Volunteer
+        fields = [
+            "id",
+            "first_name",
+            "last_name",
+            "email",
+            "gender",
+            "is_active",
+            "pronouns",
+            "title",
+            "primary_organization",
+            "profile_image",
+        ]
+
+
 class CreateVolunteerSerializer(serializers.ModelSerializer):
 
     first_name = serializers.CharField(required=False, allow_blank=True)
@@ -173,5 +289,20 @@ class PostSerializer(serializers.ModelSerializer):
         model = Post
         fields = ["id", "volunteer", "volunteer_id",
                   "content", "created_at", "image",
-                  "likes", "liked_by", "comments"]
-        read_only_fields = ["id", "created_at", "likes", "liked_by", "comments"]
+                  "likes", "liked_by", "comments", "comment_count"]
+        read_only_fields = ["id", "created_at", "likes", "liked_by", "comments",
+                            "comment_count"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        # With write-behind likes the row lags behind, add what is pending.
+        # List views pass the pending deltas of the whole page in the context.
+        if settings.POST_LIKES_WRITE_BEHIND and "likes" in data:
+            pending_likes = self.context.get("pending_likes")
+            if pending_likes is not None:
+                data["likes"] += pending_likes.get(instance.id, 0)
+            else:
+                data["likes"] += LikeCounterBuffer.pending(instance.id)
+
+        return data
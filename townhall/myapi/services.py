@@ -1,17 +1,20 @@
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password
 
 # from django.core.mail import send_mail
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.cache import cache
 
-# from django.conf import settings
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.db.models.query import QuerySet
 from django.core.validators import EmailValidator
+import heapq
 import logging
 import typing
+from datetime import datetime, timedelta
 
 from .dao import VolunteerDao as volunteer_dao
 from .dao import OpportunityDao as opportunity_dao
@@ -22,6 +25,16 @@ from .dao import ProjectDao as project_dao
 from .dao import PostDao as post_dao
 from .dao import CommentDao as comment_dao
 from .dao import EventDao as event_dao
+from .dao import SearchDao as search_dao
+
+from . import ratelimit
+from . import schedule
+from . import seats
+from .backends import EmailBackend
+from .counters import LikeCounterBuffer
+from .ratelimit import RateLimit
+from .search import DOCUMENTS as SEARCHABLE_KINDS
+from .search import SearchHit
 
 from .types import CreateVolunteerData
 from .types import UpdateVolunteerData
@@ -40,6 +53,10 @@ from .types import UpdateOrganizationData
 from .types import FilteredOrganizationData
 
 from .types import CreatePostData, UpdatePostData
+from .types import CalendarEntry
+from .types import CursorPage
+from .types import Schedule
+from .types import SignUpResult
 from .types import CreateCommentData
 from .types import CreateEventData
 from .types import CreateProjectData
@@ -50,6 +67,7 @@ from .models import Organization
 from .models import Task
 from .models import Project
 from .models import Post
+from .models import Comment
 from .models import Event
 
 User = get_user_model()
@@ -136,23 +154,57 @@ class VolunteerServices:
         filter_volunteer_data: typing.Optional[FilterVolunteerData] = None,
     ) -> QuerySet[Volunteer]:
         if filter_volunteer_data is not None:
-            filters = {}
-
-            if filter_volunteer_data.first_name:
-                filters["first_name__icontains"] = filter_volunteer_data.first_name
-            if filter_volunteer_data.last_name:
-                filters["last_name__icontains"] = filter_volunteer_data.last_name
-            if filter_volunteer_data.email:
-                filters["email__iexact"] = filter_volunteer_data.email
-            if filter_volunteer_data.is_active is not None:
-                filters["is_active"] = filter_volunteer_data.is_active
-            if filter_volunteer_data.gender:
-                filters["gender__icontains"] = filter_volunteer_data.gender
-
+            filters = VolunteerServices.build_volunteer_filters(filter_volunteer_data)
             return volunteer_dao.filter_all_volunteers(filtersDict=filters)
         else:
             return volunteer_dao.get_volunteers_all()
 
+    def build_volunteer_filters(filter_volunteer_data: FilterVolunteerData) -> dict:
+        filters = {}
+
+        if filter_volunteer_data.first_name:
+            filters["first_name__icontains"] = filter_volunteer_data.first_name
+        if filter_volunteer_data.last_name:
+            filters["last_name__icontains"] = filter_volunteer_data.last_name
+        if filter_volunteer_data.email:
+            filters["email__iexact"] = filter_volunteer_data.email
+        if filter_volunteer_data.is_active is not None:
+            filters["is_active"] = filter_volunteer_data.is_active
+        if filter_volunteer_data.gender:
+            filters["gender__icontains"] = filter_volunteer_data.gender
+
+        return filters
+
+    def get_volunteer_directory_page(
+        filter_volunteer_data: typing.Optional[FilterVolunteerData],
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer=None,
+        estimate_total: bool = False,
+    ) -> CursorPage:
+        filters = {}
+        if filter_volunteer_data is not None:
+            filters = VolunteerServices.build_volunteer_filters(filter_volunteer_data)
+
+        return volunteer_dao.get_volunteers_page(
+            filtersDict=filters,
+            limit=limit,
+            cursor=cursor,
+            serializer=serializer,
+            estimate_total=estimate_total,
+        )
+
+    def get_matching_opportunities(
+        id: int, limit: int
+    ) -> typing.List[typing.Tuple[Opportunity, float]]:
+        if not Volunteer.objects.filter(id=id).exists():
+            raise ValidationError(
+                f"Volunteer with the given id: {id}, does not exist.",
+                code="not_found",
+            )
+
+        return volunteer_dao.get_matching_opportunities(volunteer_id=id, limit=limit)
+
     def get_all_filtered_opportunities_of_a_volunteer(
         filtered_opportunity_data: FilteredOpportunityData,
     ) -> QuerySet[Opportunity]:
@@ -179,9 +231,40 @@ class VolunteerServices:
             filters_dict=filters
         )
 
-    def add_volunteer_to_opportunity(volunteer_id: int, opportunity_id: int) -> None:
+    def get_calendar_feed(volunteer_id: int) -> str:
         try:
-            volunteer_dao.add_volunteer_to_opportunity(volunteer_id, opportunity_id)
+            return volunteer_dao.get_calendar_feed(volunteer_id)
+        except Volunteer.DoesNotExist:
+            raise ValidationError(
+                f"Volunteer with the given id: {volunteer_id}, does not exist.",
+                code="not_found",
+            )
+
+    def get_schedule(
+        volunteer_id: int,
+        start: typing.Optional[datetime] = None,
+        end: typing.Optional[datetime] = None,
+    ) -> Schedule:
+        # Upcoming shifts unless asked for earlier ones
+        if start is None:
+            start = timezone.now()
+        if end is not None and end <= start:
+            raise ValidationError("to must be later than from.", code="invalid")
+        try:
+            return volunteer_dao.get_schedule(volunteer_id, start, end)
+        except Volunteer.DoesNotExist:
+            raise ValidationError(
+                f"Volunteer with the given id: {volunteer_id}, does not exist.",
+                code="not_found",
+            )
+
+    def add_volunteer_to_opportunity(
+        volunteer_id: int, opportunity_id: int
+    ) -> SignUpResult:
+        try:
+            return volunteer_dao.add_volunteer_to_opportunity(
+                volunteer_id, opportunity_id
+            )
         except Volunteer.DoesNotExist:
             raise ValidationError(
                 f"Volunteer with the given id: {volunteer_id}, does not exist."
@@ -190,6 +273,59 @@ class VolunteerServices:
             raise ValidationError(
                 f"Opportunity with the given id: {opportunity_id}, does not exist."
             )
+        except schedule.ScheduleConflict as e:
+            raise ValidationError(
+                "The volunteer is signed up for overlapping opportunities: "
+                f"{', '.join(str(id) for id in sorted(e.ids))}.",
+                code="conflict",
+            )
+
+    def add_opportunities_to_volunteer(
+        volunteer_id: int, opportunity_ids: typing.List[int]
+    ) -> None:
+        opportunity_ids = list(dict.fromkeys(opportunity_ids))
+        missing = set(opportunity_ids) - opportunity_dao.existing_opportunity_ids(
+            opportunity_ids
+        )
+        if missing:
+            raise ValidationError(
+                "Opportunities with the given ids do not exist: "
+                f"{', '.join(str(id) for id in sorted(missing))}.",
+                code="invalid",
+            )
+        try:
+            volunteer_dao.add_opportunities_to_volunteer(volunteer_id, opportunity_ids)
+        except Volunteer.DoesNotExist:
+            raise ValidationError(
+                f"Volunteer with the given id: {volunteer_id}, does not exist.",
+                code="not_found",
+            )
+        except schedule.ScheduleConflict as e:
+            raise ValidationError(
+                "Opportunities with the given ids overlap each other or the "
+                "volunteer's schedule: "
+                f"{', '.join(str(id) for id in e.ids)}.",
+                code="conflict",
+            )
+        except seats.OpportunityFull as e:
+            raise ValidationError(
+                "Opportunities with the given ids have no seats left: "
+                f"{', '.join(str(id) for id in e.opportunity_ids)}.",
+                code="full",
+            )
+
+    def remove_opportunities_from_volunteer(
+        volunteer_id: int, opportunity_ids: typing.List[int]
+    ) -> None:
+        try:
+            volunteer_dao.remove_opportunities_from_volunteer(
+                volunteer_id, list(dict.fromkeys(opportunity_ids))
+            )
+        except Volunteer.DoesNotExist:
+            raise ValidationError(
+                f"Volunteer with the given id: {volunteer_id}, does not exist.",
+                code="not_found",
+            )
 
     def remove_volunteer_from_opportunity(
         volunteer_id: int, opportunity_id: int
@@ -273,16 +409,31 @@ class VolunteerServices:
         except ValidationError:
             raise
 
-    def authenticate_volunteer(email: str, password: str) -> typing.Optional[Volunteer]:
+    def authenticate_volunteer(
+        email: str, password: str, ip: typing.Optional[str] = None
+    ) -> typing.Optional[Volunteer]:
         # This method returns the volunteer on successful authentication
-        # Rate limiting
-        rate_limit_key = f"login_attempts_{email}"
-        attempts = cache.get(rate_limit_key, 0)
-        if attempts >= 5:  # Assuming a limit of 5 attempts
-            logger.warning(f"Rate limit exceeded for email: {email}")
-            raise ValidationError("Too many login attempts. Please try again later.")
+        # Rate limiting, every attempt counts towards the limit of the email
+        # and of the client's IP, shared by all worker processes
+        email_rate = RateLimit("login_email", *settings.LOGIN_RATE_LIMIT_PER_EMAIL)
+        limits = [(email_rate, email)]
+        if ip:
+            ip_rate = RateLimit("login_ip", *settings.LOGIN_RATE_LIMIT_PER_IP)
+            limits.append((ip_rate, ip))
+        retry_after = max(
+            ratelimit.attempt(rate, identifier) or 0 for rate, identifier in limits
+        )
+        if retry_after:
+            logger.warning(f"Rate limit exceeded for email: {email}, ip: {ip}")
+            raise ValidationError(
+                "Too many login attempts. Please try again later.",
+                code="rate_limited",
+                params={"retry_after": retry_after},
+            )
 
-        volunteer = authenticate(username=email, password=password)
+        # Only EmailBackend knows volunteers, authenticate() would also run
+        # ModelBackend and hash the password a second time on every failure
+        volunteer = EmailBackend().authenticate(None, username=email, password=password)
 
         if volunteer is not None:
             if not volunteer.is_active:
@@ -290,11 +441,10 @@ class VolunteerServices:
                 raise ValidationError("Account is inactive.")
 
             logger.info(f"Successful login for email: {email}")
-            cache.delete(rate_limit_key)  # Reset on successful login
+            ratelimit.reset(email_rate, email)  # Reset on successful login
             return volunteer
         else:
             logger.warning(f"Failed login attempt for email: {email}")
-            cache.set(rate_limit_key, attempts + 1, timeout=300)  # 5-minute timeout
             return None
 
     def validate_volunteer(email: str, password: str) -> None:
@@ -335,6 +485,11 @@ class OpportunityServices:
         print(f"Fetched opportunities{opportunities}")
         return opportunities
 
+    def get_opportunity_list(
+        volunteer_id: typing.Optional[int] = None,
+    ) -> QuerySet[Opportunity]:
+        return opportunity_dao.get_opportunity_list(volunteer_id=volunteer_id)
+
     def create_opportunity(create_opportunity_data: CreateOpportunityData) -> None:
         opportunity_dao.create_opportunity(
             create_opportunity_data=create_opportunity_data
@@ -358,16 +513,122 @@ class OpportunityServices:
             id=id, update_opportunity_data=update_opportunity_data
         )
 
-    def add_volunteer_to_opportunity(opportunity_id: int, volunteer_id: int) -> None:
-        opportunity_dao.add_volunteer_to_opportunity(
-            opportunity_id=opportunity_id, volunteer_id=volunteer_id
+    def add_volunteer_to_opportunity(
+        opportunity_id: int, volunteer_id: int
+    ) -> typing.Optional[SignUpResult]:
+        try:
+            return opportunity_dao.add_volunteer_to_opportunity(
+                opportunity_id=opportunity_id, volunteer_id=volunteer_id
+            )
+        except schedule.ScheduleConflict as e:
+            raise ValidationError(
+                "The volunteer is signed up for overlapping opportunities: "
+                f"{', '.join(str(id) for id in sorted(e.ids))}.",
+                code="conflict",
+            )
+
+    def add_volunteers_to_opportunity(
+        opportunity_id: int, volunteer_ids: typing.List[int]
+    ) -> None:
+        volunteer_ids = list(dict.fromkeys(volunteer_ids))
+        missing = set(volunteer_ids) - volunteer_dao.existing_volunteer_ids(
+            volunteer_ids
         )
+        if missing:
+            raise ValidationError(
+                "Volunteers with the given ids do not exist: "
+                f"{', '.join(str(id) for id in sorted(missing))}.",
+                code="invalid",
+            )
+        try:
+            opportunity_dao.add_volunteers_to_opportunity(
+                opportunity_id=opportunity_id, volunteer_ids=volunteer_ids
+            )
+        except Opportunity.DoesNotExist:
+            raise ValidationError(
+                f"Opportunity with the given id: {opportunity_id}, does not exist.",
+                code="not_found",
+            )
+        except schedule.ScheduleConflict as e:
+            raise ValidationError(
+                "Volunteers with the given ids are signed up for opportunities "
+                f"overlapping this one: {', '.join(str(id) for id in e.ids)}.",
+                code="conflict",
+            )
+        except seats.OpportunityFull:
+            raise ValidationError(
+                "The opportunity doesn't have enough seats left for these "
+                "volunteers.",
+                code="full",
+            )
+
+    def remove_volunteers_from_opportunity(
+        opportunity_id: int, volunteer_ids: typing.List[int]
+    ) -> None:
+        try:
+            opportunity_dao.remove_volunteers_from_opportunity(
+                opportunity_id=opportunity_id,
+                volunteer_ids=list(dict.fromkeys(volunteer_ids)),
+            )
+        except Opportunity.DoesNotExist:
+            raise ValidationError(
+                f"Opportunity with the given id: {opportunity_id}, does not exist.",
+                code="not_found",
+            )
+
+    def fill_from_waitlist(opportunity_id: int) -> typing.List[int]:
+        try:
+            return opportunity_dao.fill_from_waitlist(opportunity_id=opportunity_id)
+        except Opportunity.DoesNotExist:
+            raise ValidationError(
+                f"Opportunity with the given id: {opportunity_id}, does not exist.",
+                code="not_found",
+            )
+
+    def get_waitlist(opportunity_id: int) -> QuerySet[Volunteer]:
+        try:
+            return opportunity_dao.get_waitlist(opportunity_id=opportunity_id)
+        except Opportunity.DoesNotExist:
+            raise ValidationError(
+                f"Opportunity with the given id: {opportunity_id}, does not exist.",
+                code="not_found",
+            )
+
+    def get_matching_volunteers(
+        id: int, limit: int
+    ) -> typing.List[typing.Tuple[Volunteer, float]]:
+        if opportunity_dao.get_opportunity(id=id) is None:
+            raise ValidationError(
+                f"Opportunity with the given id: {id}, does not exist.",
+                code="not_found",
+            )
+
+        return opportunity_dao.get_matching_volunteers(opportunity_id=id, limit=limit)
 
     def get_all_volunteers_of_a_opportunity(opportunity_id: int) -> QuerySet[Volunteer]:
         return opportunity_dao.get_all_volunteers_of_a_opportunity(
             opportunity_id=opportunity_id
         )
 
+    def get_volunteers_page(
+        opportunity_id: int,
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer=None,
+    ) -> CursorPage:
+        page = opportunity_dao.get_volunteers_page(
+            opportunity_id=opportunity_id,
+            limit=limit,
+            cursor=cursor,
+            serializer=serializer,
+        )
+        if page is None:
+            raise ValidationError(
+                f"Opportunity with the given id: {opportunity_id}, does not exist.",
+                code="not_found",
+            )
+        return page
+
     def get_all_opportunities_of_a_volunteer(
         volunteer_id: int,
     ) -> QuerySet[Opportunity]:
@@ -398,6 +659,15 @@ class OrganizationServices:
     def get_organization(id: int) -> typing.Optional[Organization]:
         return organization_dao.get_organization(id=id)
 
+    def get_calendar_feed(organization_id: int) -> str:
+        try:
+            return organization_dao.get_calendar_feed(organization_id)
+        except Organization.DoesNotExist:
+            raise ValidationError(
+                f"Organization with the given id: {organization_id}, does not exist.",
+                code="not_found",
+            )
+
     def get_organization_all(id: int) -> typing.List[Organization]:
         print("Fetching organization")
         organization = organization_dao.get_organization_all()
@@ -462,7 +732,7 @@ class TaskServices:
         task_id: int, update_task_data: UpdateTaskData
     ) -> typing.Optional[Task]:
 
-        task = task_dao.get_task_by_id(task_id)
+        task = task_dao.get_task_for_update(task_id)
 
         if not task:
             return None
@@ -544,9 +814,9 @@ class ProjectServices:
 
 class PostServices:
     @staticmethod
-    def get_post(id: int) -> typing.Optional[Post]:
+    def get_post(id: int, serializer_class=None) -> typing.Optional[Post]:
         try:
-            post = post_dao.get_post(id=id)
+            post = post_dao.get_post(id=id, serializer_class=serializer_class)
             return post
         except Post.DoesNotExist:
             raise ValidationError(f"Post with the given id: {id}, does not exist.")
@@ -555,6 +825,27 @@ class PostServices:
     def get_all_posts() -> typing.List[Post]:
         return post_dao.get_all_posts()
 
+    @staticmethod
+    def get_posts_page(
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer_class=None,
+        comment_preview: typing.Optional[int] = None,
+    ) -> CursorPage:
+        return post_dao.get_posts_page(
+            limit=limit,
+            cursor=cursor,
+            serializer_class=serializer_class,
+            comment_preview=comment_preview,
+        )
+
+    @staticmethod
+    def get_pending_likes(post_ids: typing.List[int]) -> typing.Dict[int, int]:
+        # Like deltas not yet written to the posts, see LikeCounterBuffer
+        if not settings.POST_LIKES_WRITE_BEHIND:
+            return {}
+        return LikeCounterBuffer.pending_many(post_ids)
+
     @staticmethod
     def create_post(create_post_data: CreatePostData) -> Post:
         post = post_dao.create_post(post_data=create_post_data)
@@ -565,6 +856,27 @@ class PostServices:
         post = post_dao.update_post(id=id, post_data=update_post_data)
         return post
 
+    @staticmethod
+    def toggle_like(post_id: int, volunteer_id: int) -> typing.Tuple[bool, int]:
+        try:
+            liked, likes = post_dao.toggle_like(
+                post_id=post_id,
+                volunteer_id=volunteer_id,
+                write_behind=settings.POST_LIKES_WRITE_BEHIND,
+            )
+            if settings.POST_LIKES_WRITE_BEHIND:
+                likes += LikeCounterBuffer.pending(post_id)
+            return liked, likes
+        except Post.DoesNotExist:
+            raise ValidationError(
+                f"Post with the given id: {post_id}, does not exist.",
+                code="not_found",
+            )
+        except Volunteer.DoesNotExist:
+            raise ValidationError(
+                f"Volunteer with the given id: {volunteer_id}, does not exist."
+            )
+
     @staticmethod
     def delete_post(post_id: int) -> None:
         try:
@@ -579,6 +891,30 @@ class CommentServices:
         comment = comment_dao.create_comment(create_comment_data=create_comment_data)
         return comment
 
+    @staticmethod
+    def delete_comment(comment: Comment) -> None:
+        comment_dao.delete_comment(comment)
+
+    @staticmethod
+    def get_comments_page(
+        post_id: int,
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        serializer_class=None,
+    ) -> CursorPage:
+        if not post_dao.exists(id=post_id):
+            raise ValidationError(
+                f"Post with the given id: {post_id}, does not exist.",
+                code="not_found",
+            )
+
+        return comment_dao.get_comments_page(
+            post_id=post_id,
+            limit=limit,
+            cursor=cursor,
+            serializer_class=serializer_class,
+        )
+
 
 class EventServices:
 
@@ -586,3 +922,72 @@ class EventServices:
     def create_event(create_event_data: CreateEventData) -> Event:
         event = event_dao.create_event(create_event_data=create_event_data)
         return event
+
+
+class CalendarServices:
+
+    @staticmethod
+    def get_calendar(
+        start: typing.Optional[datetime] = None,
+        end: typing.Optional[datetime] = None,
+        organization_id: typing.Optional[int] = None,
+    ) -> typing.List[CalendarEntry]:
+        # From the start of today for CALENDAR_DEFAULT_DAYS unless asked
+        if start is None:
+            start = timezone.localtime().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        if end is None:
+            end = start + timedelta(days=settings.CALENDAR_DEFAULT_DAYS)
+        if end <= start:
+            raise ValidationError("to must be later than from.", code="invalid")
+        if end - start > timedelta(days=settings.CALENDAR_MAX_DAYS):
+            raise ValidationError(
+                f"The window can't be longer than {settings.CALENDAR_MAX_DAYS} days.",
+                code="invalid",
+            )
+
+        opportunities = opportunity_dao.get_opportunities_in_window(
+            start, end, organization_id
+        )
+        events = event_dao.get_events_in_window(start, end, organization_id)
+
+        def entries(kind, rows):
+            for row in rows:
+                yield CalendarEntry(
+                    kind=kind,
+                    id=row.id,
+                    title=row.title,
+                    start_time=row.start_time,
+                    end_time=row.end_time,
+                    location=row.location,
+                    organization_id=row.organization_id,
+                )
+
+        # Both come in time order, merge them
+        return list(
+            heapq.merge(
+                entries("opportunity", opportunities),
+                entries("event", events),
+                key=lambda entry: (entry.start_time, entry.kind, entry.id),
+            )
+        )
+
+
+class SearchServices:
+
+    @staticmethod
+    def search(
+        query: str, kinds: typing.Optional[typing.List[str]] = None, limit: int = 20
+    ) -> typing.List[SearchHit]:
+        if not query or not query.strip():
+            raise ValidationError("The 'q' query parameter is required.")
+
+        unknown = set(kinds or []) - set(SEARCHABLE_KINDS)
+        if unknown:
+            raise ValidationError(
+                f"Unknown search types: {', '.join(sorted(unknown))}. "
+                f"Expected any of: {', '.join(SEARCHABLE_KINDS)}."
+            )
+
+        return search_dao.search(query, kinds=kinds, limit=limit)
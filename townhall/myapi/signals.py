@@ -0,0 +1,231 @@
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db.models.signals import post_init, pre_delete
+from django.dispatch import receiver
+
+from . import conditional, entity_cache, ical, identity_map, matching
+from . import response_cache
+from . import schedule, search, seats
+from .models import Comment, Event, Opportunity, Organization, Post, PostLike
+from .models import SignUp, Task, Volunteer
+
+SEARCHABLE_MODELS = (Volunteer, Opportunity, Organization, Event, Post)
+MATCHABLE_MODELS = (Volunteer, Opportunity)
+# Tables read by the endpoints with conditional GET, and their columns none of
+# those payloads show (saves touching only these keep the ETags valid)
+VERSIONED_MODELS = (Volunteer, Opportunity, Organization, Task, Post, PostLike, Comment)
+UNVERSIONED_FIELDS = {Volunteer: {"last_login", "password"}}
+# Models whose updated_at also moves when their many-to-many relations change
+TOUCHED_MODELS = (Opportunity,)
+
+
+# Keep the full-text search index in step with the rows it mirrors.
+# Bulk operations (QuerySet.update, bulk_create) send no signals, code using
+# them on these models has to call search.index_instance itself.
+@receiver(post_save)
+def index_searchable(sender, instance, **kwargs):
+    if sender in SEARCHABLE_MODELS:
+        search.index_instance(instance)
+
+
+@receiver(post_delete)
+def unindex_searchable(sender, instance, **kwargs):
+    if sender in SEARCHABLE_MODELS:
+        search.remove_instance(instance)
+
+
+# Keep Post.comment_count in step with comments deleted any way: through the
+# DAO, the admin or along with the volunteer who wrote them. Comments deleted
+# along with their post leave nothing to count.
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Post) or getattr(origin, "model", None) is Post:
+        return
+    Post.objects.filter(id=instance.post_id).update(
+        comment_count=F("comment_count") - 1, updated_at=Now()
+    )
+    identity_map.forget(Post, instance.post_id)
+
+
+# Likes deleted along with the volunteer who gave them lower Post.likes too.
+# The ones PostDao.toggle_like deletes are counted there (or buffered, see
+# LikeCounterBuffer), the ones deleted along with their post leave nothing
+# to count.
+@receiver(post_delete, sender=PostLike)
+def uncount_deleted_like(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Post, PostLike)):
+        return
+    if getattr(origin, "model", None) in (Post, PostLike):
+        return
+    Post.objects.filter(id=instance.post_id).update(
+        likes=F("likes") - 1, updated_at=Now()
+    )
+    identity_map.forget(Post, instance.post_id)
+
+
+# Keep the skills matching vectors in step with the text they are built from
+@receiver(post_save)
+def vectorize_matchable(sender, instance, update_fields=None, **kwargs):
+    if sender in MATCHABLE_MODELS:
+        matching.index_instance(instance, update_fields=update_fields)
+
+
+@receiver(post_delete)
+def unvectorize_matchable(sender, instance, **kwargs):
+    if sender in MATCHABLE_MODELS:
+        matching.remove_instance(instance)
+
+
+# Drop cached rows of the DAO lookups when they change
+@receiver(post_save)
+@receiver(post_delete)
+def forget_cached_entity(sender, instance, **kwargs):
+    entity_cache.forget(sender, instance.pk)
+
+
+# A request keeps the object it saved, but not one saved behind its back
+@receiver(post_save)
+def forget_replaced_identity(sender, instance, **kwargs):
+    identity_map.forget(sender, instance.pk, instance=instance)
+
+
+@receiver(post_delete)
+def forget_deleted_identity(sender, instance, **kwargs):
+    identity_map.forget(sender, instance.pk)
+
+
+@receiver(m2m_changed)
+def forget_cached_relations(sender, instance, action, model, pk_set, **kwargs):
+    if action.startswith("post_"):
+        entity_cache.forget(type(instance), instance.pk)
+        if pk_set:
+            entity_cache.forget_many(model, pk_set)
+
+
+# Invalidate the ETags of the endpoints reading a table when it changes
+@receiver(post_save)
+def bump_saved_table_version(sender, update_fields=None, **kwargs):
+    if sender not in VERSIONED_MODELS:
+        return
+    if update_fields and update_fields <= UNVERSIONED_FIELDS.get(sender, set()):
+        return
+    conditional.bump(sender)
+
+
+@receiver(post_delete)
+def bump_deleted_table_version(sender, **kwargs):
+    if sender in VERSIONED_MODELS:
+        conditional.bump(sender)
+
+
+@receiver(m2m_changed)
+def bump_related_table_versions(sender, instance, action, model, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    changed = [m for m in (type(instance), model) if m in VERSIONED_MODELS]
+    conditional.bump(*changed)
+
+    # The relations are part of the payload of the rows on both sides
+    if type(instance) in TOUCHED_MODELS:
+        conditional.touch(type(instance), [instance.pk])
+    if model in TOUCHED_MODELS and pk_set:
+        conditional.touch(model, pk_set)
+
+
+# Purge the cached responses showing a row when it changes
+@receiver(post_save)
+@receiver(post_delete)
+def purge_cached_responses(sender, instance, **kwargs):
+    response_cache.purge(sender, [instance.pk])
+
+
+@receiver(m2m_changed)
+def purge_related_cached_responses(sender, instance, action, model, pk_set, **kwargs):
+    if action.startswith("post_"):
+        response_cache.purge(type(instance), [instance.pk])
+        if pk_set:
+            response_cache.purge(model, pk_set)
+
+
+# Purge the cached calendar feeds showing a row when it changes
+@receiver(post_save)
+@receiver(post_delete)
+def purge_calendar_feeds(sender, instance, **kwargs):
+    ical.purge(sender, instance)
+
+
+# The organization whose feed shows the row, purged too if the row moves
+@receiver(post_init, sender=Opportunity)
+@receiver(post_init, sender=Event)
+def remember_calendar_organization(sender, instance, **kwargs):
+    ical.remember_organization(instance)
+
+
+@receiver(m2m_changed, sender=SignUp)
+def purge_volunteer_calendar_feeds(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith("post_"):
+        ical.purge_sign_ups(instance, reverse, pk_set)
+
+
+# Sign-ups added or removed through the related managers (admin, shell) took
+# no seats, count them again. The DAO's changes are counted already.
+@receiver(m2m_changed, sender=SignUp)
+def recount_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    if kwargs.get("seats_counted"):
+        return
+    if reverse and action == "pre_clear":
+        instance._cleared_opportunity_ids = list(
+            instance.opportunities.values_list("id", flat=True)
+        )
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            opportunity_ids = [instance.pk]
+        elif action == "post_clear":
+            opportunity_ids = instance.__dict__.pop("_cleared_opportunity_ids", [])
+        else:
+            opportunity_ids = list(pk_set)
+        seats.recount(opportunity_ids)
+        # Purged by the receivers above before filled changed
+        response_cache.purge(Opportunity, opportunity_ids)
+
+
+# Sign-ups added through the related managers have no times yet, and the ones
+# of an opportunity moved to another time have the old ones. QuerySet.update
+# sends no signals, code changing the times with it has to call
+# schedule.stamp itself.
+@receiver(m2m_changed, sender=SignUp)
+def stamp_added_sign_ups(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_add" and not kwargs.get("seats_counted"):
+        schedule.stamp(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Opportunity)
+def stamp_moved_sign_ups(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or {"start_time", "end_time"} & set(update_fields):
+        schedule.stamp([instance.pk])
+
+
+# Deleting a volunteer deletes their sign-ups, give their seats to the next
+# volunteers waiting
+@receiver(pre_delete, sender=Volunteer)
+def hold_seats_of_deleted_volunteer(sender, instance, **kwargs):
+    instance._seated_opportunity_ids = list(
+        instance.opportunities.values_list("id", flat=True)
+    )
+    seats.lock(instance._seated_opportunity_ids)
+
+
+@receiver(post_delete, sender=Volunteer)
+def release_seats_of_deleted_volunteer(sender, instance, **kwargs):
+    opportunity_ids = instance.__dict__.pop("_seated_opportunity_ids", [])
+    if not opportunity_ids:
+        return
+    seats.give_back(opportunity_ids)
+    # The cascade sends no m2m_changed, tell the caches like the DAO's
+    # removals do (entities, responses, ETags, calendar feeds)
+    seats.sign_ups_changed("post_remove", instance, Opportunity, opportunity_ids)
+    for opportunity in Opportunity.objects.filter(pk__in=opportunity_ids):
+        seats.promote(opportunity)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import types
+from pathlib import Path
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.core import management
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TemplateDatabaseTestRunner(DiscoverRunner):
+    """
+    Test runner that migrates each SQLite test database once and then reuses
+    the result.
+
+    The first run migrates as usual and saves the migrated database as a
+    template file. Later runs copy the template into the test database with
+    SQLite's backup API instead of replaying the migrations. Only the migrate
+    step is replaced, Django still creates, clones (one copy per --parallel
+    test process) and destroys the test databases.
+
+    A template is keyed by a fingerprint of the migration files and of the
+    project modules they import, so changing either rebuilds it. Templates
+    are kept in settings.TEST_DATABASE_TEMPLATE_DIR.
+
+    The shared cache is replaced by a local memory cache while tests run, so
+    they never read or clear the development server's entries, and the
+    entity and response caches are off: test cases roll the database back
+    without any signal, cached rows would outlive them. Their own tests turn
+    them on.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.settings_override = override_settings(
+            CACHES={
+                **settings.CACHES,
+                "shared": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "shared-tests",
+                },
+            },
+            ENTITY_CACHE_ENABLED=False,
+            RESPONSE_CACHE_ENABLED=False,
+        )
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        call_command = management.call_command
+
+        def migrate_from_template(command_name, *args, **options):
+            if command_name == "migrate" and not self.keepdb:
+                connection = connections[options.get("database", "default")]
+                if connection.vendor == "sqlite":
+                    return self.migrate_from_template(
+                        connection, call_command, *args, **options
+                    )
+            return call_command(command_name, *args, **options)
+
+        # create_test_db() imports call_command from here when it runs
+        with mock.patch.object(management, "call_command", migrate_from_template):
+            return super().setup_databases(**kwargs)
+
+    def migrate_from_template(self, connection, call_command, *args, **options):
+        template = self.template_path(connection)
+        connection.ensure_connection()
+
+        if template.exists():
+            if self.verbosity >= 1:
+                self.log(f"Using the migrated test database template {template}")
+            source = sqlite3.connect(template)
+            try:
+                source.backup(connection.connection)
+            finally:
+                source.close()
+            return
+
+        call_command("migrate", *args, **options)
+
+        template.parent.mkdir(parents=True, exist_ok=True)
+        for stale in template.parent.glob(f"{connection.alias}-*.sqlite3"):
+            stale.unlink(missing_ok=True)
+        # Written under a temporary name so a concurrent run never reads a
+        # half written template
+        partial = template.with_suffix(f".{os.getpid()}.partial")
+        target = sqlite3.connect(partial)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        os.replace(partial, template)
+        if self.verbosity >= 1:
+            self.log(f"Saved the migrated test database template {template}")
+
+    def template_path(self, connection) -> Path:
+        directory = Path(
+            getattr(
+                settings,
+                "TEST_DATABASE_TEMPLATE_DIR",
+                Path(settings.BASE_DIR) / ".test_db_templates",
+            )
+        )
+        return directory / f"{connection.alias}-{migration_fingerprint()}.sqlite3"
+
+
+def migration_fingerprint() -> str:
+    """Hash of everything that decides what the migrations produce."""
+    digest = hashlib.sha256(django.get_version().encode())
+    base_dir = Path(settings.BASE_DIR).resolve()
+
+    files = set()
+    for migration in MigrationLoader(
+        None, ignore_no_migrations=True
+    ).disk_migrations.values():
+        module = sys.modules[type(migration).__module__]
+        files.add(Path(module.__file__).resolve())
+        # Project modules used by RunPython operations (e.g. myapi.search)
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType) and getattr(value, "__file__", None):
+                path = Path(value.__file__).resolve()
+                if base_dir in path.parents:
+                    files.add(path)
+
+    for path in sorted(files):
+        digest.update(str(path).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
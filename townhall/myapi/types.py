@@ -1,7 +1,9 @@
-from typing import Optional
-from dataclasses import dataclass
+from typing import List, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
 
+from .models import Opportunity
+
 
 @dataclass
 class CreateVolunteerData:
@@ -55,6 +57,7 @@ class CreateOpportunityData:
     end_time: datetime
     location: str
     organization_id: int
+    capacity: Optional[int] = None
 
 
 @dataclass
@@ -186,3 +189,101 @@ class CreateProjectData:
     start_date: datetime
     end_date: datetime
     community: int
+
+
+@dataclass
+class CursorPage:
+    """
+    Dataclass representing one page of a cursor paginated list
+    """
+
+    items: List
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
+
+
+@dataclass
+class SignUpResult:
+    """
+    Dataclass representing the outcome of signing a volunteer up for an
+    opportunity, waitlist_position is set when it was full
+    """
+
+    signed_up: bool
+    waitlist_position: Optional[int] = None
+
+
+@dataclass
+class VolunteerImportError:
+    """
+    Dataclass representing a row of a volunteer import that was not created
+    """
+
+    line: int
+    email: Optional[str]
+    errors: List[str]
+
+
+@dataclass
+class VolunteerImportResult:
+    """
+    Dataclass representing the outcome of a volunteer import
+    """
+
+    rows: int = 0
+    created: int = 0
+    errors: List[VolunteerImportError] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ScheduleEntry:
+    """
+    Dataclass representing one shift of a volunteer's schedule, conflicts are
+    the ids of the other opportunities overlapping it
+    """
+
+    opportunity: Opportunity
+    conflicts: List[int]
+
+
+@dataclass
+class ScheduleBlock:
+    """
+    Dataclass representing a stretch of time a volunteer is busy, the shifts
+    in it overlap or follow each other without a break
+    """
+
+    start_time: datetime
+    end_time: datetime
+    opportunity_ids: List[int]
+
+
+@dataclass
+class Schedule:
+    """
+    Dataclass representing the time-ordered shifts of a volunteer and the
+    busy blocks they merge into
+    """
+
+    entries: List[ScheduleEntry]
+    blocks: List[ScheduleBlock]
+
+
+@dataclass
+class CalendarEntry:
+    """
+    Dataclass representing an opportunity or event (kind) on the calendar
+    """
+
+    kind: str
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    location: str
+    organization_id: int
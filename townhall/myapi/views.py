@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.utils import timezone
 from django.forms import ValidationError
 from django.contrib.auth import login
-from .models import Task, Volunteer, Post, Comment
+from .models import Task, Volunteer, Post, Comment, PostLike
+from .models import Opportunity, Organization
+from . import exports, ical, identity_map, volunteer_import
+from .conditional import conditional_get, updated_at_of
+from .response_cache import cached_response, query_tags
 
-from django.contrib.auth.hashers import check_password
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+import codecs
+import dataclasses
 import json
 
 # Follows layered architecture pattern of views -> services -> dao
+from rest_framework import serializers
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework import status
@@ -20,10 +27,16 @@ from .services import OrganizationServices as organization_services
 from .services import TaskServices
 from .services import CommentServices as comment_services
 from .services import PostServices as post_services
+from .services import SearchServices as search_services
+from .services import CalendarServices as calendar_services
 
 from .serializers import OpportunitySerializer, FilteredOpportunitySerializer
+from .serializers import OpportunityListSerializer, CalendarEntrySerializer
+from .serializers import ScheduleBlockSerializer, ScheduleEntrySerializer
+from .serializers import SignUpOpportunitiesSerializer, SignUpVolunteersSerializer
 from .serializers import (
     VolunteerSerializer,
+    VolunteerDirectorySerializer,
     CreateVolunteerSerializer,
     OptionalVolunteerSerializer,
     VolunteerProfileSerializer,
@@ -47,6 +60,9 @@ from .types import (
 
 from .types import FilteredOpportunityData
 
+from .pagination import parse_page_size
+from .schedule import parse_time
+
 from .types import CreateTaskData
 from .types import UpdateTaskData
 
@@ -63,32 +79,46 @@ class VolunteerViewSet(viewsets.ModelViewSet):
                 email = data.get("email")
                 password = data.get("password")
 
-                # Check if the volunteer exists
+                if not email or not password:
+                    return JsonResponse(
+                        {"error": "Email and password are required"}, status=400
+                    )
+
+                # Shares the per-email and per-IP login limits with the rest
+                # of the app, unknown emails get the same answer, after the
+                # same amount of hashing work, as wrong passwords
                 try:
-                    volunteer = Volunteer.objects.get(email=email)
-                except Volunteer.DoesNotExist:
-                    return JsonResponse({"error": "User not found"}, status=404)
-
-                # Validate Password
-                if check_password(password, volunteer.password):
-                    login(
-                        request,
-                        volunteer,
-                        backend='django.contrib.auth.backends.ModelBackend'
+                    volunteer = volunteer_services.authenticate_volunteer(
+                        email, password, ip=request.META.get("REMOTE_ADDR")
                     )
+                except ValidationError as e:
+                    if e.code == "rate_limited":
+                        response = JsonResponse({"error": e.messages[0]}, status=429)
+                        response["Retry-After"] = str(e.params["retry_after"])
+                        return response
+                    return JsonResponse({"error": e.messages[0]}, status=400)
+
+                if volunteer is None:
+                    return JsonResponse(
+                        {"error": "Invalid email or password"}, status=400
+                    )
+
+                login(
+                    request,
+                    volunteer,
+                    backend='django.contrib.auth.backends.ModelBackend'
+                )
 
-                    return JsonResponse({
-                        "message": "Login successful",
-                        "user": {
-                            "id": volunteer.id,
-                            "first_name": volunteer.first_name,
-                            "last_name": volunteer.last_name,
-                            "email": volunteer.email,
-                            "gender": volunteer.gender,
-                        }
-                    }, status=200)
-                else:
-                    return JsonResponse({"error": "Invalid password"}, status=400)
+                return JsonResponse({
+                    "message": "Login successful",
+                    "user": {
+                        "id": volunteer.id,
+                        "first_name": volunteer.first_name,
+                        "last_name": volunteer.last_name,
+                        "email": volunteer.email,
+                        "gender": volunteer.gender,
+                    }
+                }, status=200)
 
             except json.JSONDecodeError:
                 return JsonResponse({"error": "Invalid JSON"}, status=400)
@@ -175,16 +205,32 @@ class VolunteerViewSet(viewsets.ModelViewSet):
 
         try:
             # Call the service method to add volunteer to opportunity
-            volunteer_services.add_volunteer_to_opportunity(
+            sign_up = volunteer_services.add_volunteer_to_opportunity(
                 volunteer_id, opportunity_id
             )
 
+            # A full opportunity puts the volunteer on its waitlist instead
+            if not sign_up.signed_up:
+                return Response(
+                    {
+                        "message": "Opportunity is full, Volunteer added to the "
+                        "waitlist",
+                        "waitlist_position": sign_up.waitlist_position,
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
+
             # Return the successful response
             return Response(
                 {"message": "Volunteer Added to Opportunity Successfully"},
                 status=status.HTTP_201_CREATED,
             )
         except ValidationError as e:
+            # The volunteer has another shift at that time
+            if e.code == "conflict":
+                return Response(
+                    {"message": e.messages[0]}, status=status.HTTP_409_CONFLICT
+                )
             # If services method returns an error, return an error Response
             return Response({"message": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
@@ -214,6 +260,9 @@ class VolunteerViewSet(viewsets.ModelViewSet):
             return Response({"message": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
     # GET All Volunteers (Optional Volunteer Filter)
+    # ?fields=id,first_name returns only the listed fields, ?limit= / ?cursor=
+    # switch to the paginated directory (slim fields unless ?fields= is given)
+    # and ?estimate_total=true adds an approximate total to directory pages
     @action(detail=False, methods=["get"], url_path="volunteer")
     def get_all_volunteers_optional_filter_request(self, request):
         # Transforms requests JSON data into a python dictionary
@@ -221,7 +270,7 @@ class VolunteerViewSet(viewsets.ModelViewSet):
 
         # If the data is NOT valid (when atleast one value exists) then
         # process with the filter, otherwise get all
-        volunteers = None
+        filter_volunteer_data = None
         message = None
         if serializer.is_valid():
             validated_data = serializer.validated_data
@@ -235,28 +284,142 @@ class VolunteerViewSet(viewsets.ModelViewSet):
                 is_active=validated_data.get("is_active", None),
             )
 
-            volunteers = volunteer_services.get_all_volunteers_optional_filter(
-                filter_volunteer_data
-            )
-
             message = "All volunteers with the given filters retreived successfully"
         else:
-            volunteers = volunteer_services.get_all_volunteers_optional_filter(None)
             message = "All Volunteers retreived successfully"
 
+        fields = request.query_params.get("fields")
+        if fields:
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+
+        try:
+            if "limit" in request.query_params or "cursor" in request.query_params:
+                return self._get_volunteer_directory_page(
+                    request, filter_volunteer_data, fields, message
+                )
+
+            volunteers = volunteer_services.get_all_volunteers_optional_filter(
+                filter_volunteer_data
+            )
+            # Create the response serializer for the list of volunteers
+            response_serializer = VolunteerSerializer(
+                volunteers, many=True, fields=fields or None
+            )
+            # Evaluates the queryset once, the emptiness check reuses it
+            data = response_serializer.data
+        except (ValidationError, serializers.ValidationError) as e:
+            detail = e.messages if isinstance(e, ValidationError) else e.detail
+            return Response({"message": detail}, status=status.HTTP_400_BAD_REQUEST)
+
         # If no volunteers exist, return an empty list
-        if not volunteers:
+        if not data:
             return Response(
                 {"message": "No Volunteers were found"},
                 status=status.HTTP_200_OK,
             )
 
-        # Create the response serializer for the list of volunteers
-        response_serializer = VolunteerSerializer(volunteers, many=True)
         return Response(
             {
                 "message": message,
-                "data": response_serializer.data,
+                "data": data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def _get_volunteer_directory_page(
+        self, request, filter_volunteer_data, fields, message
+    ):
+        limit = parse_page_size(
+            request.query_params.get("limit"),
+            default=settings.VOLUNTEER_DIRECTORY_PAGE_SIZE,
+            maximum=settings.VOLUNTEER_DIRECTORY_MAX_PAGE_SIZE,
+        )
+        estimate_total = request.query_params.get("estimate_total") in ("true", "1")
+
+        if fields:
+            response_serializer = VolunteerSerializer(fields=fields)
+        else:
+            response_serializer = VolunteerDirectorySerializer()
+
+        page = volunteer_services.get_volunteer_directory_page(
+            filter_volunteer_data,
+            limit=limit,
+            cursor=request.query_params.get("cursor"),
+            serializer=response_serializer,
+            estimate_total=estimate_total,
+        )
+
+        response_serializer = type(response_serializer)(
+            page.items, many=True, fields=fields or None
+        )
+        data = {
+            "message": message,
+            "data": response_serializer.data,
+            "next_cursor": page.next_cursor,
+        }
+        if estimate_total:
+            data["estimated_total"] = page.estimated_total
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    # GET Export of all Volunteers (Optional Volunteer Filter)
+    # Streams every matching volunteer, ?output=csv (default) or ?output=ndjson
+    @action(detail=False, methods=["get"], url_path="export")
+    def export_volunteers_request(self, request):
+        if not request.session.get("_auth_user_id"):
+            return Response(
+                {"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            output = exports.parse_output(request.query_params.get("output"))
+            filter_volunteer_data = exports.filter_volunteer_data(request.query_params)
+        except serializers.ValidationError as e:
+            return Response({"message": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        volunteers = volunteer_services.get_all_volunteers_optional_filter(
+            filter_volunteer_data
+        )
+        return exports.streaming_response(
+            volunteers, exports.VOLUNTEER_FIELDS, output, "volunteers"
+        )
+
+    # POST Import of Volunteers from a CSV file (multipart field "file")
+    # Creates the valid rows and reports the others with their line numbers
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_volunteers_request(self, request):
+        if not request.session.get("_auth_user_id"):
+            return Response(
+                {"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"message": "A CSV file is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            result = volunteer_import.import_volunteers(
+                codecs.iterdecode(upload, "utf-8-sig")
+            )
+        except ValidationError as e:
+            return Response({"message": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response(
+                {"message": "The file is not UTF-8 encoded."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "message": f"Imported {result.created} of {result.rows} volunteers",
+                "rows": result.rows,
+                "created": result.created,
+                "seconds": round(result.seconds, 3),
+                "rows_per_second": round(result.rows_per_second, 1),
+                "errors": [dataclasses.asdict(error) for error in result.errors],
             },
             status=status.HTTP_200_OK,
         )
@@ -314,6 +477,67 @@ class VolunteerViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    # GET the Opportunities best matching a Volunteer's skills and interests
+    @action(detail=True, methods=["get"], url_path="matching_opportunities")
+    def get_matching_opportunities_request(self, request, vol_id):
+        try:
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.MATCHES_PAGE_SIZE,
+                maximum=settings.MATCHES_MAX_PAGE_SIZE,
+            )
+            matches = volunteer_services.get_matching_opportunities(vol_id, limit)
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Matching Opportunities retreived successfully",
+                "data": [
+                    {
+                        "score": score,
+                        "opportunity": OpportunitySerializer(opportunity).data,
+                    }
+                    for opportunity, score in matches
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    # GET the time-ordered shifts of a Volunteer (?from= / ?to=, upcoming ones
+    # by default), with the overlapping ones flagged and merged into blocks
+    @action(detail=True, methods=["get"], url_path="schedule")
+    def get_volunteer_schedule_request(self, request, vol_id):
+        try:
+            schedule = volunteer_services.get_schedule(
+                vol_id,
+                start=parse_time(request.query_params.get("from"), "from"),
+                end=parse_time(request.query_params.get("to"), "to"),
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Schedule of this Volunteer retreived successfully",
+                "data": ScheduleEntrySerializer(schedule.entries, many=True).data,
+                "blocks": ScheduleBlockSerializer(schedule.blocks, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
     # DELETE A Volunteer
     @action(detail=True, methods=["delete"], url_path="volunteer")
     def delete_volunteer_request(self, request, vol_id):
@@ -333,6 +557,56 @@ class VolunteerViewSet(viewsets.ModelViewSet):
             # If services method returns an error, return an error Response
             return Response({"message": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
+    # POST (Create) Sign a Volunteer up for many Opportunities at once
+    @action(detail=True, methods=["post"], url_path="opportunity")
+    def add_opportunities_to_volunteer_request(self, request, vol_id):
+        serializer = SignUpOpportunitiesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            volunteer_services.add_opportunities_to_volunteer(
+                vol_id, serializer.validated_data["opportunity_ids"]
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"message": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            if e.code in ("full", "conflict"):
+                return Response(
+                    {"message": e.messages[0]}, status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                {"message": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {"message": "Opportunities Added to Volunteer Successfully"},
+            status=status.HTTP_201_CREATED,
+        )
+
+    # DELETE (Remove) Many Opportunities from a Volunteer at once
+    @action(detail=True, methods=["delete"], url_path="opportunity")
+    def remove_opportunities_from_volunteer_request(self, request, vol_id):
+        serializer = SignUpOpportunitiesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            volunteer_services.remove_opportunities_from_volunteer(
+                vol_id, serializer.validated_data["opportunity_ids"]
+            )
+        except ValidationError as e:
+            return Response(
+                {"message": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(
+            {"message": "Opportunities removed from Volunteer successfully"},
+            status=status.HTTP_200_OK,
+        )
+
     # DELETE (Remove) An Opportunity from a Volunteer
     @action(detail=True, methods=["delete"], url_path="opportunity")
     def remove_opportunity_from_a_volunteer_request(self, request, vol_id, opp_id):
@@ -450,7 +724,17 @@ class VolunteerViewSet(viewsets.ModelViewSet):
 class OpportunityViewSet(viewsets.ModelViewSet):
 
     # GET Opportunity
+    # Without ?id= lists them with volunteer_count and is_signed_up (for the
+    # logged in volunteer) instead of the rosters
     @action(detail=False, methods=["get"], url_path="opportunity")
+    @conditional_get(
+        Opportunity,
+        last_modified=lambda request: updated_at_of(
+            Opportunity, request.query_params.get("id")
+        ),
+        per_user=True,
+    )
+    @cached_response(query_tags(Opportunity), per_user=True)
     def handle_opportunity_request(self, request):
         opportunity_id = self.request.query_params.get("id")
         if opportunity_id:
@@ -466,15 +750,41 @@ class OpportunityViewSet(viewsets.ModelViewSet):
 
         else:
             # Fetching ALL opportunities
-            opportunities = opportunity_services.get_opportunity_all()
+            opportunities = opportunity_services.get_opportunity_list(
+                volunteer_id=request.session.get("_auth_user_id")
+            )
             if not opportunities:
                 return Response(
                     {"No opportunities found"}, status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = OpportunitySerializer(opportunities, many=True)
+            serializer = OpportunityListSerializer(opportunities, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+    # GET Export of all Opportunities (Optional Opportunity Filter)
+    # Streams every matching opportunity, ?output=csv (default) or ?output=ndjson
+    @action(detail=False, methods=["get"], url_path="export")
+    def export_opportunities_request(self, request):
+        if not request.session.get("_auth_user_id"):
+            return Response(
+                {"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            output = exports.parse_output(request.query_params.get("output"))
+            filtered_opportunity_data = exports.filtered_opportunity_data(
+                request.query_params
+            )
+        except serializers.ValidationError as e:
+            return Response({"message": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        opportunities = opportunity_services.filtered_opportunity(
+            filtered_opportunity_data
+        )
+        return exports.streaming_response(
+            opportunities, exports.OPPORTUNITY_FIELDS, output, "opportunities"
+        )
+
     # DELETE Opportunity
     @action(detail=False, methods=["delete"], url_path="opportunity")
     def handle_opportunity_delete(self, request):
@@ -515,6 +825,9 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         )
         if serializer.is_valid():
             serializer.save()
+            # Seats added by a larger capacity go to the waitlist
+            if "capacity" in serializer.validated_data:
+                opportunity_services.fill_from_waitlist(opportunity_obj.id)
             return Response(
                 {"message": "Opportunity updated successfully"},
                 status=status.HTTP_200_OK,
@@ -522,11 +835,151 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    # GET the Volunteers signed up for an Opportunity (?limit= / ?cursor=)
+    @action(detail=True, methods=["get"], url_path="volunteers")
+    @conditional_get(Opportunity, Volunteer)
+    def get_opportunity_volunteers_request(self, request, opp_id):
+        try:
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.OPPORTUNITY_ROSTER_PAGE_SIZE,
+                maximum=settings.OPPORTUNITY_ROSTER_MAX_PAGE_SIZE,
+            )
+            page = opportunity_services.get_volunteers_page(
+                opportunity_id=opp_id,
+                limit=limit,
+                cursor=request.query_params.get("cursor"),
+                serializer=VolunteerDirectorySerializer(),
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Volunteers of this Opportunity retreived successfully",
+                "data": VolunteerDirectorySerializer(page.items, many=True).data,
+                "next_cursor": page.next_cursor,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    # GET the Volunteers waiting for a seat of a full Opportunity, in order
+    @action(detail=True, methods=["get"], url_path="waitlist")
+    def get_opportunity_waitlist_request(self, request, opp_id):
+        try:
+            volunteers = opportunity_services.get_waitlist(opp_id)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {
+                "message": "Waitlist of this Opportunity retreived successfully",
+                "data": VolunteerDirectorySerializer(volunteers, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    # POST (Create) Sign up many Volunteers for an Opportunity at once
+    @action(detail=True, methods=["post"], url_path="volunteers")
+    def add_volunteers_to_opportunity_request(self, request, opp_id):
+        serializer = SignUpVolunteersSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            opportunity_services.add_volunteers_to_opportunity(
+                opp_id, serializer.validated_data["volunteer_ids"]
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"message": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            if e.code in ("full", "conflict"):
+                return Response(
+                    {"message": e.messages[0]}, status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                {"message": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {"message": "Volunteers Added to Opportunity Successfully"},
+            status=status.HTTP_201_CREATED,
+        )
+
+    # DELETE (Remove) Many Volunteers from an Opportunity at once
+    @action(detail=True, methods=["delete"], url_path="volunteers")
+    def remove_volunteers_from_opportunity_request(self, request, opp_id):
+        serializer = SignUpVolunteersSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            opportunity_services.remove_volunteers_from_opportunity(
+                opp_id, serializer.validated_data["volunteer_ids"]
+            )
+        except ValidationError as e:
+            return Response(
+                {"message": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(
+            {"message": "Volunteers removed from Opportunity successfully"},
+            status=status.HTTP_200_OK,
+        )
+
+    # GET the Volunteers whose skills and interests best match an Opportunity
+    @action(detail=True, methods=["get"], url_path="matching_volunteers")
+    def get_matching_volunteers_request(self, request, opp_id):
+        try:
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.MATCHES_PAGE_SIZE,
+                maximum=settings.MATCHES_MAX_PAGE_SIZE,
+            )
+            matches = opportunity_services.get_matching_volunteers(opp_id, limit)
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Matching Volunteers retreived successfully",
+                "data": [
+                    {
+                        "score": score,
+                        "volunteer": VolunteerDirectorySerializer(volunteer).data,
+                    }
+                    for volunteer, score in matches
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 class OrganizationViewSet(viewsets.ModelViewSet):
 
     # GET Organization
     @action(detail=False, methods=["get"], url_path="organization")
+    @conditional_get(
+        Organization,
+        last_modified=lambda request: updated_at_of(
+            Organization, request.query_params.get("id")
+        ),
+    )
+    @cached_response(query_tags(Organization))
     def handle_organization_request(self, request):
         organization_id = self.request.query_params.get("id")
         if organization_id:
@@ -607,6 +1060,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
 class TaskViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"])
+    @conditional_get(Task)
     def get_all_tasks(self, request):
 
         tasks = TaskServices.get_all_tasks()
@@ -614,6 +1068,9 @@ class TaskViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"])
+    @conditional_get(
+        Task, last_modified=lambda request, pk=None: updated_at_of(Task, pk)
+    )
     def get_task(self, request, pk=None):
 
         task = TaskServices.get_task_by_id(pk)
@@ -621,6 +1078,21 @@ class TaskViewSet(viewsets.ViewSet):
             return Response(TaskSerializer(task).data)
         return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=["get"])
+    def export_tasks(self, request):
+        if not request.session.get("_auth_user_id"):
+            return Response(
+                {"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            output = exports.parse_output(request.query_params.get("output"))
+        except serializers.ValidationError as e:
+            return Response({"message": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = TaskServices.get_all_tasks()
+        return exports.streaming_response(tasks, exports.TASK_FIELDS, output, "tasks")
+
     @action(detail=False, methods=["post"])
     def create_task(self, request, *args, **kwargs):
         task_data = CreateTaskData(
@@ -725,8 +1197,8 @@ class CommentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Authorized – delete it
-        comment.delete()
+        # Authorized – delete it (and keep the post's comment count in step)
+        comment_services.delete_comment(comment)
         return Response(
             {"message": "Comment deleted"},
             status=status.HTTP_204_NO_CONTENT
@@ -737,9 +1209,10 @@ class PostViewSet(viewsets.ModelViewSet):
 
     # GET a Post
     @action(detail=True, methods=["get"], url_path="post")
+    @conditional_get(Post, Comment, PostLike, Volunteer)
     def get_post_request(self, request, pk=None):
         try:
-            post = post_services.get_post(id=pk)
+            post = post_services.get_post(id=pk, serializer_class=PostSerializer)
             serializer = PostSerializer(post)
             return Response({
                 "message": "Post fetched successfully",
@@ -750,21 +1223,82 @@ class PostViewSet(viewsets.ModelViewSet):
                 "error": str(e)
             }, status=status.HTTP_404_NOT_FOUND)
 
-    # GET all Posts
+    # GET all Posts (newest first, cursor paginated)
     @action(detail=False, methods=["get"], url_path="post")
+    @conditional_get(Post, Comment, PostLike, Volunteer)
     def get_all_posts(self, request):
         try:
-            posts = post_services.get_all_posts()
-            serializer = PostSerializer(posts, many=True)
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.POST_FEED_PAGE_SIZE,
+                maximum=settings.POST_FEED_MAX_PAGE_SIZE,
+            )
+            # ?comments=N embeds only the N newest comments of each post
+            comment_preview = parse_page_size(
+                request.query_params.get("comments"),
+                default=None,
+                maximum=settings.POST_FEED_MAX_COMMENT_PREVIEW,
+                name="comments",
+            )
+            page = post_services.get_posts_page(
+                limit=limit,
+                cursor=request.query_params.get("cursor"),
+                serializer_class=PostSerializer,
+                comment_preview=comment_preview,
+            )
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            pending_likes = post_services.get_pending_likes(
+                [post.id for post in page.items]
+            )
+            serializer = PostSerializer(
+                page.items, many=True, context={"pending_likes": pending_likes}
+            )
             return Response({
                 "message": "Posts fetched successfully",
-                "posts": serializer.data
+                "posts": serializer.data,
+                "next_cursor": page.next_cursor,
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({
                 "error": str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # GET the Comments of a Post (newest first, cursor paginated)
+    @action(detail=True, methods=["get"], url_path="comments")
+    def get_post_comments(self, request, pk=None):
+        try:
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.POST_COMMENTS_PAGE_SIZE,
+                maximum=settings.POST_COMMENTS_MAX_PAGE_SIZE,
+            )
+            page = comment_services.get_comments_page(
+                post_id=pk,
+                limit=limit,
+                cursor=request.query_params.get("cursor"),
+                serializer_class=CommentSerializer,
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
+                return Response(
+                    {"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = CommentSerializer(page.items, many=True)
+        return Response({
+            "message": "Comments fetched successfully",
+            "comments": serializer.data,
+            "next_cursor": page.next_cursor,
+        }, status=status.HTTP_200_OK)
+
     # POST (Create)
     @action(detail=False, methods=["post"], url_path="post")
     def create_post_endpoint(self, request):
@@ -800,7 +1334,8 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["patch"], url_path="post")
     def update_post(self, request, pk=None):
         try:
-            post = Post.objects.get(pk=pk)
+            # The same object PostDao.update_post will change
+            post = identity_map.get(Post, pk)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
@@ -840,53 +1375,152 @@ class PostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    # Like a Post
+    # Like a Post (or unlike it when already liked)
     @action(detail=True, methods=["patch"], url_path="like")
     def like_post(self, request, pk=None):
-        try:
-            post = Post.objects.get(pk=pk)
+        # Here: fetch user ID from session
+        user_id = request.session.get("_auth_user_id")
+        if not user_id:
+            return Response(
+                {"error": "Not authenticated"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
 
-            # Here: fetch user ID from session
-            user_id = request.session.get("_auth_user_id")
-            if not user_id:
+        try:
+            liked, likes = post_services.toggle_like(
+                post_id=pk, volunteer_id=int(user_id)
+            )
+        except ValidationError as e:
+            if e.code == "not_found":
                 return Response(
-                    {"error": "Not authenticated"},
-                    status=status.HTTP_401_UNAUTHORIZED
+                    {"error": "Post not found"},
+                    status=status.HTTP_404_NOT_FOUND
                 )
+            return Response(
+                {"error": "Volunteer not found"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            try:
-                volunteer = Volunteer.objects.get(id=user_id)
-            except Volunteer.DoesNotExist:
-                return Response(
-                    {"error": "Volunteer not found"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        return Response(
+            {
+                "message": "Post liked" if liked else "Post unliked",
+                "likes": likes
+            },
+            status=status.HTTP_200_OK
+        )
 
-            if volunteer in post.liked_by.all():
-                post.liked_by.remove(volunteer)
-                post.likes -= 1
-                post.save()
-                return Response(
-                    {
-                        "message": "Post unliked",
-                        "likes": post.likes
-                    },
-                    status=status.HTTP_200_OK
-                )
-            else:
-                post.liked_by.add(volunteer)
-                post.likes += 1
-                post.save()
-                return Response(
+
+class SearchViewSet(viewsets.ViewSet):
+
+    # GET ranked full-text search results
+    # ?q=words (the last word matches as a prefix), ?type=volunteer,post to
+    # restrict the kinds of results, ?limit= for the number of results
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        kinds = request.query_params.get("type")
+        if kinds:
+            kinds = [kind.strip() for kind in kinds.split(",") if kind.strip()]
+
+        try:
+            limit = parse_page_size(
+                request.query_params.get("limit"),
+                default=settings.SEARCH_PAGE_SIZE,
+                maximum=settings.SEARCH_MAX_PAGE_SIZE,
+            )
+            hits = search_services.search(
+                request.query_params.get("q", ""), kinds=kinds or None, limit=limit
+            )
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Search results fetched successfully",
+                "results": [
                     {
-                        "message": "Post liked",
-                        "likes": post.likes
-                    },
-                    status=status.HTTP_200_OK
-                )
+                        "type": hit.kind,
+                        "id": hit.object_id,
+                        "title": hit.title,
+                        "excerpt": hit.body[:200],
+                        "score": hit.score,
+                    }
+                    for hit in hits
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
 
-        except Post.DoesNotExist:
+
+class CalendarViewSet(viewsets.ViewSet):
+
+    # GET the Opportunities and Events of a time window, in time order
+    # ?from= / ?to= (ISO 8601, CALENDAR_DEFAULT_DAYS from today by default),
+    # ?org= for the ones of one Organization
+    @action(detail=False, methods=["get"])
+    @cached_response(ical.window_tags)
+    def get_calendar_request(self, request):
+        org = request.query_params.get("org")
+        try:
+            if org is not None and not org.isdigit():
+                raise ValidationError("org must be an organization id.")
+            entries = calendar_services.get_calendar(
+                start=parse_time(request.query_params.get("from"), "from"),
+                end=parse_time(request.query_params.get("to"), "to"),
+                organization_id=int(org) if org else None,
+            )
+        except ValidationError as e:
             return Response(
-                {"error": "Post not found"},
-                status=status.HTTP_404_NOT_FOUND
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Calendar retreived successfully",
+                "data": CalendarEntrySerializer(entries, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class CalendarFeedViewSet(viewsets.ViewSet):
+    # iCalendar feeds for calendar apps, cached until a row they show changes
+    # (see myapi/ical.py)
+    renderer_classes = [ical.ICalendarRenderer]
+
+    # GET the feed of an Organization's Opportunities and Events
+    @action(detail=True, methods=["get"], url_path="calendar.ics")
+    @cached_response(
+        ical.organization_tags,
+        formats=["ics"],
+        timeout=settings.CALENDAR_FEED_CACHE_TIMEOUT,
+    )
+    def get_organization_feed_request(self, request, org_id):
+        try:
+            feed = organization_services.get_calendar_feed(org_id)
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages[0]},
+                status=status.HTTP_404_NOT_FOUND,
+                content_type="application/json",
+            )
+        return Response(feed, status=status.HTTP_200_OK)
+
+    # GET the feed of the Opportunities a Volunteer signed up for
+    @action(detail=True, methods=["get"], url_path="calendar.ics")
+    @cached_response(
+        ical.volunteer_tags,
+        formats=["ics"],
+        timeout=settings.CALENDAR_FEED_CACHE_TIMEOUT,
+    )
+    def get_volunteer_feed_request(self, request, vol_id):
+        try:
+            feed = volunteer_services.get_calendar_feed(vol_id)
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages[0]},
+                status=status.HTTP_404_NOT_FOUND,
+                content_type="application/json",
             )
+        return Response(feed, status=status.HTTP_200_OK)
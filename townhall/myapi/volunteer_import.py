@@ -0,0 +1,180 @@
+import csv
+import logging
+import os
+import time
+import typing
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import hashers
+from .dao import VolunteerDao as volunteer_dao
+from .models import Volunteer
+from .services import VolunteerServices
+from .types import VolunteerImportError, VolunteerImportResult
+
+logger = logging.getLogger(__name__)
+
+# Bulk import of volunteers from a CSV file with a header row naming at least
+# the COLUMNS below.
+#
+# The file is read row by row and handled in batches of
+# settings.VOLUNTEER_IMPORT_BATCH_SIZE rows: every row is validated like
+# POST /volunteer/, the batch's emails are checked against the table in one
+# query, the passwords are hashed by settings.VOLUNTEER_IMPORT_HASH_WORKERS
+# workers and the valid rows are inserted with one bulk_create(). Rows that
+# fail are reported with their line number and not created, they never stop
+# the rest of the import.
+
+COLUMNS = ["first_name", "last_name", "gender", "email", "password"]
+
+GENDERS = dict(Volunteer.GENDER_CHOICES)
+
+
+def _setting(name: str, default):
+    value = getattr(settings, name, None)
+    return default if value is None else value
+
+
+def _row_errors(values: typing.Dict[str, str]) -> typing.List[str]:
+    errors = [f"{name} is required." for name in COLUMNS if not values[name]]
+    if errors:
+        return errors
+
+    for name in ("first_name", "last_name"):
+        max_length = Volunteer._meta.get_field(name).max_length
+        if len(values[name]) > max_length:
+            errors.append(f"{name} is longer than {max_length} characters.")
+    if values["gender"] not in GENDERS:
+        errors.append(f"gender must be one of: {', '.join(GENDERS)}.")
+    if len(values["password"]) > hashers.MAX_PASSWORD_LENGTH:
+        errors.append("Invalid password.")
+    else:
+        try:
+            VolunteerServices.validate_volunteer(values["email"], values["password"])
+        except ValidationError as e:
+            errors.extend(e.messages)
+    return errors
+
+
+def _read(lines: typing.Iterable[str]):
+    """Yields (line number, values) of each row, the values stripped."""
+    reader = csv.DictReader(lines)
+    missing = [name for name in COLUMNS if name not in (reader.fieldnames or [])]
+    if missing:
+        raise ValidationError(
+            f"Missing columns: {', '.join(missing)}.", code="invalid_header"
+        )
+
+    for values in reader:
+        yield reader.line_num, {
+            # Passwords are taken as they are, spaces included
+            name: (values[name] or "")
+            if name == "password"
+            else (values[name] or "").strip()
+            for name in COLUMNS
+        }
+
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(batch, result: VolunteerImportResult) -> None:
+    volunteers = [
+        Volunteer(
+            first_name=values["first_name"],
+            last_name=values["last_name"],
+            gender=values["gender"],
+            email=values["email"],
+            password=values["password"],
+            is_active=True,
+        )
+        for _, values in batch
+    ]
+    try:
+        with transaction.atomic():
+            result.created += len(volunteer_dao.bulk_create_volunteers(volunteers))
+        return
+    except IntegrityError:
+        # An email was taken since the batch was checked, insert the rows one
+        # by one to find out which
+        pass
+
+    for (line, values), volunteer in zip(batch, volunteers):
+        try:
+            with transaction.atomic():
+                volunteer_dao.bulk_create_volunteers([volunteer])
+            result.created += 1
+        except IntegrityError:
+            result.errors.append(
+                VolunteerImportError(
+                    line=line,
+                    email=values["email"],
+                    errors=["A volunteer with this email already exists."],
+                )
+            )
+
+
+def import_volunteers(
+    lines: typing.Iterable[str],
+    batch_size: typing.Optional[int] = None,
+    workers: typing.Optional[int] = None,
+) -> VolunteerImportResult:
+    """
+    Creates the volunteers of the CSV ``lines``. Raises ValidationError when
+    the header lacks a column, errors of single rows are in the result.
+    """
+    batch_size = batch_size or _setting("VOLUNTEER_IMPORT_BATCH_SIZE", 500)
+    workers = workers or _setting("VOLUNTEER_IMPORT_HASH_WORKERS", os.cpu_count())
+
+    result = VolunteerImportResult()
+    started = time.perf_counter()
+    seen_emails = set()
+
+    with hashers.hashing_pool(workers) as pool:
+        for batch in _batches(_read(lines), batch_size):
+            result.rows += len(batch)
+            existing = volunteer_dao.existing_volunteer_emails(
+                values["email"] for _, values in batch if values["email"]
+            )
+
+            valid = []
+            for line, values in batch:
+                errors = _row_errors(values)
+                if values["email"] in existing:
+                    errors.append("A volunteer with this email already exists.")
+                elif values["email"] in seen_emails:
+                    errors.append("The email is on an earlier row of the file.")
+                if errors:
+                    result.errors.append(
+                        VolunteerImportError(
+                            line=line, email=values["email"] or None, errors=errors
+                        )
+                    )
+                    continue
+                seen_emails.add(values["email"])
+                valid.append((line, values))
+
+            passwords = hashers.make_passwords(
+                [values["password"] for _, values in valid], pool=pool
+            )
+            for (_, values), password in zip(valid, passwords):
+                values["password"] = password
+            if valid:
+                _insert(valid, result)
+
+    result.seconds = time.perf_counter() - started
+    logger.info(
+        f"Imported {result.created} of {result.rows} volunteers in "
+        f"{result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)"
+    )
+    return result
@@ -0,0 +1,176 @@
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from myapi import models as townhall_models
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class TestEndpointCalendar(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.client = APIClient()
+        self.organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        self.start = timezone.now() + timedelta(days=1)
+        self.opportunity = townhall_models.Opportunity.objects.create(
+            title="Food bank",
+            description="Deliver food",
+            start_time=self.start,
+            end_time=self.start + timedelta(hours=2),
+            location="Vancouver",
+            organization=self.organization,
+        )
+        self.event = townhall_models.Event.objects.create(
+            title="Gala",
+            description="Fundraiser",
+            start_time=self.start - timedelta(hours=3),
+            end_time=self.start - timedelta(hours=1),
+            location="Vancouver",
+            organization=self.organization,
+        )
+        self.volunteer = townhall_models.Volunteer.objects.create(
+            first_name="James",
+            last_name="Bond",
+            gender="M",
+            email="jamesbond@gmail.ca",
+        )
+
+    def test_get_calendar_window(self):
+        # Act
+        response = self.client.get(
+            "/calendar/",
+            {
+                "from": "2024-07-20T00:00:00Z",
+                "to": "2024-07-21T00:00:00Z",
+                "org": self.organization.id,
+            },
+        )
+        upcoming = self.client.get("/calendar/")
+        bad_org = self.client.get("/calendar/?org=goodwill")
+        bad_time = self.client.get("/calendar/?to=tomorrow")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], [])
+        self.assertEqual(upcoming.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(entry["kind"], entry["id"]) for entry in upcoming.json()["data"]],
+            [("event", self.event.id), ("opportunity", self.opportunity.id)],
+        )
+        self.assertEqual(bad_org.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_time.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_organization_feed_cached_until_row_changes(self):
+        # Arrange
+        url = f"/organization/{self.organization.id}/calendar.ics"
+        first = self.client.get(url)
+
+        # Act
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.event.title = "Gala night"
+        self.event.save()
+        changed = self.client.get(url)
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertIn(b"SUMMARY:Gala\r\n", first.content)
+        self.assertIn(b"SUMMARY:Food bank\r\n", first.content)
+        self.assertEqual(cached.content, first.content)
+        self.assertIn(b"SUMMARY:Gala night\r\n", changed.content)
+
+    def test_moved_row_leaves_old_organization_feed(self):
+        # Arrange
+        other = townhall_models.Organization.objects.create(
+            name="Red Cross",
+            location="Victoria",
+            email="redcross@gmail.com",
+            phone_number="778-765-4321",
+            website="redcross.ca",
+        )
+        url = f"/organization/{self.organization.id}/calendar.ics"
+        first = self.client.get(url)
+        self.client.get(f"/organization/{other.id}/calendar.ics")
+
+        # Act
+        event = townhall_models.Event.objects.get(id=self.event.id)
+        event.organization = other
+        event.save()
+        self.opportunity.organization = other
+        self.opportunity.save()
+        old = self.client.get(url)
+        new = self.client.get(f"/organization/{other.id}/calendar.ics")
+
+        # Assert
+        self.assertIn(b"SUMMARY:Gala\r\n", first.content)
+        self.assertNotIn(b"BEGIN:VEVENT", old.content)
+        self.assertIn(b"SUMMARY:Gala\r\n", new.content)
+        self.assertIn(b"SUMMARY:Food bank\r\n", new.content)
+
+    def test_organization_feed_fail_not_found(self):
+        # Act
+        response = self.client.get("/organization/999/calendar.ics")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            response.json()["error"],
+            "Organization with the given id: 999, does not exist.",
+        )
+
+    def test_volunteer_feed_follows_sign_ups(self):
+        # Arrange
+        url = f"/volunteer/{self.volunteer.id}/calendar.ics"
+        empty = self.client.get(url, HTTP_ACCEPT="text/calendar")
+
+        # Act
+        self.client.post(
+            f"/volunteer/{self.volunteer.id}/opportunity/{self.opportunity.id}/"
+        )
+        signed_up = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.opportunity.start_time = self.start + timedelta(hours=1)
+        self.opportunity.save()
+        moved = self.client.get(url)
+
+        # Assert
+        self.assertEqual(empty.status_code, status.HTTP_200_OK)
+        self.assertNotIn(b"BEGIN:VEVENT", empty.content)
+        self.assertIn(b"X-WR-CALNAME:James Bond\r\n", empty.content)
+        self.assertIn(
+            f"UID:opportunity-{self.opportunity.id}@townhall".encode(),
+            signed_up.content,
+        )
+        start = self.opportunity.start_time.astimezone(dt_timezone.utc)
+        self.assertIn(f"DTSTART:{start:%Y%m%dT%H%M%SZ}\r\n".encode(), moved.content)
+
+    def test_feeds_fold_and_escape_text(self):
+        # Arrange
+        self.event.title = "Gala; dinner, dance\nand " + "music " * 20
+        self.event.save()
+
+        # Act
+        response = self.client.get(f"/organization/{self.organization.id}/calendar.ics")
+
+        # Assert
+        lines = response.content.split(b"\r\n")
+        self.assertTrue(all(len(line) <= 75 for line in lines))
+        unfolded = response.content.replace(b"\r\n ", b"").decode()
+        self.assertIn(
+            "SUMMARY:Gala\\; dinner\\, dance\\nand " + "music " * 20 + "\r\n",
+            unfolded,
+        )
@@ -81,3 +81,79 @@ class TestEndpointOpportunity:
         assert (
             response.status_code == status.HTTP_404_NOT_FOUND
         )  # Ensure it's no longer available
+
+    # GET Opportunity again after a volunteer signed up
+    def test_get_opportunity_modified_by_sign_up(
+        self, api_client, setup, django_capture_on_commit_callbacks
+    ):
+        url = "/opportunity/?id=1"
+        first = api_client.get(url)
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == (
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        signed_up_before = opportunity.updated_at
+        volunteer = townhall_models.Volunteer.objects.create(
+            first_name="Test",
+            last_name="User",
+            email="test@example.com",
+            password="testpass123",
+            gender="M",
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            opportunity.volunteers.add(volunteer)
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != first["ETag"]
+        opportunity.refresh_from_db()
+        assert opportunity.updated_at > signed_up_before
+
+    # GET Opportunities lists the number of sign-ups, GET the roster in pages
+    def test_get_opportunity_volunteers(self, api_client, setup):
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        for i, last_name in enumerate(["Cole", "Adams", "Baker"]):
+            opportunity.volunteers.add(
+                townhall_models.Volunteer.objects.create(
+                    first_name="Test",
+                    last_name=last_name,
+                    email=f"test{i}@example.com",
+                    password="testpass123",
+                    gender="M",
+                )
+            )
+
+        response = api_client.get("/opportunity/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]["volunteer_count"] == 3
+        assert response.data[0]["is_signed_up"] is False
+        assert "volunteers" not in response.data[0]
+
+        url = "/opportunity/1/volunteers/"
+        first = api_client.get(url, {"limit": 2})
+        assert first.status_code == status.HTTP_200_OK
+        assert [v["last_name"] for v in first.data["data"]] == ["Adams", "Baker"]
+        second = api_client.get(url, {"limit": 2, "cursor": first.data["next_cursor"]})
+        assert [v["last_name"] for v in second.data["data"]] == ["Cole"]
+        assert second.data["next_cursor"] is None
+
+        response = api_client.get("/opportunity/999/volunteers/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # GET Export of Opportunities requires a session
+    def test_export_opportunities_not_authenticated(self, api_client, setup):
+        response = api_client.get("/opportunity/export/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        volunteer = townhall_models.Volunteer.objects.create(
+            first_name="Test",
+            last_name="User",
+            email="test@example.com",
+            password="testpass123",
+            gender="M",
+        )
+        api_client.force_login(volunteer)
+        response = api_client.get("/opportunity/export/?output=ndjson")
+        assert response.status_code == status.HTTP_200_OK
+        assert b"Sample Opportunity" in b"".join(response.streaming_content)
@@ -1,8 +1,13 @@
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
-from myapi.models import Post, Volunteer
+from myapi.models import Comment, Post, Volunteer
+from myapi.services import PostServices
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from datetime import timedelta
 import os
 
 
@@ -81,3 +86,196 @@ class PostViewSetTests(TestCase):
         response = self.client.post(self.url, self.valid_post_data, format="multipart")
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_posts_paginated_by_cursor(self):
+        """Test the feed is returned newest first in cursor sized pages"""
+        created_at = timezone.now()
+        for i in range(5):
+            Post.objects.create(
+                volunteer=self.volunteer,
+                content=f"Post {i}",
+                created_at=created_at - timedelta(minutes=i),
+            )
+
+        response = self.client.get(self.url, {"limit": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [post["content"] for post in response.data["posts"]], ["Post 0", "Post 1"]
+        )
+        self.assertIsNotNone(response.data["next_cursor"])
+
+        # A post created between requests must not shift the following pages
+        Post.objects.create(
+            volunteer=self.volunteer, content="Newest post", created_at=timezone.now()
+        )
+
+        contents = []
+        cursor = response.data["next_cursor"]
+        while cursor:
+            response = self.client.get(self.url, {"limit": 2, "cursor": cursor})
+            contents += [post["content"] for post in response.data["posts"]]
+            cursor = response.data["next_cursor"]
+
+        self.assertEqual(contents, ["Post 2", "Post 3", "Post 4"])
+
+    def test_get_posts_ties_on_created_at(self):
+        """Test posts sharing a timestamp are neither skipped nor repeated"""
+        created_at = timezone.now()
+        for i in range(3):
+            Post.objects.create(
+                volunteer=self.volunteer, content=f"Post {i}", created_at=created_at
+            )
+
+        first = self.client.get(self.url, {"limit": 2})
+        second = self.client.get(
+            self.url, {"limit": 2, "cursor": first.data["next_cursor"]}
+        )
+
+        ids = [post["id"] for post in first.data["posts"] + second.data["posts"]]
+        self.assertEqual(ids, sorted(Post.objects.values_list("id", flat=True))[::-1])
+        self.assertIsNone(second.data["next_cursor"])
+
+    def test_get_posts_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_posts_query_count_is_constant(self):
+        """Test the feed does not issue queries per post, comment or liker"""
+
+        def create_posts(count):
+            for i in range(count):
+                post = Post.objects.create(
+                    volunteer=self.volunteer,
+                    content=f"Post {i}",
+                    created_at=timezone.now(),
+                )
+                post.liked_by.add(self.volunteer)
+                Comment.objects.create(
+                    user=self.volunteer,
+                    post=post,
+                    content="Comment",
+                    created_at=timezone.now(),
+                )
+
+        create_posts(2)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(self.url)
+
+        create_posts(10)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data["posts"]), 12)
+        self.assertEqual(len(small_page), len(large_page))
+        self.assertEqual(response.data["posts"][0]["comments"][0]["content"], "Comment")
+        self.assertEqual(
+            response.data["posts"][0]["liked_by"][0]["id"], self.volunteer.id
+        )
+
+    def create_comments(self, post, count):
+        created_at = timezone.now()
+        for i in range(count):
+            Comment.objects.create(
+                user=self.volunteer,
+                post=post,
+                content=f"Comment {i}",
+                created_at=created_at + timedelta(minutes=i),
+            )
+
+    def test_get_posts_with_comment_preview(self):
+        """Test ?comments=N embeds only the newest N comments of each post"""
+        first = Post.objects.create(
+            volunteer=self.volunteer, content="First", created_at=timezone.now()
+        )
+        second = Post.objects.create(
+            volunteer=self.volunteer, content="Second", created_at=timezone.now()
+        )
+        self.create_comments(first, 5)
+        self.create_comments(second, 1)
+
+        response = self.client.get(self.url, {"comments": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        posts = {post["content"]: post for post in response.data["posts"]}
+        self.assertEqual(
+            [comment["content"] for comment in posts["First"]["comments"]],
+            ["Comment 4", "Comment 3"],
+        )
+        self.assertEqual(len(posts["Second"]["comments"]), 1)
+
+    def test_get_post_comments_paginated(self):
+        """Test the comments endpoint pages through all comments of a post"""
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Post", created_at=timezone.now()
+        )
+        self.create_comments(post, 3)
+        url = f"/post/{post.id}/comments/"
+
+        first = self.client.get(url, {"limit": 2})
+        second = self.client.get(url, {"limit": 2, "cursor": first.data["next_cursor"]})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [c["content"] for c in first.data["comments"] + second.data["comments"]],
+            ["Comment 2", "Comment 1", "Comment 0"],
+        )
+        self.assertIsNone(second.data["next_cursor"])
+
+    def test_get_post_comments_post_not_found(self):
+        """Test the comments endpoint returns 404 for an unknown post"""
+        response = self.client.get("/post/999/comments/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_post_loads_post_once(self):
+        """Test the view and the DAO share one post object per request"""
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Post", created_at=timezone.now()
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f"/post/{post.id}/", {"content": "Edited"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        post.refresh_from_db()
+        self.assertEqual(post.content, "Edited")
+        post_selects = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and 'FROM "myapi_post"' in query["sql"]
+        ]
+        self.assertEqual(len(post_selects), 1)
+
+    def test_get_posts_not_modified(self):
+        """Test polling the feed again costs no query until a post changes"""
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Post", created_at=timezone.now()
+        )
+        first = self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PostServices.toggle_like(post_id=post.id, volunteer_id=self.volunteer.id)
+        liked = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(liked.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(liked["ETag"], first["ETag"])
+
+        Comment.objects.create(post=post, user=self.volunteer, content="Hi")
+        commented = self.client.get(self.url, HTTP_IF_NONE_MATCH=liked["ETag"])
+        self.assertEqual(commented.status_code, status.HTTP_200_OK)
+
+    def test_get_posts_etag_depends_on_query(self):
+        """Test each page of the feed has its own ETag"""
+        first = self.client.get(self.url)
+        other = self.client.get(self.url, {"limit": 1})
+
+        self.assertNotEqual(first["ETag"], other["ETag"])
@@ -0,0 +1,96 @@
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from myapi import models as townhall_models
+from datetime import datetime
+from django.utils import timezone
+
+
+class TestEndpointSearch(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/search/"
+        self.organization = townhall_models.Organization.objects.create(
+            name="Goodwill Gardens",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        self.opportunity = townhall_models.Opportunity.objects.create(
+            title="Community garden cleanup",
+            description="Weeding and planting",
+            start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+            end_time=timezone.make_aware(datetime(2024, 7, 20, 12, 0)),
+            location="Vancouver",
+            organization=self.organization,
+        )
+        self.volunteer = townhall_models.Volunteer.objects.create(
+            first_name="James",
+            last_name="Bond",
+            gender="M",
+            email="jamesbond@gmail.ca",
+            skills_interests="Gardening, carpentry",
+        )
+
+    def test_search_ranks_across_models(self):
+        # Act
+        response = self.client.get(self.url, {"q": "garden"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {(hit["type"], hit["id"]) for hit in response.data["results"]}
+        self.assertEqual(
+            results,
+            {
+                ("organization", self.organization.id),
+                ("opportunity", self.opportunity.id),
+                ("volunteer", self.volunteer.id),
+            },
+        )
+        # Title matches rank above body matches
+        self.assertNotEqual(response.data["results"][-1]["type"], "opportunity")
+
+    def test_search_filtered_by_type(self):
+        # Act
+        response = self.client.get(self.url, {"q": "garden", "type": "volunteer"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(hit["type"], hit["id"]) for hit in response.data["results"]],
+            [("volunteer", self.volunteer.id)],
+        )
+
+    def test_search_index_follows_updates_and_deletes(self):
+        # Act
+        self.opportunity.title = "Beach cleanup"
+        self.opportunity.save()
+        self.volunteer.delete()
+
+        # Assert
+        response = self.client.get(self.url, {"q": "beach"})
+        self.assertEqual(response.data["results"][0]["title"], "Beach cleanup")
+        response = self.client.get(self.url, {"q": "carpentry"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_search_requires_query(self):
+        # Act
+        response = self.client.get(self.url, {"q": " "})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_unknown_type(self):
+        # Act
+        response = self.client.get(self.url, {"q": "garden", "type": "task"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_ignores_query_syntax(self):
+        # Act
+        response = self.client.get(self.url, {"q": 'garden" OR body:*'})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
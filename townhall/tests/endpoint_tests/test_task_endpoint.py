@@ -1,3 +1,5 @@
+import json
+
 from rest_framework.test import APITestCase, APIClient
 from django.core.management import call_command
 from rest_framework import status
@@ -109,3 +111,65 @@ class TaskEndpointTests(APITestCase):
 
         # Assert: Ensure the task no longer exists
         self.assertEqual(get_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_task_not_modified(self):
+        """
+        Test a task fetched again with its ETag or Last-Modified is not sent twice.
+        """
+        # Arrange: Create a task and fetch it once
+        create_response = self.client.post("/tasks/", self.task_data, format="json")
+        url = f"/tasks/{create_response.data['id']}/"
+        first = self.client.get(url)
+
+        # Act: Fetch it again with the validators of the first response
+        by_etag = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        by_date = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+        # Assert: Ensure both are answered without a body
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_etag.content, b"")
+
+    def test_get_task_modified_after_update(self):
+        """
+        Test a task changed since the last fetch is sent again.
+        """
+        # Arrange: Create a task, fetch it and update it
+        create_response = self.client.post("/tasks/", self.task_data, format="json")
+        url = f"/tasks/{create_response.data['id']}/"
+        first = self.client.get(url)
+        self.client.put(url, {"name": "Updated Task"}, format="json")
+
+        # Act: Fetch it again with the ETag of the first response
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        # Assert: Ensure the new task is sent under a new ETag
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Updated Task")
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_export_tasks(self):
+        """
+        Test streaming all tasks as NDJSON.
+        """
+        # Act: Request the export of the fixture's task, logged in
+        self.client.force_login(self.volunteer)
+        response = self.client.get("/tasks/export/?output=ndjson")
+
+        # Assert: Ensure every task is streamed as one JSON object per line
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["Test Task"])
+        self.assertEqual(rows[0]["deadline"], "2024-12-31T23:59:59Z")
+
+    def test_export_tasks_not_authenticated(self):
+        """
+        Test that exporting tasks requires a session.
+        """
+        # Act: Request the export without logging in
+        response = self.client.get("/tasks/export/")
+
+        # Assert: Ensure nothing is streamed
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
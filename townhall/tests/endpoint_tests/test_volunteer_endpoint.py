@@ -1,14 +1,18 @@
-from django.test import TestCase
+import json
+
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 from unittest.mock import patch
 from myapi import models as townhall_models
 from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 from datetime import datetime
 from django.utils import timezone
 
 from django.core.exceptions import ValidationError
+from django.db.models.signals import m2m_changed
 
 
 class TestEndpointVolunteer(TestCase):
@@ -156,6 +160,47 @@ class TestEndpointVolunteer(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["message"], "No Volunteers were found")
 
+    def test_get_all_volunteers_sparse_fields(self):
+        # Act
+        response = self.client.get("/volunteer/", {"fields": "id,first_name"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["data"][0]), {"id", "first_name"})
+
+    def test_get_all_volunteers_unknown_field(self):
+        # Act
+        response = self.client.get("/volunteer/", {"fields": "id,password"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_volunteer_directory_pages(self):
+        # Act
+        first = self.client.get("/volunteer/", {"limit": 1, "estimate_total": "true"})
+        second = self.client.get(
+            "/volunteer/", {"limit": 1, "cursor": first.data["next_cursor"]}
+        )
+
+        # Assert (ordered by last name: Bond, Man)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["data"][0]["last_name"], "Bond")
+        self.assertEqual(second.data["data"][0]["last_name"], "Man")
+        self.assertIsNone(second.data["next_cursor"])
+        self.assertEqual(first.data["estimated_total"], 11)
+        # The directory leaves out the long profile texts
+        self.assertNotIn("about_me", first.data["data"][0])
+
+    def test_get_volunteer_directory_with_filter(self):
+        # Act
+        response = self.client.get(
+            "/volunteer/", {"limit": 10, "first_name": "Iron", "fields": "email"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], [{"email": "ironman@yahoo.com"}])
+
     def test_get_all_filtered_opportunities_of_a_volunteer_no_filters(self):
         # Arrange
         organization = townhall_models.Organization.objects.create(
@@ -420,6 +465,36 @@ class TestEndpointVolunteer(TestCase):
         self.assertEqual(len(volunteer.opportunities.all()), 1)
         self.assertEqual(len(opportunity.volunteers.all()), 1)
 
+    def test_add_volunteer_to_full_opportunity_waitlisted(self):
+        # Pre Arrange
+        test_organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        opportunity = townhall_models.Opportunity.objects.create(
+            title="Food bank",
+            description="Deliver food",
+            start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+            end_time=timezone.make_aware(datetime(2024, 7, 20, 20, 30)),
+            location="Vancouver",
+            organization=test_organization,
+            capacity=1,
+        )
+
+        # Act
+        first = self.client.post(f"/volunteer/10/opportunity/{opportunity.id}/")
+        second = self.client.post(f"/volunteer/11/opportunity/{opportunity.id}/")
+        waitlist = self.client.get(f"/opportunity/{opportunity.id}/waitlist/")
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.data["waitlist_position"], 1)
+        self.assertEqual([v["id"] for v in waitlist.data["data"]], [11])
+
     @patch("myapi.services.VolunteerServices.add_volunteer_to_opportunity")
     def test_add_volunteer_to_opportunity_fail_service_error(
         self, mock_add_volunteer_to_opportunity
@@ -437,6 +512,256 @@ class TestEndpointVolunteer(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data["message"], "['random message']")
 
+    def test_add_opportunities_to_volunteer_success(self):
+        # Pre Arrange
+        test_organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        opportunities = [
+            townhall_models.Opportunity.objects.create(
+                title=title,
+                description="Deliver food",
+                start_time=timezone.make_aware(datetime(2024, 7, day, 10, 0)),
+                end_time=timezone.make_aware(datetime(2024, 7, day, 20, 30)),
+                location="Vancouver",
+                organization=test_organization,
+            )
+            for day, title in ((20, "Food bank"), (21, "Hygiene"))
+        ]
+        opportunity_ids = [opportunity.id for opportunity in opportunities]
+
+        # Act
+        response = self.client.post(
+            "/volunteer/10/opportunity/",
+            {"opportunity_ids": opportunity_ids},
+            format="json",
+        )
+        changed = []
+
+        def record(sender, action, pk_set, **kwargs):
+            changed.append((action, pk_set))
+
+        m2m_changed.connect(record, sender=townhall_models.SignUp)
+        try:
+            again = self.client.post(
+                "/volunteer/10/opportunity/",
+                {"opportunity_ids": opportunity_ids},
+                format="json",
+            )
+        finally:
+            m2m_changed.disconnect(record, sender=townhall_models.SignUp)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(again.status_code, status.HTTP_201_CREATED)
+        # Nothing was added the second time, no cache is invalidated
+        self.assertEqual(changed, [])
+        volunteer = townhall_models.Volunteer.objects.get(id=10)
+        self.assertEqual(
+            sorted(volunteer.opportunities.values_list("id", flat=True)),
+            opportunity_ids,
+        )
+
+        # Act
+        response = self.client.delete(
+            "/volunteer/10/opportunity/",
+            {"opportunity_ids": opportunity_ids[:1]},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(volunteer.opportunities.values_list("id", flat=True)),
+            opportunity_ids[1:],
+        )
+
+    def test_add_opportunities_to_volunteer_fail_unknown_ids(self):
+        # Act
+        response = self.client.post(
+            "/volunteer/10/opportunity/", {"opportunity_ids": [998, 999]}, format="json"
+        )
+        empty = self.client.post(
+            "/volunteer/10/opportunity/", {"opportunity_ids": []}, format="json"
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["message"],
+            "Opportunities with the given ids do not exist: 998, 999.",
+        )
+        self.assertEqual(empty.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_add_overlapping_opportunities_to_volunteer_conflict(self):
+        # Pre Arrange
+        test_organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        morning, noon, afternoon, late, later = [
+            townhall_models.Opportunity.objects.create(
+                title=title,
+                description="Deliver food",
+                start_time=timezone.make_aware(datetime(2024, 7, 20, start, 0)),
+                end_time=timezone.make_aware(datetime(2024, 7, 20, end, 0)),
+                location="Vancouver",
+                organization=test_organization,
+            )
+            for title, start, end in (
+                ("Morning", 10, 14),
+                ("Noon", 13, 17),
+                ("Afternoon", 14, 18),
+                ("Late", 19, 22),
+                ("Later", 21, 23),
+            )
+        ]
+
+        # Act
+        first = self.client.post(f"/volunteer/10/opportunity/{morning.id}/")
+        overlapping = self.client.post(f"/volunteer/10/opportunity/{noon.id}/")
+        back_to_back = self.client.post(
+            "/volunteer/10/opportunity/",
+            {"opportunity_ids": [afternoon.id]},
+            format="json",
+        )
+        each_other = self.client.post(
+            "/volunteer/10/opportunity/",
+            {"opportunity_ids": [late.id, later.id]},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(overlapping.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            overlapping.data["message"],
+            "The volunteer is signed up for overlapping opportunities: "
+            f"{morning.id}.",
+        )
+        self.assertEqual(back_to_back.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(each_other.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            each_other.data["message"],
+            "Opportunities with the given ids overlap each other or the "
+            f"volunteer's schedule: {late.id}, {later.id}.",
+        )
+        volunteer = townhall_models.Volunteer.objects.get(id=10)
+        self.assertEqual(
+            sorted(volunteer.opportunities.values_list("id", flat=True)),
+            [morning.id, afternoon.id],
+        )
+        noon.refresh_from_db()
+        self.assertEqual(noon.filled, 0)
+
+    def test_get_volunteer_schedule(self):
+        # Pre Arrange
+        test_organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        volunteer = townhall_models.Volunteer.objects.get(id=10)
+        morning, noon, evening, tomorrow = [
+            townhall_models.Opportunity.objects.create(
+                title=title,
+                description="Deliver food",
+                start_time=timezone.make_aware(datetime(2024, 7, day, start, 0)),
+                end_time=timezone.make_aware(datetime(2024, 7, day, end, 0)),
+                location="Vancouver",
+                organization=test_organization,
+            )
+            for title, day, start, end in (
+                ("Morning", 20, 10, 14),
+                ("Noon", 20, 13, 17),
+                ("Evening", 20, 17, 18),
+                ("Tomorrow", 21, 10, 12),
+            )
+        ]
+        # The related managers don't check for overlaps, the schedule shows them
+        volunteer.opportunities.add(tomorrow, evening, noon, morning)
+        url = "/volunteer/10/schedule/?from=2024-07-20T00:00:00Z"
+
+        # Act
+        response = self.client.get(url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (entry["opportunity"]["id"], entry["conflicts"])
+                for entry in response.data["data"]
+            ],
+            [
+                (morning.id, [noon.id]),
+                (noon.id, [morning.id]),
+                (evening.id, []),
+                (tomorrow.id, []),
+            ],
+        )
+        self.assertEqual(
+            [
+                (block["start_time"], block["end_time"], block["opportunity_ids"])
+                for block in response.data["blocks"]
+            ],
+            [
+                (
+                    "2024-07-20T10:00:00Z",
+                    "2024-07-20T18:00:00Z",
+                    [morning.id, noon.id, evening.id],
+                ),
+                ("2024-07-21T10:00:00Z", "2024-07-21T12:00:00Z", [tomorrow.id]),
+            ],
+        )
+
+        # Act, moving an opportunity moves it on the schedule
+        tomorrow.start_time = timezone.make_aware(datetime(2024, 7, 20, 17, 30))
+        tomorrow.end_time = timezone.make_aware(datetime(2024, 7, 20, 19, 0))
+        tomorrow.save()
+        response = self.client.get(url + "&to=2024-07-20T17:45:00Z")
+
+        # Assert
+        self.assertEqual(
+            [
+                (entry["opportunity"]["id"], entry["conflicts"])
+                for entry in response.data["data"]
+            ],
+            [
+                (morning.id, [noon.id]),
+                (noon.id, [morning.id]),
+                (evening.id, [tomorrow.id]),
+                (tomorrow.id, [evening.id]),
+            ],
+        )
+
+    def test_get_volunteer_schedule_fail(self):
+        # Act
+        upcoming = self.client.get("/volunteer/10/schedule/")
+        not_found = self.client.get("/volunteer/999/schedule/")
+        bad_time = self.client.get("/volunteer/10/schedule/?from=tomorrow")
+        backwards = self.client.get(
+            "/volunteer/10/schedule/?from=2024-07-21T00:00:00Z&to=2024-07-20T00:00:00Z"
+        )
+
+        # Assert
+        self.assertEqual(upcoming.status_code, status.HTTP_200_OK)
+        self.assertEqual(upcoming.data["data"], [])
+        self.assertEqual(not_found.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(bad_time.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            bad_time.data["error"], "from must be an ISO 8601 date and time."
+        )
+        self.assertEqual(backwards.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_volunteer_success(self):
         # Arrange
         self.url = "/volunteer/10/"
@@ -453,6 +778,39 @@ class TestEndpointVolunteer(TestCase):
         except townhall_models.Volunteer.DoesNotExist:
             pass
 
+    def test_delete_signed_up_volunteer_modifies_opportunity(self):
+        # Arrange
+        test_organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        opportunity = townhall_models.Opportunity.objects.create(
+            title="Food bank",
+            description="Deliver food",
+            start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+            end_time=timezone.make_aware(datetime(2024, 7, 20, 20, 30)),
+            location="Vancouver",
+            organization=test_organization,
+        )
+        self.client.post(f"/volunteer/10/opportunity/{opportunity.id}/")
+        url = f"/opportunity/?id={opportunity.id}"
+        first = self.client.get(url)
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/volunteer/10/")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        # Assert
+        self.assertEqual(first.data["volunteers"], [10])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["volunteers"], [])
+        self.assertEqual(response.data["filled"], 0)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
     def test_delete_volunteer_fail_does_not_exist(self):
         # Arrange
         self.url = "/volunteer/999/"  # Assuming ID 999 doesn't exist
@@ -644,3 +1002,193 @@ class TestEndpointVolunteer(TestCase):
         # Assert
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["message"], "['random message']")
+
+    def test_get_matching_opportunities_success(self):
+        # Arrange
+        organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        for title in ("Carpentry workshop", "Carpentry repairs", "Food bank"):
+            townhall_models.Opportunity.objects.create(
+                title=title,
+                description="Helping out",
+                start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+                end_time=timezone.make_aware(datetime(2024, 7, 20, 20, 30)),
+                location="Vancouver",
+                organization=organization,
+            )
+        volunteer = townhall_models.Volunteer.objects.get(id=10)
+        volunteer.skills_interests = "Carpentry and woodworking"
+        volunteer.save()
+        self.url = "/volunteer/10/matching_opportunities/"
+
+        # Act
+        response = self.client.get(self.url, {"limit": 1})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertIn("Carpentry", response.data["data"][0]["opportunity"]["title"])
+
+    def test_get_matching_opportunities_not_found(self):
+        # Arrange
+        self.url = "/volunteer/999/matching_opportunities/"
+
+        # Act
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_login_unknown_email_same_as_wrong_password(self):
+        # Arrange
+        self.url = "/auth/login/"
+
+        # Act
+        unknown = self.client.post(
+            self.url,
+            {"email": "nobody@gmail.com", "password": "JamesBond123"},
+            format="json",
+        )
+        wrong = self.client.post(
+            self.url,
+            {"email": "jamesbond@gmail.ca", "password": "NotJamesBond"},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(unknown.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(unknown.status_code, wrong.status_code)
+        self.assertEqual(unknown.json(), wrong.json())
+
+    @override_settings(LOGIN_RATE_LIMIT_PER_EMAIL=(2, 300))
+    def test_login_rate_limited(self):
+        # Arrange
+        self.url = "/auth/login/"
+        for _ in range(2):
+            self.client.post(
+                self.url,
+                {"email": "jamesbond@gmail.ca", "password": "NotJamesBond"},
+                format="json",
+            )
+
+        # Act
+        response = self.client.post(
+            self.url,
+            {"email": "jamesbond@gmail.ca", "password": "JamesBond123"},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_login_success(self):
+        # Arrange
+        self.url = "/auth/login/"
+
+        # Act
+        response = self.client.post(
+            self.url,
+            {"email": "jamesbond@gmail.ca", "password": "JamesBond123"},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["user"]["id"], 10)
+
+    def test_export_volunteers_csv(self):
+        # Arrange
+        self.url = "/volunteer/export/?first_name=James"
+        self.client.force_login(townhall_models.Volunteer.objects.get(id=10))
+
+        # Act
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "first_name", "last_name"])
+        self.assertEqual(lines[1].split(",")[:3], ["10", "James", "Bond"])
+        self.assertEqual(len(lines), 2)
+        self.assertNotIn("password", lines[0])
+
+    def test_export_volunteers_ndjson(self):
+        # Arrange
+        self.url = "/volunteer/export/?output=ndjson"
+        self.client.force_login(townhall_models.Volunteer.objects.get(id=10))
+
+        # Act
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row["id"] for row in rows], [10, 11])
+        self.assertEqual(rows[0]["email"], "jamesbond@gmail.ca")
+
+    def test_export_volunteers_invalid_output(self):
+        # Arrange
+        self.url = "/volunteer/export/?output=xml"
+        self.client.force_login(townhall_models.Volunteer.objects.get(id=10))
+
+        # Act
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_volunteers_not_authenticated(self):
+        # Act
+        response = self.client.get("/volunteer/export/")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(response.streaming)
+
+    def test_import_volunteers(self):
+        # Arrange
+        self.client.force_login(townhall_models.Volunteer.objects.get(id=10))
+        upload = SimpleUploadedFile(
+            "volunteers.csv",
+            b"first_name,last_name,gender,email,password\n"
+            b"Diana,Prince,F,wonder@gmail.com,Themyscira42!\n"
+            b"James,Bond,M,jamesbond@gmail.ca,Skyfall007!\n",
+            content_type="text/csv",
+        )
+
+        # Act
+        response = self.client.post(
+            "/volunteer/import/", {"file": upload}, format="multipart"
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(
+            response.json()["errors"],
+            [
+                {
+                    "line": 3,
+                    "email": "jamesbond@gmail.ca",
+                    "errors": ["A volunteer with this email already exists."],
+                }
+            ],
+        )
+
+    def test_import_volunteers_not_authenticated(self):
+        # Act
+        response = self.client.post("/volunteer/import/", {}, format="multipart")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
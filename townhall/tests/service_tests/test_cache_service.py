@@ -0,0 +1,680 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+
+import threading
+import time
+
+from rest_framework.test import APIClient
+
+from myapi import caching, identity_map, response_cache
+from myapi.caching import TwoTierCache
+from myapi.dao import OpportunityDao as opp_dao
+from myapi.dao import OrganizationDao as org_dao
+from myapi.dao import VolunteerDao as vol_dao
+from myapi.models import Opportunity as opp_mod
+from myapi.models import Organization as org_mod
+from myapi.models import Volunteer as vol_mod
+from myapi.types import UpdateOrganizationData, UpdateVolunteerData
+
+
+# TWO-TIER CACHE
+
+# Two TwoTierCache objects with the same namespace stand in for two worker
+# processes: separate L1s over the same L2.
+
+
+@override_settings(
+    TWO_TIER_CACHE={"L2": "shared", "L1_MAX_ENTRIES": 100, "SYNC_INTERVAL": 0}
+)
+class TestTwoTierCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["shared"].clear()
+        caching.reset()
+
+    def test_get_fills_l1_from_l2(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        worker_a.set("key", "value")
+
+        # Act
+        first = worker_b.get("key")
+        second = worker_b.get("key")
+
+        # Assert
+        assert first == second == "value"
+        stats = worker_b.stats()
+        assert (stats.l1_hits, stats.l1_misses) == (1, 1)
+        assert (stats.l2_hits, stats.l2_misses) == (1, 0)
+
+    def test_get_missing(self):
+        # Arrange
+        worker = TwoTierCache("test")
+
+        # Act & Assert
+        assert worker.get("key") is None
+        assert worker.get("key", "default") == "default"
+        assert worker.stats().l2_misses == 2
+
+    @override_settings(
+        TWO_TIER_CACHE={"L2": "shared", "L1_MAX_ENTRIES": 2, "SYNC_INTERVAL": 0}
+    )
+    def test_l1_evicts_least_recently_used(self):
+        # Arrange
+        worker = TwoTierCache("test")
+        worker.set("a", 1)
+        worker.set("b", 2)
+        worker.get("a")
+
+        # Act
+        worker.set("c", 3)
+
+        # Assert (b was evicted from L1 but is still in L2)
+        assert worker.stats().l1_evictions == 1
+        assert worker.get_many(["a", "b", "c"]) == {"a": 1, "b": 2, "c": 3}
+        stats = worker.stats()
+        assert (stats.l1_hits, stats.l2_hits) == (3, 1)
+
+    def test_delete_reaches_other_workers(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        worker_a.set("key", "old")
+        assert worker_b.get("key") == "old"
+
+        # Act
+        worker_a.delete("key")
+
+        # Assert
+        assert worker_a.get("key") is None
+        assert worker_b.get("key") is None
+
+    @override_settings(TWO_TIER_CACHE={"L2": "shared", "SYNC_INTERVAL": 3600})
+    def test_other_workers_catch_up_on_sync(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        worker_a.set("key", "old")
+        assert worker_b.get("key") == "old"
+
+        # Act
+        worker_a.delete("key")
+
+        # Assert (stale until the next sync)
+        assert worker_b.get("key") == "old"
+        worker_b.sync(force=True)
+        assert worker_b.get("key") is None
+
+    def test_delete_reaches_workers_after_overwritten_epoch(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        worker_a.delete("c")
+        worker_a.set_many({"a": 1, "b": 2})
+        assert worker_b.get_many(["a", "b"]) == {"a": 1, "b": 2}
+        epoch_key = worker_a._control_key("epoch")
+        epoch = caches["shared"].get(epoch_key)
+
+        # Act (worker_a's epoch write lands on top of worker_b's, as when both
+        # read the same epoch on a backend without atomic incr)
+        worker_b.delete("b")
+        caches["shared"].set(epoch_key, epoch)
+        worker_a.delete("a")
+
+        # Assert
+        assert worker_a.get_many(["a", "b"]) == {}
+        assert worker_b.get_many(["a", "b"]) == {}
+
+    @override_settings(
+        TWO_TIER_CACHE={"L2": "shared", "SYNC_INTERVAL": 3600, "L1_TIMEOUT": 0.05}
+    )
+    def test_l1_entries_expire(self):
+        # Arrange
+        worker = TwoTierCache("test")
+        worker.set("key", "old")
+        caches["shared"].set(worker._key("key"), "new")
+
+        # Act
+        before = worker.get("key")
+        time.sleep(0.06)
+        after = worker.get("key")
+
+        # Assert
+        assert (before, after) == ("old", "new")
+
+    def test_invalidate_drops_namespace(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        other = TwoTierCache("other")
+        worker_a.set_many({"a": 1, "b": 2})
+        other.set("a", 1)
+        assert worker_b.get_many(["a", "b"]) == {"a": 1, "b": 2}
+
+        # Act
+        worker_a.invalidate()
+
+        # Assert
+        assert worker_a.get_many(["a", "b"]) == {}
+        assert worker_b.get_many(["a", "b"]) == {}
+        assert other.get("a") == 1
+
+    def test_versions_do_not_share_entries(self):
+        # Arrange
+        TwoTierCache("test", version=1).set("key", "v1 shape")
+
+        # Act & Assert
+        assert TwoTierCache("test", version=2).get("key") is None
+
+    def test_get_or_set(self):
+        # Arrange
+        worker = TwoTierCache("test")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return "value"
+
+        # Act
+        values = [worker.get_or_set("key", compute) for _ in range(3)]
+
+        # Assert
+        assert values == ["value"] * 3
+        assert len(calls) == 1
+
+    def test_get_or_set_loads_once_per_process(self):
+        # Arrange
+        worker = TwoTierCache("test")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(worker.get_or_set("key", compute))
+            )
+            for _ in range(5)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+
+    def test_get_or_set_waits_for_other_process(self):
+        # Arrange (worker_a is loading the key)
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+        worker_a.sync()
+        caches["shared"].add(f"{worker_a._key('key')}:filling", 1)
+        filler = threading.Timer(0.05, worker_a.set, args=("key", "from a"))
+
+        # Act
+        filler.start()
+        value = worker_b.get_or_set("key", lambda: "from b")
+        filler.join()
+
+        # Assert
+        assert value == "from a"
+
+    def test_get_or_set_skips_value_read_before_a_delete(self):
+        # Arrange
+        worker_a = TwoTierCache("test")
+        worker_b = TwoTierCache("test")
+
+        # Act (worker_a deletes the key while worker_b is loading it)
+        value = worker_b.get_or_set("key", lambda: worker_a.delete("key") or "old")
+
+        # Assert
+        assert value == "old"
+        assert worker_b.get("key") is None
+
+    def test_get_or_set_discards_value_computed_during_invalidation(self):
+        # Arrange
+        worker = TwoTierCache("test")
+
+        # Act
+        value = worker.get_or_set("key", lambda: worker.invalidate() or "stale")
+
+        # Assert
+        assert value == "stale"
+        assert worker.get("key") is None
+
+    def test_lost_generation_is_not_reused(self):
+        # Arrange
+        worker = TwoTierCache("test")
+        worker.set("key", "value")
+        generation = worker.generation
+
+        # Act (the shared cache restarts)
+        caches["shared"].clear()
+        worker.sync(force=True)
+
+        # Assert
+        assert worker.generation != generation
+        assert worker.get("key") is None
+
+    def test_stats_published_to_metrics(self):
+        # Arrange
+        caching.L1_HITS.reset()
+        caching.L2_MISSES.reset()
+        worker = TwoTierCache("test")
+        worker.get("missing")
+        worker.set("key", "value")
+        worker.get("key")
+
+        # Act
+        worker.sync(force=True)
+
+        # Assert
+        assert caching.L1_HITS.value() == 1
+        assert caching.L2_MISSES.value() == 1
+
+    def test_for_model_shares_one_cache_per_process(self):
+        # Act
+        volunteers = caching.for_model(vol_mod)
+
+        # Assert
+        assert volunteers is caching.for_model(vol_mod)
+        assert volunteers.namespace == "myapi.volunteer"
+
+
+@override_settings(ENTITY_CACHE_ENABLED=True)
+class TestEntityCache(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        caching.reset()
+        self.organization = org_mod.objects.create(
+            name="Wayne Foundation",
+            location="Gotham",
+            email="foundation@wayne.com",
+            phone_number="555-0100",
+            website="https://wayne.com",
+        )
+        self.volunteer = vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+            password="ImBatman99",
+        )
+
+    def tearDown(self):
+        caching.reset()
+
+    def test_lookup_served_from_cache(self):
+        # Arrange
+        org_dao.get_organization(id=self.organization.id)
+
+        # Act & Assert
+        with self.assertNumQueries(0):
+            organization = org_dao.get_organization(id=self.organization.id)
+        assert organization.name == "Wayne Foundation"
+        assert organization._state.adding is False
+
+    def test_lookups_return_separate_instances(self):
+        # Arrange
+        organization = org_dao.get_organization(id=self.organization.id)
+
+        # Act
+        organization.name = "Changed, not saved"
+
+        # Assert
+        assert org_dao.get_organization(id=self.organization.id).name == (
+            "Wayne Foundation"
+        )
+
+    def test_save_invalidates(self):
+        # Arrange
+        organization = org_dao.get_organization(id=self.organization.id)
+
+        # Act
+        organization.name = "Wayne Enterprises"
+        organization.save()
+
+        # Assert
+        assert org_dao.get_organization(id=self.organization.id).name == (
+            "Wayne Enterprises"
+        )
+
+    def test_update_keeps_columns_written_elsewhere(self):
+        # Arrange (another worker's write the cached copy hasn't seen yet)
+        vol_dao.get_volunteer(id=self.volunteer.id)
+        vol_mod.objects.filter(id=self.volunteer.id).update(title="Knight")
+
+        # Act
+        vol_dao.update_volunteer(
+            UpdateVolunteerData(id=self.volunteer.id, first_name="Brucie")
+        )
+
+        # Assert
+        volunteer = vol_mod.objects.get(id=self.volunteer.id)
+        assert volunteer.first_name == "Brucie"
+        assert volunteer.title == "Knight"
+
+    def test_delete_invalidates(self):
+        # Arrange
+        org_dao.get_organization(id=self.organization.id)
+
+        # Act
+        org_dao.delete_organization(self.organization.id)
+
+        # Assert
+        assert org_dao.get_organization(id=self.organization.id) is None
+
+    def test_missing_row_cached_until_created(self):
+        # Arrange
+        assert org_dao.get_organization(id=999) is None
+        with self.assertNumQueries(0):
+            assert org_dao.get_organization(id=999) is None
+
+        # Act
+        org_mod.objects.create(
+            id=999,
+            name="Justice League",
+            location="Watchtower",
+            email="league@jl.org",
+            website="https://jl.org",
+        )
+
+        # Assert
+        assert org_dao.get_organization(id=999).name == "Justice League"
+
+    def test_m2m_change_invalidates_both_sides(self):
+        # Arrange
+        opportunity = opp_mod.objects.create(
+            title="Soup kitchen",
+            description="Serving dinner",
+            location="Gotham",
+            start_time=timezone.now(),
+            end_time=timezone.now(),
+            organization=self.organization,
+        )
+        vol_dao.get_volunteer(id=self.volunteer.id)
+
+        # Act
+        opportunity.volunteers.add(self.volunteer)
+
+        # Assert
+        with self.assertNumQueries(1):
+            vol_dao.get_volunteer(id=self.volunteer.id)
+
+    def test_password_not_cached(self):
+        # Arrange
+        vol_dao.get_volunteer(id=self.volunteer.id)
+
+        # Act
+        with self.assertNumQueries(1):
+            volunteer = vol_dao.get_volunteer(id=self.volunteer.id)
+            password = volunteer.password
+
+        # Assert
+        assert password == vol_mod.objects.get(id=self.volunteer.id).password
+
+    def test_not_cached_inside_transaction(self):
+        # Act & Assert
+        with transaction.atomic():
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    org_dao.get_organization(id=self.organization.id)
+
+
+class TestIdentityMap(TestCase):
+    def setUp(self):
+        self.organization = org_mod.objects.create(
+            name="Wayne Foundation",
+            location="Gotham",
+            email="foundation@wayne.com",
+            website="https://wayne.com",
+        )
+
+    def test_same_object_within_scope(self):
+        # Act
+        with identity_map.scope():
+            with self.assertNumQueries(1):
+                first = org_dao.get_organization(id=self.organization.id)
+                second = org_dao.get_organization(id=str(self.organization.id))
+
+        # Assert
+        assert first is second
+
+    def test_no_map_outside_scope(self):
+        # Act & Assert
+        with self.assertNumQueries(2):
+            first = org_dao.get_organization(id=self.organization.id)
+            second = org_dao.get_organization(id=self.organization.id)
+        assert first is not second
+
+    def test_scopes_are_separate(self):
+        # Act
+        with identity_map.scope():
+            first = org_dao.get_organization(id=self.organization.id)
+        with identity_map.scope():
+            second = org_dao.get_organization(id=self.organization.id)
+
+        # Assert
+        assert first is not second
+
+    def test_update_reuses_mapped_rows(self):
+        # Arrange
+        opportunity = opp_mod.objects.create(
+            title="Soup kitchen",
+            description="Serving dinner",
+            location="Gotham",
+            start_time=timezone.now(),
+            end_time=timezone.now(),
+            organization=self.organization,
+        )
+        volunteer = vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+        )
+
+        with identity_map.scope():
+            mapped = opp_dao.get_opportunity(id=opportunity.id)
+            vol_dao.get_volunteer(id=volunteer.id)
+
+            # Act
+            with self.assertNumQueries(0):
+                opportunity_again = identity_map.get(opp_mod, opportunity.id)
+            opp_dao.add_volunteer_to_opportunity(opportunity.id, volunteer.id)
+
+        # Assert
+        assert opportunity_again is mapped
+        assert list(opportunity.volunteers.all()) == [volunteer]
+
+    def test_row_saved_elsewhere_is_reloaded(self):
+        with identity_map.scope():
+            # Arrange
+            mapped = org_dao.get_organization(id=self.organization.id)
+
+            # Act
+            other = org_mod.objects.get(id=self.organization.id)
+            other.name = "Wayne Enterprises"
+            other.save()
+
+            # Assert
+            reloaded = org_dao.get_organization(id=self.organization.id)
+            assert reloaded is not mapped
+            assert reloaded.name == "Wayne Enterprises"
+
+    def test_own_save_keeps_object(self):
+        with identity_map.scope():
+            # Arrange
+            mapped = org_dao.get_organization(id=self.organization.id)
+
+            # Act
+            mapped.name = "Wayne Enterprises"
+            mapped.save()
+
+            # Assert
+            assert org_dao.get_organization(id=self.organization.id) is mapped
+
+    def test_deleted_row_is_dropped(self):
+        with identity_map.scope():
+            # Arrange
+            org_dao.get_organization(id=self.organization.id)
+
+            # Act
+            org_dao.delete_organization(self.organization.id)
+
+            # Assert
+            assert org_dao.get_organization(id=self.organization.id) is None
+
+
+# RESPONSE CACHE
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class TestResponseCache(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.client = APIClient()
+        self.wayne = org_mod.objects.create(
+            name="Wayne Foundation",
+            location="Gotham",
+            email="foundation@wayne.com",
+            phone_number="555-0100",
+            website="https://wayne.com",
+        )
+        self.kent = org_mod.objects.create(
+            name="Kent Farm",
+            location="Smallville",
+            email="farm@kent.com",
+            phone_number="555-0101",
+            website="https://kent.com",
+        )
+
+    def test_repeated_get_served_from_cache(self):
+        # Arrange
+        first = self.client.get("/organization/")
+
+        # Act
+        with self.assertNumQueries(0):
+            second = self.client.get("/organization/")
+
+        # Assert
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert response_cache.HITS.value() == 1
+        assert response_cache.MISSES.value() == 1
+        assert response_cache.hit_ratio() == 0.5
+
+    def test_query_string_is_part_of_key(self):
+        # Arrange
+        self.client.get("/organization/")
+
+        # Act
+        response = self.client.get(f"/organization/?id={self.wayne.id}")
+
+        # Assert
+        assert response.json()["name"] == "Wayne Foundation"
+        assert response_cache.MISSES.value() == 2
+
+    def test_save_purges_only_entries_showing_row(self):
+        # Arrange
+        self.client.get("/organization/")
+        self.client.get(f"/organization/?id={self.wayne.id}")
+        self.client.get(f"/organization/?id={self.kent.id}")
+
+        # Act
+        org_dao.update_organization(
+            UpdateOrganizationData(
+                id=self.wayne.id,
+                name="Wayne Enterprises",
+                location="Gotham",
+                email="enterprises@wayne.com",
+                phone_number="555-0100",
+                website="https://wayne.com",
+            )
+        )
+
+        # Assert
+        listing = self.client.get("/organization/")
+        wayne = self.client.get(f"/organization/?id={self.wayne.id}")
+        self.client.get(f"/organization/?id={self.kent.id}")
+        assert "Wayne Enterprises" in [row["name"] for row in listing.json()]
+        assert wayne.json()["name"] == "Wayne Enterprises"
+        assert response_cache.HITS.value() == 1
+
+    def test_sign_up_purges_opportunity(self):
+        # Arrange
+        opportunity = opp_mod.objects.create(
+            title="Soup kitchen",
+            description="Serve soup",
+            start_time=timezone.now(),
+            end_time=timezone.now(),
+            location="Gotham",
+            organization=self.wayne,
+        )
+        volunteer = vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+            password="ImBatman99",
+        )
+        url = f"/opportunity/?id={opportunity.id}"
+        self.client.get(url)
+
+        # Act
+        opp_dao.add_volunteer_to_opportunity(opportunity.id, volunteer.id)
+
+        # Assert
+        assert self.client.get(url).json()["volunteers"] == [volunteer.id]
+
+    def test_deleting_volunteer_purges_their_opportunities(self):
+        # Arrange
+        opportunity = opp_mod.objects.create(
+            title="Soup kitchen",
+            description="Serve soup",
+            start_time=timezone.now(),
+            end_time=timezone.now(),
+            location="Gotham",
+            organization=self.wayne,
+        )
+        volunteer = vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+            password="ImBatman99",
+        )
+        opp_dao.add_volunteer_to_opportunity(opportunity.id, volunteer.id)
+        url = f"/opportunity/?id={opportunity.id}"
+        assert self.client.get(url).json()["volunteers"] == [volunteer.id]
+        assert self.client.get("/opportunity/").json()[0]["volunteer_count"] == 1
+
+        # Act
+        vol_dao.delete_volunteer(volunteer.id)
+
+        # Assert
+        shown = self.client.get(url).json()
+        assert (shown["volunteers"], shown["filled"]) == ([], 0)
+        assert self.client.get("/opportunity/").json()[0]["volunteer_count"] == 0
+
+    def test_error_responses_not_cached(self):
+        # Arrange
+        url = "/organization/?id=999"
+        self.client.get(url)
+
+        # Act
+        response = self.client.get(url)
+
+        # Assert
+        assert response.status_code == 404
+        assert response_cache.HITS.value() == 0
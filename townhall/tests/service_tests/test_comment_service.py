@@ -55,3 +55,72 @@ class TestCommentModel(TestCase):
             comment_from_db.created_at,
             timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
         )
+
+
+class TestCommentCount(TestCase):
+    def setUp(self):
+        self.volunteer = townhall_models.Volunteer.objects.create(
+            first_name="Zamorak",
+            last_name="Red",
+            gender="M",
+            email="zamorak.red@gmail.com",
+        )
+        self.post = Post.objects.create(
+            volunteer=self.volunteer,
+            content="This is a test post by Gen",
+            created_at=timezone.make_aware(datetime(2024, 7, 19, 10, 0)),
+        )
+
+    def create_comment(self):
+        return CommentServices.create_comment(
+            CreateCommentData(
+                user_id=self.volunteer.id,
+                post_id=self.post.id,
+                content="Testing",
+                created_at=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+            )
+        )
+
+    def test_create_comment_increments_count(self):
+        self.create_comment()
+        self.create_comment()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    def test_delete_comment_decrements_count(self):
+        comment = self.create_comment()
+        self.create_comment()
+
+        CommentServices.delete_comment(comment)
+        # Deleting the same comment twice must not decrement again
+        CommentServices.delete_comment(comment)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertFalse(Comment.objects.filter(id=comment.id).exists())
+
+    def test_deleting_commenter_decrements_count(self):
+        commenter = townhall_models.Volunteer.objects.create(
+            first_name="Saradomin",
+            last_name="Blue",
+            gender="M",
+            email="saradomin.blue@gmail.com",
+        )
+        self.create_comment()
+        for _ in range(2):
+            CommentServices.create_comment(
+                CreateCommentData(
+                    user_id=commenter.id,
+                    post_id=self.post.id,
+                    content="Testing",
+                    created_at=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+                )
+            )
+
+        # Deletes their comments by cascade
+        commenter.delete()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
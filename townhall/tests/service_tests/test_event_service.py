@@ -1,7 +1,10 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from myapi.services import EventServices
-from myapi.models import Organization
+from myapi.services import CalendarServices, EventServices, OrganizationServices
+from myapi.models import Event, Opportunity, Organization
 
 from django.utils import timezone
 
@@ -34,3 +37,116 @@ class TestEventModel(TestCase):
         self.assertEqual(event.title, "Title")
         self.assertEqual(event.description, "This is a test")
         self.assertEqual(event.organization, self.organization)
+
+    def test_get_calendar_window(self):
+        other = Organization.objects.create(
+            name="Other Organization",
+            location="Test Location",
+            email="other@example.com",
+        )
+
+        def at(day, hour):
+            return timezone.make_aware(datetime(2024, 7, day, hour, 0))
+
+        shift = Opportunity.objects.create(
+            title="Shift",
+            description="Deliver food",
+            start_time=at(20, 10),
+            end_time=at(20, 12),
+            location="UBC",
+            organization=self.organization,
+        )
+        Opportunity.objects.create(
+            title="Too late",
+            description="Deliver food",
+            start_time=at(25, 10),
+            end_time=at(25, 12),
+            location="UBC",
+            organization=self.organization,
+        )
+        gala = Event.objects.create(
+            title="Gala",
+            description="Fundraiser",
+            start_time=at(19, 18),
+            end_time=at(20, 1),
+            location="UBC",
+            organization=self.organization,
+        )
+        Event.objects.create(
+            title="Over before",
+            description="Fundraiser",
+            start_time=at(19, 18),
+            end_time=at(20, 0),
+            location="UBC",
+            organization=self.organization,
+        )
+        fair = Event.objects.create(
+            title="Fair",
+            description="Volunteer fair",
+            start_time=at(20, 10),
+            end_time=at(20, 16),
+            location="UBC",
+            organization=other,
+        )
+
+        entries = CalendarServices.get_calendar(start=at(20, 0), end=at(25, 0))
+        own = CalendarServices.get_calendar(
+            start=at(20, 0), end=at(25, 0), organization_id=self.organization.id
+        )
+
+        # Opportunities and events overlapping the window, by start time
+        self.assertEqual(
+            [(entry.kind, entry.id) for entry in entries],
+            [("event", gala.id), ("event", fair.id), ("opportunity", shift.id)],
+        )
+        self.assertEqual(
+            [(entry.kind, entry.id) for entry in own],
+            [("event", gala.id), ("opportunity", shift.id)],
+        )
+        for start, end in (
+            (at(25, 0), at(20, 0)),
+            (at(1, 0), at(1, 0) + timedelta(days=400)),
+        ):
+            with self.assertRaises(ValidationError) as context:
+                CalendarServices.get_calendar(start=start, end=end)
+            self.assertEqual(context.exception.code, "invalid")
+
+    def test_calendar_feed_rendered_incrementally(self):
+        start = timezone.now() + timedelta(days=1)
+        for n in range(3):
+            Event.objects.create(
+                title=f"Gala {n}",
+                description="Fundraiser",
+                start_time=start + timedelta(days=n),
+                end_time=start + timedelta(days=n, hours=2),
+                location="UBC",
+                organization=self.organization,
+            )
+        Opportunity.objects.create(
+            title="Shift",
+            description="Deliver food",
+            start_time=start - timedelta(hours=1),
+            end_time=start,
+            location="UBC",
+            organization=self.organization,
+        )
+        # The organization, the opportunities and events listed with their
+        # updated_at, and the ones not rendered yet loaded
+        with self.assertNumQueries(5):
+            feed = OrganizationServices.get_calendar_feed(self.organization.id)
+
+        event = Event.objects.get(title="Gala 1")
+        event.title = "Gala, again; 1"
+        event.save()
+        # Only the changed event is loaded again
+        with self.assertNumQueries(4):
+            changed = OrganizationServices.get_calendar_feed(self.organization.id)
+
+        self.assertEqual(feed.count("BEGIN:VEVENT"), 4)
+        self.assertTrue(feed.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertLess(feed.index("SUMMARY:Shift"), feed.index("SUMMARY:Gala 0"))
+        self.assertIn("SUMMARY:Gala\\, again\\; 1\r\n", changed)
+        self.assertEqual(changed.count("BEGIN:VEVENT"), 4)
+        with self.assertRaises(ValidationError) as context:
+            OrganizationServices.get_calendar_feed(999)
+        self.assertEqual(context.exception.code, "not_found")
@@ -1,8 +1,19 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from io import StringIO
 from myapi import models as townhall_models
 from datetime import datetime
 from django.utils import timezone
 from myapi import services as townhall_services
+from myapi import exports
+from myapi import schedule
+from myapi.types import UpdateVolunteerData
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models.signals import m2m_changed
+from unittest.mock import patch
+from rest_framework import status
+from rest_framework.test import APIClient
 
 # OPPORTUNITY
 
@@ -36,8 +47,8 @@ class TestOpportunityModel(TestCase):
             id=2,
             title="Hygiene",
             description="Deliver clothes",
-            start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
-            end_time=timezone.make_aware(datetime(2024, 7, 20, 21, 45)),
+            start_time=timezone.make_aware(datetime(2024, 7, 21, 10, 0)),
+            end_time=timezone.make_aware(datetime(2024, 7, 21, 21, 45)),
             location="East Vancouver",
             organization=test_organization,
         )
@@ -45,8 +56,8 @@ class TestOpportunityModel(TestCase):
             id=3,
             title="Community Clean Up",
             description="Clean up the neighborhood",
-            start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
-            end_time=timezone.make_aware(datetime(2024, 7, 20, 21, 15)),
+            start_time=timezone.make_aware(datetime(2024, 7, 22, 10, 0)),
+            end_time=timezone.make_aware(datetime(2024, 7, 22, 21, 15)),
             location="West Vancouver",
             organization=test_organization,
         )
@@ -142,10 +153,10 @@ class TestOpportunityModel(TestCase):
         assert opportunity_before_update.title == "Community Clean Up"
         assert opportunity_before_update.description == "Clean up the neighborhood"
         assert opportunity_before_update.start_time == timezone.make_aware(
-            datetime(2024, 7, 20, 10, 0)
+            datetime(2024, 7, 22, 10, 0)
         )
         assert opportunity_before_update.end_time == timezone.make_aware(
-            datetime(2024, 7, 20, 21, 15)
+            datetime(2024, 7, 22, 21, 15)
         )
         assert opportunity_before_update.location == "West Vancouver"
         assert opportunity_before_update.organization.id == 1
@@ -331,6 +342,314 @@ class TestOpportunityModel(TestCase):
         )
         assert len(volunteers) == 3
 
+    def test_get_opportunity_list(self):
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 1)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 2)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(2, 2)
+
+        # Counts and the volunteer's sign-ups come with the rows, one query
+        with self.assertNumQueries(1):
+            opportunities = list(
+                townhall_services.OpportunityServices.get_opportunity_list(
+                    volunteer_id=1
+                )
+            )
+
+        assert [o.volunteer_count for o in opportunities] == [2, 1, 0]
+        assert [o.is_signed_up for o in opportunities] == [True, False, False]
+
+        anonymous = townhall_services.OpportunityServices.get_opportunity_list()
+        assert not any(o.is_signed_up for o in anonymous)
+
+    def test_get_volunteers_page(self):
+        for volunteer_id in (1, 2, 3):
+            townhall_services.OpportunityServices.add_volunteer_to_opportunity(
+                1, volunteer_id
+            )
+
+        first = townhall_services.OpportunityServices.get_volunteers_page(1, limit=2)
+        second = townhall_services.OpportunityServices.get_volunteers_page(
+            1, limit=2, cursor=first.next_cursor
+        )
+
+        # Ordered by last name
+        assert [v.last_name for v in first.items] == ["Green", "Red"]
+        assert [v.last_name for v in second.items] == ["Spector"]
+        assert second.next_cursor is None
+
+        with self.assertRaises(ValidationError) as context:
+            townhall_services.OpportunityServices.get_volunteers_page(999, limit=2)
+        self.assertEqual(context.exception.code, "not_found")
+
+    def test_add_volunteers_to_opportunity(self):
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        updated_before = opportunity.updated_at
+
+        # The same queries however many volunteers: the existence check, the
+        # volunteers and the opportunity locked, their overlapping shifts looked
+        # up, its seats taken, one insert, their waitlist entries dropped and
+        # updated_at moved
+        with self.assertNumQueries(12):
+            townhall_services.OpportunityServices.add_volunteers_to_opportunity(
+                1, [1, 2, 2]
+            )
+        # Volunteers already signed up are skipped, and their caches kept
+        changed = []
+
+        def record(sender, action, pk_set, **kwargs):
+            changed.append((action, pk_set))
+
+        m2m_changed.connect(record, sender=townhall_models.SignUp)
+        try:
+            townhall_services.OpportunityServices.add_volunteers_to_opportunity(
+                1, [2, 3]
+            )
+        finally:
+            m2m_changed.disconnect(record, sender=townhall_models.SignUp)
+        assert changed == [("post_add", {3})]
+
+        assert sorted(opportunity.volunteers.values_list("id", flat=True)) == [1, 2, 3]
+        opportunity.refresh_from_db()
+        assert opportunity.updated_at > updated_before
+
+        townhall_services.OpportunityServices.remove_volunteers_from_opportunity(1, [1])
+        # Only the volunteers actually removed are sent
+        changed.clear()
+        m2m_changed.connect(record, sender=townhall_models.SignUp)
+        try:
+            townhall_services.OpportunityServices.remove_volunteers_from_opportunity(
+                1, [1, 3]
+            )
+        finally:
+            m2m_changed.disconnect(record, sender=townhall_models.SignUp)
+        assert changed == [("post_remove", {3})]
+        assert list(opportunity.volunteers.values_list("id", flat=True)) == [2]
+
+    def test_add_volunteers_to_opportunity_unknown_ids(self):
+        with self.assertRaises(ValidationError) as context:
+            townhall_services.OpportunityServices.add_volunteers_to_opportunity(
+                1, [1, 999]
+            )
+        self.assertEqual(context.exception.code, "invalid")
+        # Nothing is added when an id is unknown
+        assert not townhall_models.Opportunity.objects.get(id=1).volunteers.exists()
+
+        with self.assertRaises(ValidationError) as context:
+            townhall_services.OpportunityServices.add_volunteers_to_opportunity(
+                999, [1]
+            )
+        self.assertEqual(context.exception.code, "not_found")
+
+    def test_add_volunteers_to_overlapping_opportunity(self):
+        services = townhall_services.OpportunityServices
+        services.add_volunteers_to_opportunity(1, [1, 2])
+        overlapping = townhall_models.Opportunity.objects.get(id=2)
+        overlapping.start_time = timezone.make_aware(datetime(2024, 7, 20, 20, 0))
+        overlapping.save()
+
+        with self.assertRaises(ValidationError) as context:
+            services.add_volunteers_to_opportunity(2, [3, 1, 2])
+        self.assertEqual(context.exception.code, "conflict")
+        self.assertEqual(
+            context.exception.messages[0],
+            "Volunteers with the given ids are signed up for opportunities "
+            "overlapping this one: 1, 2.",
+        )
+        with self.assertRaises(ValidationError) as context:
+            services.add_volunteer_to_opportunity(2, 1)
+        self.assertEqual(context.exception.code, "conflict")
+        # Nobody is signed up, no seat is taken
+        overlapping.refresh_from_db()
+        assert overlapping.filled == 0
+        assert not overlapping.volunteers.exists()
+
+        # Not once the first shift ends before
+        townhall_models.Opportunity.objects.filter(id=1).update(
+            end_time=overlapping.start_time
+        )
+        schedule.stamp([1])
+        services.add_volunteers_to_opportunity(2, [3, 1, 2])
+        assert overlapping.volunteers.count() == 3
+
+    def test_overlaps_checked_under_volunteer_lock(self):
+        # Concurrent sign-ups of one volunteer wait on the lock, the second
+        # one checks for overlaps once the first is committed
+        calls = []
+        outer = len(connection.atomic_blocks)
+
+        def record(name, function):
+            def wrapper(*args):
+                calls.append((name, len(connection.atomic_blocks) > outer))
+                return function(*args)
+
+            return wrapper
+
+        with patch.object(
+            schedule, "lock", record("lock", schedule.lock)
+        ), patch.object(schedule, "clashes", record("clashes", schedule.clashes)):
+            townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 1)
+
+        assert calls == [("lock", True), ("clashes", True)]
+
+    def test_capacity_waitlist_and_promotion(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=2)
+        services = townhall_services.OpportunityServices
+
+        first = services.add_volunteer_to_opportunity(1, 1)
+        services.add_volunteer_to_opportunity(1, 2)
+        waiting = services.add_volunteer_to_opportunity(1, 3)
+
+        assert first.signed_up
+        assert not waiting.signed_up
+        assert waiting.waitlist_position == 1
+        assert list(services.get_waitlist(1)) == [
+            townhall_models.Volunteer.objects.get(id=3)
+        ]
+
+        # The freed seat goes to the head of the waitlist
+        services.remove_volunteer_from_opportunity(1, 1)
+
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        assert sorted(opportunity.volunteers.values_list("id", flat=True)) == [2, 3]
+        assert opportunity.filled == 2
+        assert not services.get_waitlist(1).exists()
+
+    def test_sign_up_twice_takes_one_seat(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=1)
+
+        townhall_services.VolunteerServices.add_volunteer_to_opportunity(1, 1)
+        again = townhall_services.VolunteerServices.add_volunteer_to_opportunity(1, 1)
+
+        assert again.signed_up
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 1
+        assert not townhall_models.WaitlistEntry.objects.exists()
+
+    def test_sign_up_leaves_waitlist(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=1)
+        services = townhall_services.OpportunityServices
+        services.add_volunteer_to_opportunity(1, 1)
+        services.add_volunteer_to_opportunity(1, 2)
+        services.add_volunteer_to_opportunity(1, 3)
+
+        # A seat frees up before the waitlist is filled from
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=2)
+        result = services.add_volunteer_to_opportunity(1, 3)
+
+        assert result.signed_up
+        assert list(services.get_waitlist(1)) == [
+            townhall_models.Volunteer.objects.get(id=2)
+        ]
+
+    def test_capacity_below_sign_ups_rejected(self):
+        services = townhall_services.OpportunityServices
+        services.add_volunteer_to_opportunity(1, 1)
+        services.add_volunteer_to_opportunity(1, 2)
+        client = APIClient()
+
+        response = client.put("/opportunity/?id=1", {"capacity": 1}, format="json")
+        # Rolled back
+        assert townhall_models.Opportunity.objects.get(id=1).capacity is None
+        accepted = client.put("/opportunity/?id=1", {"capacity": 2}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["capacity"], ["More volunteers are signed up than this."]
+        )
+        self.assertEqual(accepted.status_code, status.HTTP_200_OK)
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        assert (opportunity.capacity, opportunity.filled) == (2, 2)
+
+    def test_larger_capacity_fills_from_waitlist(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=0)
+        for volunteer_id in (1, 2, 3):
+            townhall_services.OpportunityServices.add_volunteer_to_opportunity(
+                1, volunteer_id
+            )
+
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=2)
+        promoted = townhall_services.OpportunityServices.fill_from_waitlist(1)
+
+        assert promoted == [1, 2]
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 2
+
+    def test_add_volunteers_over_capacity(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=2)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 1)
+
+        with self.assertRaises(ValidationError) as context:
+            townhall_services.OpportunityServices.add_volunteers_to_opportunity(
+                1, [2, 3]
+            )
+        self.assertEqual(context.exception.code, "full")
+
+        # Volunteers already signed up need no seat
+        townhall_services.OpportunityServices.add_volunteers_to_opportunity(1, [1, 2])
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 2
+
+    def test_add_opportunities_to_volunteer_seat_taken_meanwhile(self):
+        townhall_models.Opportunity.objects.filter(id=2).update(capacity=1)
+
+        # Another sign-up takes the last seat after the opportunities were read
+        def take_last_seat(volunteer_id, opportunities):
+            townhall_models.Opportunity.objects.filter(id=2).update(filled=1)
+            return []
+
+        with patch.object(schedule, "opportunities_with_clashes", take_last_seat):
+            with self.assertRaises(ValidationError) as context:
+                townhall_services.VolunteerServices.add_opportunities_to_volunteer(
+                    1, [1, 2]
+                )
+        self.assertEqual(context.exception.code, "full")
+
+        # No seat is taken in the other one either
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 0
+        assert not townhall_models.SignUp.objects.exists()
+
+    def test_seats_of_deleted_volunteer_go_to_waitlist(self):
+        townhall_models.Opportunity.objects.filter(id=1).update(capacity=1)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 1)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 2)
+        changed = []
+
+        def record(sender, action, reverse, pk_set, **kwargs):
+            changed.append((action, reverse, pk_set))
+
+        # The caches hear about it like about the DAO's removals
+        m2m_changed.connect(record, sender=townhall_models.SignUp)
+        try:
+            townhall_models.Volunteer.objects.get(id=1).delete()
+        finally:
+            m2m_changed.disconnect(record, sender=townhall_models.SignUp)
+
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        assert list(opportunity.volunteers.values_list("id", flat=True)) == [2]
+        assert opportunity.filled == 1
+        assert changed == [("post_remove", True, {1}), ("post_add", False, {2})]
+
+    def test_save_keeps_filled_and_restores_deleted_row(self):
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        townhall_services.OpportunityServices.add_volunteer_to_opportunity(1, 1)
+
+        # A copy loaded before the sign-up doesn't write its count back
+        opportunity.title = "Renamed"
+        opportunity.save()
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 1
+
+        # Saving a copy of a deleted row inserts it again
+        townhall_models.Opportunity.objects.filter(id=1).delete()
+        opportunity.save()
+        assert townhall_models.Opportunity.objects.get(id=1).title == "Renamed"
+
+    def test_related_manager_changes_are_counted(self):
+        opportunity = townhall_models.Opportunity.objects.get(id=1)
+        volunteer = townhall_models.Volunteer.objects.get(id=1)
+
+        opportunity.volunteers.add(volunteer, 2)
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 2
+
+        volunteer.opportunities.clear()
+        assert townhall_models.Opportunity.objects.get(id=1).filled == 1
+
     def test_get_all_opportunities_from_volunteer(self):
         opportunity1 = townhall_services.OpportunityServices.get_opportunity(id=1)
         opportunity2 = townhall_services.OpportunityServices.get_opportunity(id=2)
@@ -459,3 +778,176 @@ class TestOpportunityModel(TestCase):
         assert len(volunteers1_after) == 0
         volunteers2_after = opportunity2.volunteers.all()
         assert len(volunteers2_after) == 0
+
+
+class TestSignUpContention(TransactionTestCase):
+    def test_concurrent_sign_ups_never_overfill(self):
+        out = StringIO()
+
+        call_command(
+            "benchmark_sign_ups", volunteers=40, capacity=10, threads=8, stdout=out
+        )
+
+        self.assertIn(
+            "signed up 10 of 10 seats (filled 10), 30 waitlisted", out.getvalue()
+        )
+
+
+class TestFilterIndexes(TestCase):
+    def test_filter_paths_use_indexes(self):
+        # Act
+        out = StringIO()
+        call_command("explain_filters", stdout=out)
+
+        # Assert (the command raises CommandError on a regression)
+        report = out.getvalue()
+        self.assertIn("opportunity organization + start range", report)
+        self.assertNotIn("regression", report)
+
+
+class TestMigrations(TestCase):
+    def test_migrations_match_models(self):
+        # Act (exits with status 1 when the models changed without a migration)
+        out = StringIO()
+        call_command("makemigrations", check=True, dry_run=True, stdout=out)
+
+        # Assert
+        self.assertIn("No changes detected", out.getvalue())
+
+
+class TestExportRows(TestCase):
+    def test_export_rows_filtered(self):
+        # Arrange
+        organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        for location in ["Victoria", "Vancouver"]:
+            townhall_models.Opportunity.objects.create(
+                title=f"Food bank {location}",
+                description="Deliver food",
+                start_time=timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+                end_time=timezone.make_aware(datetime(2024, 7, 20, 20, 30)),
+                location=location,
+                organization=organization,
+            )
+
+        # Act
+        out = StringIO()
+        call_command(
+            "export_rows",
+            "opportunities",
+            "--filter",
+            "location=Victoria",
+            stdout=out,
+        )
+
+        # Assert
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], ",".join(exports.OPPORTUNITY_FIELDS))
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Food bank Victoria", lines[1])
+        self.assertIn("2024-07-20T10:00:00+00:00", lines[1])
+
+
+class TestSkillsMatching(TestCase):
+    def setUp(self):
+        organization = townhall_models.Organization.objects.create(
+            name="Goodwill",
+            location="Victoria",
+            email="goodwill@gmail.com",
+            phone_number="778-123-4567",
+            website="goodwill.ca",
+        )
+        times = {
+            "start_time": timezone.make_aware(datetime(2024, 7, 20, 10, 0)),
+            "end_time": timezone.make_aware(datetime(2024, 7, 20, 20, 30)),
+        }
+        self.garden = townhall_models.Opportunity.objects.create(
+            title="Community garden",
+            description="Gardening and planting vegetables",
+            location="Vancouver",
+            organization=organization,
+            **times,
+        )
+        self.kitchen = townhall_models.Opportunity.objects.create(
+            title="Soup kitchen",
+            description="Cooking meals and serving food",
+            location="Vancouver",
+            organization=organization,
+            **times,
+        )
+        self.gardener = townhall_models.Volunteer.objects.create(
+            first_name="James",
+            last_name="Bond",
+            gender="M",
+            email="jamesbond@gmail.ca",
+            skills_interests="Gardening, planting, vegetables",
+        )
+        self.cook = townhall_models.Volunteer.objects.create(
+            first_name="Jane",
+            last_name="Doe",
+            gender="F",
+            email="janedoe@gmail.ca",
+            skills_interests="Cooking for large groups",
+        )
+
+    def test_matching_opportunities_ranked_by_similarity(self):
+        # Act
+        matches = townhall_services.VolunteerServices.get_matching_opportunities(
+            self.gardener.id, limit=10
+        )
+
+        # Assert
+        self.assertEqual([opportunity for opportunity, _ in matches], [self.garden])
+        self.assertGreater(matches[0][1], 0)
+        self.assertLessEqual(matches[0][1], 1.0 + 1e-9)
+
+    def test_matching_volunteers(self):
+        # Act
+        matches = townhall_services.OpportunityServices.get_matching_volunteers(
+            self.kitchen.id, limit=10
+        )
+
+        # Assert
+        self.assertEqual([volunteer for volunteer, _ in matches], [self.cook])
+
+    def test_vectors_follow_updates(self):
+        # Act
+        townhall_services.VolunteerServices.update_volunteer(
+            UpdateVolunteerData(id=self.gardener.id, skills_interests="Serving food")
+        )
+        matches = townhall_services.VolunteerServices.get_matching_opportunities(
+            self.gardener.id, limit=10
+        )
+
+        # Assert
+        self.assertEqual([opportunity for opportunity, _ in matches], [self.kitchen])
+
+    def test_vectors_removed_with_row(self):
+        # Act
+        self.kitchen.delete()
+
+        # Assert
+        self.assertFalse(
+            townhall_models.MatchTerm.objects.filter(
+                kind="opportunity", object_id=self.kitchen.id
+            ).exists()
+        )
+        self.assertEqual(
+            townhall_services.VolunteerServices.get_matching_opportunities(
+                self.cook.id, limit=10
+            ),
+            [],
+        )
+
+    def test_matching_unknown_volunteer(self):
+        # Act / Assert
+        with self.assertRaises(ValidationError) as context:
+            townhall_services.VolunteerServices.get_matching_opportunities(
+                999, limit=10
+            )
+        self.assertEqual(context.exception.code, "not_found")
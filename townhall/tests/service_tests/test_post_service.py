@@ -1,11 +1,18 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import caches
 from django.core.management import call_command
-from django.db.utils import IntegrityError
-from myapi.models import Post, Volunteer
+from django.db.utils import DatabaseError, IntegrityError
+from myapi.models import Post, PostLike, Volunteer
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from myapi.services import PostServices as post_services
+from myapi.serializers import PostSerializer
+from myapi.counters import LikeCounterBuffer
 from myapi.types import CreatePostData
 from django.utils import timezone
 import os
+from unittest import mock
 
 
 class TestPostModel(TestCase):
@@ -61,3 +68,132 @@ class TestPostModel(TestCase):
         self.assertIsNotNone(post)
         self.assertEqual(post.volunteer_id, self.volunteer.id)
         self.assertEqual(post.content, "Test post content")
+
+    def test_toggle_like_likes_then_unlikes(self):
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Like me", created_at=timezone.now()
+        )
+
+        liked, likes = post_services.toggle_like(post.id, self.volunteer.id)
+        self.assertTrue(liked)
+        self.assertEqual(likes, 1)
+        self.assertTrue(post.liked_by.filter(id=self.volunteer.id).exists())
+
+        liked, likes = post_services.toggle_like(post.id, self.volunteer.id)
+        self.assertFalse(liked)
+        self.assertEqual(likes, 0)
+        self.assertFalse(PostLike.objects.filter(post=post).exists())
+
+    def test_toggle_like_query_count_is_constant(self):
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Like me", created_at=timezone.now()
+        )
+        with CaptureQueriesContext(connection) as first_like:
+            post_services.toggle_like(post.id, self.volunteer.id)
+        post_services.toggle_like(post.id, self.volunteer.id)
+
+        for i in range(20):
+            liker = Volunteer.objects.create(
+                first_name="Liker", email=f"liker{i}@example.com", gender="M"
+            )
+            post_services.toggle_like(post.id, liker.id)
+
+        with CaptureQueriesContext(connection) as like_after_twenty:
+            post_services.toggle_like(post.id, self.volunteer.id)
+
+        self.assertEqual(len(first_like), len(like_after_twenty))
+        post.refresh_from_db()
+        self.assertEqual(post.likes, 21)
+
+    def test_deleting_liker_decrements_likes(self):
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Like me", created_at=timezone.now()
+        )
+        liker = Volunteer.objects.create(
+            first_name="Liker", email="liker@example.com", gender="M"
+        )
+        post_services.toggle_like(post.id, self.volunteer.id)
+        post_services.toggle_like(post.id, liker.id)
+
+        # Deletes their like by cascade
+        liker.delete()
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes, 1)
+        self.assertEqual(PostLike.objects.filter(post=post).count(), 1)
+
+    def test_duplicate_like_is_rejected_by_constraint(self):
+        post = Post.objects.create(
+            volunteer=self.volunteer, content="Like me", created_at=timezone.now()
+        )
+        PostLike.objects.create(post=post, volunteer=self.volunteer)
+
+        with self.assertRaises(IntegrityError):
+            PostLike.objects.create(post=post, volunteer=self.volunteer)
+
+    def test_toggle_like_post_not_found(self):
+        with self.assertRaises(ValidationError):
+            post_services.toggle_like(999, self.volunteer.id)
+
+
+@override_settings(POST_LIKES_WRITE_BEHIND=True)
+class TestWriteBehindLikes(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.volunteer = Volunteer.objects.create(
+            first_name="Zamorak", email="zamorak@example.com", gender="M"
+        )
+        self.post = Post.objects.create(
+            volunteer=self.volunteer, content="Like me", created_at=timezone.now()
+        )
+
+    def toggle_like(self, volunteer):
+        with self.captureOnCommitCallbacks(execute=True):
+            return post_services.toggle_like(self.post.id, volunteer.id)
+
+    def test_toggle_like_buffers_the_counter(self):
+        liked, _ = self.toggle_like(self.volunteer)
+
+        self.assertTrue(liked)
+        # The row is untouched until the buffer is flushed
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 0)
+        self.assertEqual(LikeCounterBuffer.pending(self.post.id), 1)
+
+    def test_reads_merge_pending_likes(self):
+        self.toggle_like(self.volunteer)
+
+        self.post.refresh_from_db()
+        self.assertEqual(PostSerializer(self.post).data["likes"], 1)
+
+    def test_flush_writes_pending_likes(self):
+        other = Volunteer.objects.create(
+            first_name="Saradomin", email="saradomin@example.com", gender="M"
+        )
+        self.toggle_like(self.volunteer)
+        self.toggle_like(other)
+        self.toggle_like(other)
+
+        self.assertEqual(LikeCounterBuffer.flush(), 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 1)
+        self.assertEqual(LikeCounterBuffer.pending(self.post.id), 0)
+        # Nothing left to write on the next run
+        self.assertEqual(LikeCounterBuffer.flush(), 0)
+
+    def test_failed_flush_keeps_likes_pending(self):
+        self.toggle_like(self.volunteer)
+
+        with mock.patch.object(
+            Post.objects, "filter", side_effect=DatabaseError("database is locked")
+        ):
+            with self.assertRaises(DatabaseError):
+                LikeCounterBuffer.flush()
+
+        self.assertEqual(LikeCounterBuffer.pending(self.post.id), 1)
+        # Written once by the next run
+        self.assertEqual(LikeCounterBuffer.flush(), 1)
+        self.assertEqual(LikeCounterBuffer.flush(), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 1)
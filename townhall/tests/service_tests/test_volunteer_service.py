@@ -1,14 +1,22 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.management import call_command
+from django.core.cache import cache
 
+from io import StringIO
+import os
+import tempfile
 from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.hashers import is_password_usable
 
 from myapi.models import Volunteer as vol_mod
 from myapi.models import Opportunity as opp_mod
 from myapi.services import VolunteerServices as vol_serv
+from myapi.hashers import LOGIN_HASH_SECONDS
+from myapi import ratelimit, search, volunteer_import
+from myapi.models import RateLimitBucket
 
 from myapi.types import CreateVolunteerData
 from myapi.types import UpdateVolunteerData
@@ -691,3 +699,369 @@ class TestVolunteerModel(TestCase):
 # ***!!! KEYNOTE:
 #        The testing done is NOT full coverage for methods involving the cache
 #        This will need to be done in the future.
+
+
+class TestLoginHashing(TestCase):
+    def setUp(self):
+        cache.clear()
+        LOGIN_HASH_SECONDS.reset()
+
+    def create_volunteer(self, password_hash):
+        return vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+            password=password_hash,
+        )
+
+    def test_save_keeps_hashes_of_any_configured_hasher(self):
+        # Arrange
+        pbkdf2_hash = make_password("ImBatman99", hasher="pbkdf2_sha256")
+
+        # Act
+        volunteer = self.create_volunteer(pbkdf2_hash)
+
+        # Assert
+        volunteer.refresh_from_db()
+        assert volunteer.password == pbkdf2_hash
+
+    def test_save_hashes_raw_password(self):
+        # Act
+        volunteer = self.create_volunteer("ImBatman99")
+
+        # Assert
+        volunteer.refresh_from_db()
+        assert volunteer.password.startswith("scrypt$")
+        assert check_password("ImBatman99", volunteer.password)
+
+    def test_login_upgrades_outdated_hash(self):
+        # Arrange
+        volunteer = self.create_volunteer(
+            make_password("ImBatman99", hasher="pbkdf2_sha256")
+        )
+
+        # Act
+        returned_volunteer = vol_serv.authenticate_volunteer(
+            "batman@gmail.com", "ImBatman99"
+        )
+
+        # Assert
+        assert returned_volunteer.id == volunteer.id
+        volunteer.refresh_from_db()
+        assert volunteer.password.startswith("scrypt$")
+        assert check_password("ImBatman99", volunteer.password)
+
+    def test_failed_login_keeps_hash(self):
+        # Arrange
+        pbkdf2_hash = make_password("ImBatman99", hasher="pbkdf2_sha256")
+        volunteer = self.create_volunteer(pbkdf2_hash)
+
+        # Act
+        returned_volunteer = vol_serv.authenticate_volunteer(
+            "batman@gmail.com", "NotBatman"
+        )
+
+        # Assert
+        assert returned_volunteer is None
+        volunteer.refresh_from_db()
+        assert volunteer.password == pbkdf2_hash
+
+    def test_unknown_email_still_hashes(self):
+        # Act
+        with patch(
+            "django.contrib.auth.hashers.make_password", wraps=make_password
+        ) as mock_make_password:
+            returned_volunteer = vol_serv.authenticate_volunteer(
+                "nobody@gmail.com", "ImBatman99"
+            )
+
+        # Assert
+        assert returned_volunteer is None
+        mock_make_password.assert_called_once_with("ImBatman99")
+        assert LOGIN_HASH_SECONDS.snapshot().count == 1
+
+    def test_login_hash_time_recorded(self):
+        # Arrange
+        self.create_volunteer("ImBatman99")
+
+        # Act
+        vol_serv.authenticate_volunteer("batman@gmail.com", "ImBatman99")
+        vol_serv.authenticate_volunteer("batman@gmail.com", "wrong")
+
+        # Assert
+        snapshot = LOGIN_HASH_SECONDS.snapshot()
+        assert snapshot.count == 2
+        assert snapshot.buckets[-1] == (float("inf"), 2)
+        assert snapshot.sum > 0
+
+
+@override_settings(
+    LOGIN_RATE_LIMIT_PER_EMAIL=(2, 300), LOGIN_RATE_LIMIT_PER_IP=(3, 300)
+)
+class TestLoginRateLimit(TestCase):
+    def setUp(self):
+        cache.clear()
+        vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+            password=make_password("ImBatman99"),
+        )
+
+    def test_attempts_over_email_limit_rejected(self):
+        # Arrange
+        for _ in range(2):
+            assert vol_serv.authenticate_volunteer("batman@gmail.com", "wrong") is None
+
+        # Act & Assert (even the right password, until the window slides)
+        with self.assertRaises(ValidationError) as context:
+            vol_serv.authenticate_volunteer("batman@gmail.com", "ImBatman99")
+
+        # Assert
+        assert context.exception.code == "rate_limited"
+        assert context.exception.params["retry_after"] > 0
+        assert context.exception.messages == [
+            "Too many login attempts. Please try again later."
+        ]
+
+    def test_email_limit_ignores_case(self):
+        # Arrange
+        vol_serv.authenticate_volunteer("batman@gmail.com", "wrong")
+        vol_serv.authenticate_volunteer("BATMAN@gmail.com", "wrong")
+
+        # Act & Assert
+        with self.assertRaises(ValidationError):
+            vol_serv.authenticate_volunteer("Batman@gmail.com", "wrong")
+
+    def test_attempts_over_ip_limit_rejected(self):
+        # Arrange (one attempt per email, all from the same address)
+        for email in ["a@gmail.com", "b@gmail.com", "c@gmail.com"]:
+            vol_serv.authenticate_volunteer(email, "wrong", ip="10.0.0.1")
+
+        # Act & Assert
+        with self.assertRaises(ValidationError) as context:
+            vol_serv.authenticate_volunteer("d@gmail.com", "wrong", ip="10.0.0.1")
+        assert context.exception.code == "rate_limited"
+
+        # Other addresses are not affected
+        assert (
+            vol_serv.authenticate_volunteer("d@gmail.com", "wrong", ip="10.0.0.2")
+            is None
+        )
+
+    def test_successful_login_resets_email_limit(self):
+        # Arrange
+        vol_serv.authenticate_volunteer("batman@gmail.com", "wrong")
+
+        # Act
+        volunteer = vol_serv.authenticate_volunteer("batman@gmail.com", "ImBatman99")
+
+        # Assert
+        assert volunteer.email == "batman@gmail.com"
+        vol_serv.authenticate_volunteer("batman@gmail.com", "wrong")
+        assert vol_serv.authenticate_volunteer("batman@gmail.com", "wrong") is None
+
+    def test_sliding_window_weights_previous_window(self):
+        # Arrange (2 hits late in the window [100, 200))
+        rate = ratelimit.RateLimit("test", 2, 100)
+        assert ratelimit.attempt(rate, "key", now=150) is None
+        assert ratelimit.attempt(rate, "key", now=190) is None
+
+        # Act & Assert
+        # At 210, 90% of the previous window still counts: 1.8 + 1 > 2, and
+        # only from 300 on would one more attempt fit
+        assert ratelimit.attempt(rate, "key", now=210) == 90
+        # At 295, 5% still counts: 0.1 + 2 (including the rejected one) > 2,
+        # the next attempt fits once half of [200, 300) has slid out
+        assert ratelimit.attempt(rate, "key", now=295) == 55
+        # Nothing of [100, 200) counts in the window after
+        assert ratelimit.attempt(rate, "other", now=295) is None
+
+    def test_new_window_purges_expired_buckets(self):
+        # Arrange
+        rate = ratelimit.RateLimit("test", 2, 100)
+        ratelimit.attempt(rate, "old", now=50)
+        ratelimit.attempt(rate, "recent", now=150)
+
+        # Act
+        ratelimit.attempt(rate, "key", now=250)
+
+        # Assert (the buckets still needed as previous window are kept)
+        assert sorted(
+            RateLimitBucket.objects.values_list("window_start", flat=True)
+        ) == [100, 200]
+
+    @override_settings(RATE_LIMIT_STORE="cache")
+    def test_cache_store(self):
+        # Arrange
+        rate = ratelimit.RateLimit("test", 2, 100)
+        assert ratelimit.attempt(rate, "key", now=150) is None
+        assert ratelimit.attempt(rate, "key", now=160) is None
+
+        # Act & Assert
+        assert ratelimit.attempt(rate, "key", now=170) == 97
+        ratelimit.reset(rate, "key", now=170)
+        assert ratelimit.attempt(rate, "key", now=180) is None
+        assert not RateLimitBucket.objects.exists()
+
+
+class TestVolunteerStartup(TestCase):
+    def test_default_password_is_unusable(self):
+        # Act
+        volunteer = vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+        )
+
+        # Assert
+        volunteer.refresh_from_db()
+        assert not is_password_usable(volunteer.password)
+        assert vol_serv.authenticate_volunteer("batman@gmail.com", "") is None
+        assert (
+            vol_serv.authenticate_volunteer("batman@gmail.com", "default_password")
+            is None
+        )
+
+    def test_default_password_is_callable(self):
+        # Act
+        field = vol_mod._meta.get_field("password")
+
+        # Assert (a callable default runs per new row, not on every import)
+        assert callable(field.default)
+
+    def test_startup_benchmark(self):
+        # Act
+        out = StringIO()
+        call_command("startup_benchmark", repeat=1, top=5, stdout=out)
+
+        # Assert
+        report = out.getvalue()
+        assert "django.setup()" in report
+        assert "myapi.models" in report
+
+
+class TestVolunteerImport(TestCase):
+    HEADER = "first_name,last_name,gender,email,password\n"
+
+    def setUp(self):
+        vol_mod.objects.create(
+            first_name="Bruce",
+            last_name="Wayne",
+            gender="M",
+            email="batman@gmail.com",
+        )
+
+    def test_import_creates_valid_rows(self):
+        # Arrange
+        lines = StringIO(
+            self.HEADER
+            + "Diana,Prince,F,wonder@gmail.com,Themyscira42!\n"
+            + "Clark,Kent,M,superman@gmail.com,Krypton4Ever!\n"
+            + "Barry,Allen,M,flash@gmail.com,SpeedForce99!\n"
+        )
+
+        # Act (two workers and batches of two, so both paths are taken)
+        result = volunteer_import.import_volunteers(lines, batch_size=2, workers=2)
+
+        # Assert
+        assert (result.rows, result.created, result.errors) == (3, 3, [])
+        diana = vol_mod.objects.get(email="wonder@gmail.com")
+        assert check_password("Themyscira42!", diana.password)
+        assert diana.is_active
+        hits = search.search("Prince", kinds=["volunteer"])
+        assert [hit.object_id for hit in hits] == [diana.id]
+
+    def test_import_reports_invalid_rows(self):
+        # Arrange
+        lines = StringIO(
+            self.HEADER
+            + "Bruce,Wayne,M,batman@gmail.com,ImBatman99!\n"
+            + "Diana,Prince,F,wonder@gmail.com,Themyscira42!\n"
+            + "Diana,Again,F,wonder@gmail.com,Themyscira42!\n"
+            + "Clark,Kent,X,superman@gmail.com,Krypton4Ever!\n"
+            + "Barry,Allen,M,not-an-email,SpeedForce99!\n"
+            + "Hal,Jordan,M,lantern@gmail.com,123\n"
+            + ",Queen,M,arrow@gmail.com,GreenArrow77!\n"
+        )
+
+        # Act
+        result = volunteer_import.import_volunteers(lines, workers=1)
+
+        # Assert
+        assert (result.rows, result.created) == (7, 1)
+        errors = {error.line: error.errors for error in result.errors}
+        assert errors == {
+            2: ["A volunteer with this email already exists."],
+            4: ["The email is on an earlier row of the file."],
+            5: ["gender must be one of: M, F."],
+            6: ["Invalid email format."],
+            7: ["Invalid password."],
+            8: ["first_name is required."],
+        }
+
+    def test_import_checks_emails_once_per_batch(self):
+        # Arrange
+        lines = StringIO(
+            self.HEADER
+            + "".join(
+                f"Robin,{i},M,robin{i}@gmail.com,BoyWonder{i}!x\n" for i in range(4)
+            )
+        )
+
+        # Act (one email lookup and one insert, in a savepoint, per batch)
+        with self.assertNumQueries(8):
+            with patch("myapi.search.index_instance"), patch(
+                "myapi.matching.index_instance"
+            ):
+                result = volunteer_import.import_volunteers(
+                    lines, batch_size=2, workers=1
+                )
+
+        # Assert
+        assert result.created == 4
+
+    def test_import_reports_emails_taken_meanwhile(self):
+        # Arrange
+        lines = StringIO(
+            self.HEADER
+            + "Bruce,Wayne,M,batman@gmail.com,ImBatman99!\n"
+            + "Diana,Prince,F,wonder@gmail.com,Themyscira42!\n"
+        )
+
+        # Act (as if the first row was inserted after the batch was checked)
+        with patch(
+            "myapi.dao.VolunteerDao.existing_volunteer_emails", return_value=set()
+        ):
+            result = volunteer_import.import_volunteers(lines, workers=1)
+
+        # Assert
+        assert result.created == 1
+        assert [(error.line, error.email) for error in result.errors] == [
+            (2, "batman@gmail.com")
+        ]
+
+    def test_import_rejects_missing_columns(self):
+        # Arrange
+        lines = StringIO("first_name,last_name,email\nDiana,Prince,w@gmail.com\n")
+
+        # Act & Assert
+        with self.assertRaisesMessage(ValidationError, "Missing columns"):
+            volunteer_import.import_volunteers(lines)
+
+    def test_import_volunteers_command(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "volunteers.csv")
+        with open(path, "w") as f:
+            f.write(self.HEADER + "Diana,Prince,F,wonder@gmail.com,Themyscira42!\n")
+
+        # Act
+        out = StringIO()
+        call_command("import_volunteers", path, workers=1, stdout=out)
+
+        # Assert
+        assert "Imported 1 of 1 volunteers" in out.getvalue()
+        assert vol_mod.objects.filter(email="wonder@gmail.com").exists()
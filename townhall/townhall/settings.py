@@ -54,6 +54,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # One object per row looked up by id within a request (myapi/identity_map.py)
+    "myapi.identity_map.IdentityMapMiddleware",
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -101,6 +103,61 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# "default" is local to each process. "shared" is seen by every worker: the L2
+# of myapi.caching, the response cache, ETag versions and metrics. Their
+# invalidation doesn't rely on atomic operations, but the file cache's add()
+# and incr() aren't atomic and it culls entries past MAX_ENTRIES, so counters
+# kept there (metrics, POST_LIKES_WRITE_BEHIND, RATE_LIMIT_STORE = "cache") are
+# only exact on redis or memcached (e.g.
+# django.core.cache.backends.redis.RedisCache), which production should use.
+# Tests swap it for a local memory cache (see myapi/test_runner.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": os.environ.get(
+            "SHARED_CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.environ.get(
+            "SHARED_CACHE_LOCATION", str(BASE_DIR / ".cache" / "shared")
+        ),
+    },
+}
+
+# Two-tier cache (see myapi/caching.py): entries expire from the shared cache
+# after TIMEOUT seconds, each process keeps up to L1_MAX_ENTRIES per namespace
+# for at most L1_TIMEOUT seconds and checks for other processes' changes every
+# SYNC_INTERVAL seconds
+TWO_TIER_CACHE = {
+    "L2": "shared",
+    "TIMEOUT": 300,
+    "L1_MAX_ENTRIES": 1000,
+    "L1_TIMEOUT": 60,
+    "SYNC_INTERVAL": 1.0,
+    # How long concurrent misses on one key wait for the process loading it
+    "FILL_WAIT": 1.0,
+    "FILL_LOCK_TIMEOUT": 10,
+}
+
+# Cache the DAO lookups of single volunteers, organizations, opportunities,
+# projects and tasks by id (see myapi/entity_cache.py)
+ENTITY_CACHE_ENABLED = True
+
+# Serve repeated GETs of the public opportunity and organization endpoints
+# from the shared cache for up to RESPONSE_CACHE_TIMEOUT seconds, changed rows
+# purge them sooner (see myapi/response_cache.py)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Tests restore a migrated template database instead of replaying every
+# migration for each run (see myapi/test_runner.py)
+TEST_RUNNER = "myapi.test_runner.TemplateDatabaseTestRunner"
+TEST_DATABASE_TEMPLATE_DIR = BASE_DIR / ".test_db_templates"
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -119,6 +176,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (see myapi/hashers.py)
+# PASSWORD_HASHER picks the hasher for new passwords: "scrypt", "argon2" (needs
+# the argon2-cffi package) or "pbkdf2_sha256". The others stay listed so older
+# hashes still verify; they are re-hashed with the chosen one on the next
+# successful login, as are hashes made with other PASSWORD_HASHER_PARAMS.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+
+PASSWORD_HASHER_PARAMS = {
+    # Memory use is 128 * work_factor * block_size bytes (16 MiB) per hash
+    "scrypt": {"work_factor": 2**14, "block_size": 8, "parallelism": 1},
+    # memory_cost is in KiB
+    "argon2": {"time_cost": 2, "memory_cost": 102400, "parallelism": 8},
+    "pbkdf2_sha256": {"iterations": 720000},
+}
+
+_PASSWORD_HASHER_CLASSES = {
+    "scrypt": "myapi.hashers.ScryptPasswordHasher",
+    "argon2": "myapi.hashers.Argon2PasswordHasher",
+    "pbkdf2_sha256": "myapi.hashers.PBKDF2PasswordHasher",
+}
+
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path
+    for name, path in _PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -145,6 +229,72 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Page sizes for the cursor paginated post feed (GET /post/?limit=&cursor=)
+POST_FEED_PAGE_SIZE = 20
+POST_FEED_MAX_PAGE_SIZE = 100
+
+# Upper bound for ?comments=N, the number of newest comments embedded per post
+# in the feed, and page sizes for GET /post/<id>/comments/
+POST_FEED_MAX_COMMENT_PREVIEW = 20
+POST_COMMENTS_PAGE_SIZE = 20
+POST_COMMENTS_MAX_PAGE_SIZE = 100
+
+# Page sizes for the paginated volunteer directory (GET /volunteer/?limit=)
+VOLUNTEER_DIRECTORY_PAGE_SIZE = 50
+VOLUNTEER_DIRECTORY_MAX_PAGE_SIZE = 200
+
+# Page sizes for the roster of an opportunity (GET /opportunity/<id>/volunteers/)
+OPPORTUNITY_ROSTER_PAGE_SIZE = 50
+OPPORTUNITY_ROSTER_MAX_PAGE_SIZE = 200
+
+# Most volunteers (or opportunities) one batch sign-up request may add or
+# remove (POST/DELETE /opportunity/<id>/volunteers/, /volunteer/<id>/opportunity/)
+SIGN_UP_BATCH_MAX_SIZE = 1000
+
+# GET /calendar/ shows CALENDAR_DEFAULT_DAYS from today unless asked for
+# another window, of at most CALENDAR_MAX_DAYS
+CALENDAR_DEFAULT_DAYS = 31
+CALENDAR_MAX_DAYS = 366
+
+# The iCalendar feeds (GET /organization/<id>/calendar.ics,
+# /volunteer/<id>/calendar.ics) leave out what ended more than PAST_DAYS ago.
+# They stay cached until a row they show changes, or CACHE_TIMEOUT seconds.
+CALENDAR_FEED_PAST_DAYS = 90
+CALENDAR_FEED_CACHE_TIMEOUT = 86400
+
+# Number of results returned by GET /search/?q=
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# Number of results returned by the skills matching endpoints
+MATCHES_PAGE_SIZE = 10
+MATCHES_MAX_PAGE_SIZE = 50
+
+# Rows read per query by the streaming exports (GET /volunteer/export/,
+# /opportunity/export/, /tasks/export/ and `manage.py export_rows`)
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk volunteer imports (POST /volunteer/import/, `manage.py
+# import_volunteers`) insert BATCH_SIZE rows per query and hash passwords
+# with HASH_WORKERS threads (None: one per CPU)
+VOLUNTEER_IMPORT_BATCH_SIZE = 500
+VOLUNTEER_IMPORT_HASH_WORKERS = None
+
+# Buffer like counter changes in the cache instead of writing the post row on
+# every toggle (see myapi.counters.LikeCounterBuffer). Needs CACHES["shared"]
+# on redis or memcached (atomic incr, no eviction of the pending counts) and
+# `manage.py flush_like_counters --interval N` running.
+POST_LIKES_WRITE_BEHIND = False
+
+# Login attempts allowed per sliding window, as (attempts, window in seconds),
+# for each email and for each client IP (see myapi/ratelimit.py)
+LOGIN_RATE_LIMIT_PER_EMAIL = (5, 300)
+LOGIN_RATE_LIMIT_PER_IP = (50, 300)
+
+# Where rate limit counters live: "database" (works across processes as is)
+# or "cache" (only with a cache shared by all workers, e.g. redis/memcached)
+RATE_LIMIT_STORE = "database"
+
 AUTHENTICATION_BACKENDS = [
     "myapi.backends.EmailBackend",  # Pointing to the backend in the app directory
     "django.contrib.auth.backends.ModelBackend",  # Keep the default backend if needed
@@ -27,6 +27,8 @@ from myapi.views import OrganizationViewSet
 from myapi.views import TaskViewSet
 from myapi.views import PostViewSet
 from myapi.views import CommentViewSet
+from myapi.views import SearchViewSet
+from myapi.views import CalendarViewSet, CalendarFeedViewSet
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -45,6 +47,16 @@ urlpatterns = [
         ),
         name="volunteer",
     ),
+    path(
+        "volunteer/export/",
+        VolunteerViewSet.as_view({"get": "export_volunteers_request"}),
+        name="volunteer_export",
+    ),
+    path(
+        "volunteer/import/",
+        VolunteerViewSet.as_view({"post": "import_volunteers_request"}),
+        name="volunteer_import",
+    ),
     path(
         "volunteer/<int:vol_id>/",
         VolunteerViewSet.as_view(
@@ -66,6 +78,8 @@ urlpatterns = [
         VolunteerViewSet.as_view(
             {
                 "get": "get_all_filtered_opportunities_of_a_volunteer_request",
+                "post": "add_opportunities_to_volunteer_request",
+                "delete": "remove_opportunities_from_volunteer_request",
             }
         ),
         name="volunteer_id_opportunity",
@@ -80,6 +94,25 @@ urlpatterns = [
         ),
         name="volunteer_id_opportunity_id",
     ),
+    path(
+        "volunteer/<int:vol_id>/matching_opportunities/",
+        VolunteerViewSet.as_view(
+            {
+                "get": "get_matching_opportunities_request",
+            }
+        ),
+        name="volunteer_id_matching_opportunities",
+    ),
+    path(
+        "volunteer/<int:vol_id>/schedule/",
+        VolunteerViewSet.as_view({"get": "get_volunteer_schedule_request"}),
+        name="volunteer_id_schedule",
+    ),
+    path(
+        "volunteer/<int:vol_id>/calendar.ics",
+        CalendarFeedViewSet.as_view({"get": "get_volunteer_feed_request"}),
+        name="volunteer_id_calendar",
+    ),
     path(
         "volunteer/<int:vol_id>/change_password/",
         VolunteerViewSet.as_view(
@@ -99,6 +132,40 @@ urlpatterns = [
             }
         ),
     ),
+    path(
+        "opportunity/export/",
+        OpportunityViewSet.as_view({"get": "export_opportunities_request"}),
+        name="opportunity_export",
+    ),
+    path(
+        "opportunity/<int:opp_id>/waitlist/",
+        OpportunityViewSet.as_view(
+            {
+                "get": "get_opportunity_waitlist_request",
+            }
+        ),
+        name="opportunity_id_waitlist",
+    ),
+    path(
+        "opportunity/<int:opp_id>/volunteers/",
+        OpportunityViewSet.as_view(
+            {
+                "get": "get_opportunity_volunteers_request",
+                "post": "add_volunteers_to_opportunity_request",
+                "delete": "remove_volunteers_from_opportunity_request",
+            }
+        ),
+        name="opportunity_id_volunteers",
+    ),
+    path(
+        "opportunity/<int:opp_id>/matching_volunteers/",
+        OpportunityViewSet.as_view(
+            {
+                "get": "get_matching_volunteers_request",
+            }
+        ),
+        name="opportunity_id_matching_volunteers",
+    ),
     path(
         "organization/",
         OrganizationViewSet.as_view(
@@ -109,6 +176,16 @@ urlpatterns = [
             }
         ),
     ),
+    path(
+        "organization/<int:org_id>/calendar.ics",
+        CalendarFeedViewSet.as_view({"get": "get_organization_feed_request"}),
+        name="organization_id_calendar",
+    ),
+    path(
+        "calendar/",
+        CalendarViewSet.as_view({"get": "get_calendar_request"}),
+        name="calendar",
+    ),
     path(
         "tasks/",
         TaskViewSet.as_view(
@@ -118,6 +195,11 @@ urlpatterns = [
             }
         ),
     ),
+    path(
+        "tasks/export/",
+        TaskViewSet.as_view({"get": "export_tasks"}),
+        name="task_export",
+    ),
     path(
         "tasks/<int:pk>/",
         TaskViewSet.as_view(
@@ -149,6 +231,15 @@ urlpatterns = [
         ),
         name="post_id"
     ),
+    path(
+        "post/<int:pk>/comments/",
+        PostViewSet.as_view(
+            {
+                "get": "get_post_comments"
+            }
+        ),
+        name="post_id_comments"
+    ),
     path(
         "post/<int:pk>/like/",
         PostViewSet.as_view(
@@ -170,6 +261,11 @@ urlpatterns = [
             "delete": "destroy",
         }),
     ),
+    path(
+        "search/",
+        SearchViewSet.as_view({"get": "search"}),
+        name="search",
+    ),
 ] + debug_toolbar_urls()
 
 # Serve media files during development